@@ -0,0 +1,133 @@
+# app/core/compiled_scorer.py
+"""
+Modellen som rena NumPy-arrayer.
+
+Den tränade pipelinen (StandardScaler + LogisticRegression) plattas ut till
+medelvärde, skala, koefficienter och intercept och sparas som en .npz-fil.
+Servern behöver då varken joblib eller sklearn: sannolikheterna för en hel
+batch räknas med en matrismultiplikation och en softmax.
+
+Kolumnerna i predict_proba följer klasserna i stigande ordning (0=oavgjort,
+1=hemmaseger, 2=bortaseger), precis som sklearn-pipelinen. Feature-schemat som
+pipelinen tränades med (feature_schema_) följer med i artefakten.
+
+Körs från backend-mappen:
+    python -m app.core.compiled_scorer --input ml_models/logistic_regression_v1.joblib \
+        --output ml_models/logistic_regression_v1.npz
+"""
+import argparse
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+# Höjs när innehållet i artefakten ändras på ett sätt som gamla läsare inte förstår
+SCORER_FORMAT_VERSION = 1
+
+
+class CompiledScorer:
+    """
+    Multinomial logistisk regression med standardisering, utan sklearn.
+    """
+    def __init__(
+        self,
+        mean: np.ndarray,
+        scale: np.ndarray,
+        coef: np.ndarray,
+        intercept: np.ndarray,
+        classes: np.ndarray,
+        feature_schema: Optional[dict] = None,
+    ):
+        # Standardiseringen vikas in i koefficienterna: ((x - mean) / scale) @ W.T + b
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes_ = np.asarray(classes)
+        self._weights = (self.coef / self.scale).T
+        self._bias = self.intercept - (self.mean / self.scale) @ self.coef.T
+        self.n_features_in_ = self.coef.shape[1]
+        if feature_schema is not None:
+            self.feature_schema_ = feature_schema
+
+    @classmethod
+    def from_pipeline(cls, pipeline) -> "CompiledScorer":
+        """
+        Plattar ut en Pipeline([("scaler", StandardScaler), ("classifier", LogisticRegression)]).
+        """
+        scaler = pipeline.named_steps["scaler"]
+        classifier = pipeline.named_steps["classifier"]
+        n_features = classifier.coef_.shape[1]
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+        return cls(
+            mean, scale, classifier.coef_, classifier.intercept_, classifier.classes_,
+            getattr(pipeline, "feature_schema_", None),
+        )
+
+    def predict_proba(self, X: np.ndarray) -> np.ndarray:
+        """
+        Sannolikheter (N, n_classes) för en (N, n_features)-matris.
+        """
+        logits = np.asarray(X, dtype=np.float64) @ self._weights + self._bias
+        if logits.shape[1] == 1:
+            # Binär modell: sklearn sparar bara koefficienterna för den positiva klassen
+            positive = 1.0 / (1.0 + np.exp(-logits[:, 0]))
+            return np.column_stack([1.0 - positive, positive])
+        logits -= logits.max(axis=1, keepdims=True)
+        np.exp(logits, out=logits)
+        logits /= logits.sum(axis=1, keepdims=True)
+        return logits
+
+    def save(self, path: str) -> None:
+        """
+        Sparar artefakten via en temporär fil och os.replace (se training.save_model).
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        temporary_path = f"{path}.tmp-{os.getpid()}.npz"
+        # Schemat sparas som en JSON-sträng; läsare utan stöd för det ignorerar nyckeln
+        schema = getattr(self, "feature_schema_", None)
+        extra = {"feature_schema": np.array(json.dumps(schema))} if schema is not None else {}
+        np.savez(
+            temporary_path,
+            format_version=np.array(SCORER_FORMAT_VERSION),
+            mean=self.mean,
+            scale=self.scale,
+            coef=self.coef,
+            intercept=self.intercept,
+            classes=self.classes_,
+            **extra,
+        )
+        os.replace(temporary_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "CompiledScorer":
+        with np.load(path, allow_pickle=False) as artifact:
+            format_version = int(artifact["format_version"])
+            if format_version != SCORER_FORMAT_VERSION:
+                raise ValueError(
+                    f"Unsupported scorer format version {format_version} (expected {SCORER_FORMAT_VERSION})"
+                )
+            feature_schema = json.loads(str(artifact["feature_schema"])) if "feature_schema" in artifact else None
+            return cls(
+                artifact["mean"], artifact["scale"], artifact["coef"], artifact["intercept"], artifact["classes"],
+                feature_schema,
+            )
+
+
+def export_pipeline(input_path: str, output_path: str) -> CompiledScorer:
+    import joblib
+
+    scorer = CompiledScorer.from_pipeline(joblib.load(input_path))
+    scorer.save(output_path)
+    return scorer
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--input", required=True, help="Fitted sklearn pipeline (.joblib).")
+    parser.add_argument("--output", required=True, help="Compiled scorer artifact (.npz).")
+    args = parser.parse_args()
+    scorer = export_pipeline(args.input, args.output)
+    print(f"Exported {scorer.coef.shape[0]}x{scorer.n_features_in_} coefficients to '{args.output}'.")
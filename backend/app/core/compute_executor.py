@@ -0,0 +1,225 @@
+# app/core/compute_executor.py
+"""
+Exekverare för CPU-tung feature- och inferensberäkning, så att eventloopen
+inte blockeras och /teams- och /matches-anrop inte får vänta på prediktioner.
+
+COMPUTE_EXECUTOR_KIND:
+    "inline"  allt körs direkt i eventloopen (ingen avlastning, t.ex. för CLI:n)
+    "thread"  en trådpool; numpy och sklearn släpper GIL i de tunga delarna
+    "process" inferens i en processpool där varje worker har modellen laddad,
+              så Python-delen av predict_proba inte konkurrerar om GIL med
+              eventloopen. Features räknas i trådpoolen eftersom de läser
+              MatchSnapshot i minnet, som inte kan delas med andra processer.
+
+Små jobb (högst COMPUTE_INLINE_MAX_ROWS rader) körs direkt: ett hopp till en
+tråd kostar mer än att räkna features för en match.
+
+Antalet jobb som väntar eller körs är begränsat till COMPUTE_EXECUTOR_MAX_PENDING.
+Är det fullt kastas ComputeSaturated direkt, vilket blir 503 med Retry-After
+(se app/main.py), istället för att köerna och latensen växer utan gräns.
+"""
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.metrics import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_KINDS = ("inline", "thread", "process")
+
+compute_jobs_total = Counter(
+    "compute_jobs_total", "CPU-bound jobs by where they ran", labelnames=("kind", "target")
+)
+compute_rejected_total = Counter(
+    "compute_rejected_total", "Jobs rejected because the compute executor was saturated"
+)
+compute_queue_seconds = Histogram(
+    "compute_queue_seconds", "Time from submit until a pool thread started the job",
+    [0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0],
+)
+
+
+class ComputeSaturated(RuntimeError):
+    """
+    Exekveraren har redan max_pending jobb; försök igen senare.
+    """
+
+
+class _ModelChanged(Exception):
+    # Modellfilen i workern är inte den version som efterfrågades
+    pass
+
+
+# Modeller laddade i en processpool-worker, nycklade på (sökväg, filsignatur)
+_worker_models: dict[tuple[str, tuple[int, int]], Any] = {}
+
+
+def _load_worker_model(path: str, signature: tuple[int, int], mmap_mode: Optional[str]) -> Any:
+    # Sen import: model_registry importerar feature_engineering, som använder den här modulen
+    from app.core.model_registry import artifact_signature, load_artifact
+
+    model = _worker_models.get((path, signature))
+    if model is not None:
+        return model
+    if artifact_signature(path) != signature:
+        raise _ModelChanged(path)
+    model = load_artifact(path, mmap_mode)
+    if artifact_signature(path) != signature:
+        raise _ModelChanged(path)
+    # Bara den senaste versionen behålls i workern
+    _worker_models.clear()
+    _worker_models[(path, signature)] = model
+    return model
+
+
+def _init_worker(path: str, mmap_mode: Optional[str]) -> None:
+    # Laddar modellen när workern startar, så första prediktionen inte betalar för det
+    from app.core.model_registry import artifact_signature
+
+    try:
+        _load_worker_model(path, artifact_signature(path), mmap_mode)
+    except Exception:
+        pass
+
+
+def _worker_predict_proba(
+    path: str, signature: tuple[int, int], mmap_mode: Optional[str], features: np.ndarray
+) -> np.ndarray:
+    return _load_worker_model(path, signature, mmap_mode).predict_proba(features)
+
+
+def _timed(started: list[float], fn: Callable, *args) -> Any:
+    # Bara för trådpoolen: starttiden noteras i tråden och registreras sedan i
+    # eventloopen, eftersom mätvärdena inte har några lås (app/core/metrics.py)
+    started.append(time.perf_counter())
+    return fn(*args)
+
+
+class ComputeExecutor:
+    def __init__(
+        self,
+        kind: str,
+        max_workers: int,
+        max_pending: int,
+        inline_max_rows: int,
+        mmap_mode: Optional[str] = None,
+    ):
+        if kind not in EXECUTOR_KINDS:
+            raise ValueError(f"Unknown compute executor kind '{kind}', expected one of {', '.join(EXECUTOR_KINDS)}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.inline_max_rows = inline_max_rows
+        self.mmap_mode = mmap_mode
+        self._pending = 0
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _thread_pool(self) -> ThreadPoolExecutor:
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="compute")
+        return self._threads
+
+    def _process_pool(self, model_path: str) -> ProcessPoolExecutor:
+        if self._processes is None:
+            # spawn: en fork av en process med eventloop och trådar är inte säker
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_path, self.mmap_mode),
+            )
+        return self._processes
+
+    async def _submit(self, pool: Executor, target: str, fn: Callable, *args) -> Any:
+        if self._pending >= self.max_pending:
+            compute_rejected_total.inc()
+            raise ComputeSaturated(
+                f"Compute executor is saturated ({self._pending} jobs pending), try again later."
+            )
+        self._pending += 1
+        try:
+            compute_jobs_total.inc(kind=self.kind, target=target)
+            loop = asyncio.get_running_loop()
+            if target == "thread":
+                submitted, started = time.perf_counter(), []
+                try:
+                    return await loop.run_in_executor(pool, _timed, started, fn, *args)
+                finally:
+                    if started:
+                        compute_queue_seconds.observe(started[0] - submitted)
+            return await loop.run_in_executor(pool, fn, *args)
+        finally:
+            self._pending -= 1
+
+    async def run(self, fn: Callable, *args, rows: Optional[int] = None) -> Any:
+        """
+        Kör fn(*args) i trådpoolen, eller direkt om exekveraren är "inline"
+        eller jobbet är litet (rows <= inline_max_rows). fn får bara läsa
+        sina argument; den körs parallellt med eventloopen.
+        """
+        if self.kind == "inline" or (rows is not None and rows <= self.inline_max_rows):
+            return fn(*args)
+        return await self._submit(self._thread_pool(), "thread", fn, *args)
+
+    async def predict_proba(self, loaded_model, features: np.ndarray) -> np.ndarray:
+        """
+        predict_proba med en LoadedModel för en färdig (k, n_features)-matris
+        (efter model_input).
+        """
+        if self.kind == "inline":
+            return loaded_model.model.predict_proba(features)
+        if self.kind == "process":
+            try:
+                return await self._submit(
+                    self._process_pool(loaded_model.path), "process", _worker_predict_proba,
+                    loaded_model.path, loaded_model.signature, self.mmap_mode, features
+                )
+            except _ModelChanged:
+                # Filen har bytts sedan modellen laddades; registret laddar om den snart
+                logger.debug("Model file changed under the process pool, predicting in a thread instead.")
+        return await self._submit(self._thread_pool(), "thread", loaded_model.model.predict_proba, features)
+
+    async def warm(self, loaded_model, features: np.ndarray) -> None:
+        """
+        Ett predict_proba per worker samtidigt, så att alla trådar och processer
+        (med modellen laddad) finns innan första requesten.
+        """
+        await asyncio.gather(*(self.predict_proba(loaded_model, features) for _ in range(self.max_workers)))
+
+    async def stop(self) -> None:
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = None
+        self._processes = None
+
+    def status(self) -> dict:
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "inline_max_rows": self.inline_max_rows,
+            "rejected": compute_rejected_total.value(),
+        }
+
+
+compute_executor = ComputeExecutor(
+    kind=settings.COMPUTE_EXECUTOR_KIND,
+    max_workers=settings.COMPUTE_EXECUTOR_WORKERS,
+    max_pending=settings.COMPUTE_EXECUTOR_MAX_PENDING,
+    inline_max_rows=settings.COMPUTE_INLINE_MAX_ROWS,
+    mmap_mode=settings.MODEL_MMAP_MODE,
+)
@@ -1,6 +1,11 @@
 # app/core/config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from functools import lru_cache
+from pathlib import Path
+from typing import Optional
+
+# backend-mappen, så att sökvägar inte beror på vilken mapp servern startas från
+BACKEND_DIR = Path(__file__).resolve().parents[2]
 
 class Settings(BaseSettings):
     # Läs från .env-filen i backend-mappen (där scriptet troligen körs ifrån)
@@ -12,6 +17,85 @@ class Settings(BaseSettings):
     POSTGRES_PORT: str = "5432" 
     POSTGRES_DB: str
 
+    # Loggnivå för app.*-loggarna; prediktionsvägen loggar på DEBUG
+    LOG_LEVEL: str = "INFO"
+
+    # Prediktionscache (app/core/prediction_cache.py)
+    PREDICTION_CACHE_MAX_ENTRIES: int = 10000
+    PREDICTION_CACHE_TTL_SECONDS: float = 3600
+    # T.ex. redis://localhost:6379/0 för en cache som delas mellan workers
+    PREDICTION_CACHE_URL: Optional[str] = None
+    # Högsta TTL för den lokala cachen (utan PREDICTION_CACHE_URL): andra workers och
+    # CLI:n som skriver matcher räknar inte upp processens vattenstämplar, så det här
+    # är hur länge en inaktuell prediktion som mest kan serveras
+    PREDICTION_CACHE_LOCAL_TTL_SECONDS: float = 5.0
+
+    # Uppvärmning vid start (app/core/warmup.py); GET /health/ready svarar 503 tills den är klar
+    WARMUP_ENABLED: bool = True
+    # Anslutningar som öppnas och får de heta frågorna förberedda (poolens storlek är 5)
+    WARMUP_DB_CONNECTIONS: int = 5
+    # Hur ofta db_pool och model körs om när de har misslyckats (processen är inte redo under tiden)
+    WARMUP_RETRY_SECONDS: float = 5.0
+
+    # Antal rader per COPY/INSERT vid bulkimport av matcher
+    MATCH_IMPORT_CHUNK_SIZE: int = 5000
+
+    # CPU-tunga features och inferens (app/core/compute_executor.py):
+    # "inline", "thread" eller "process" (modellen laddad i varje worker)
+    COMPUTE_EXECUTOR_KIND: str = "thread"
+    COMPUTE_EXECUTOR_WORKERS: int = 4
+    # Jobb som får vänta eller köras samtidigt innan anrop får 503
+    COMPUTE_EXECUTOR_MAX_PENDING: int = 64
+    # Jobb med högst så här många rader körs direkt i eventloopen
+    COMPUTE_INLINE_MAX_ROWS: int = 16
+
+    # Modellregistret (app/core/model_registry.py)
+    # .joblib = sklearn-pipeline, .npz = CompiledScorer (ingen sklearn i servern)
+    MODEL_PATH: str = str(BACKEND_DIR / "ml_models" / "logistic_regression_v1.joblib")
+    # "r" minnesmappar numpy-arrayer i modellen så att workers delar sidorna
+    MODEL_MMAP_MODE: Optional[str] = None
+    # Hur ofta modellfilen kollas efter en ny version, 0 = ingen bevakning
+    MODEL_WATCH_INTERVAL_SECONDS: float = 30.0
+
+    # Kolumnär bild av spelade matcher i minnet (app/core/match_snapshot.py)
+    MATCH_SNAPSHOT_ENABLED: bool = False
+    MATCH_SNAPSHOT_POLL_SECONDS: float = 5.0
+    # Full omladdning fångar ändrade äldre matcher från andra processer, 0 = aldrig
+    MATCH_SNAPSHOT_FULL_RELOAD_SECONDS: float = 600.0
+
+    # Feature-schemat (app/core/feature_engineering.FeatureSchema). Ändras det
+    # måste team_form byggas om och modellen tränas om med samma inställningar.
+    # Formfönster i antal matcher, t.ex. FEATURE_FORM_WINDOWS=[3,5,10]
+    FEATURE_FORM_WINDOWS: list[int] = [5]
+    FEATURE_SEASON_TO_DATE: bool = False
+    # Halveringstid i matcher för ett exponentiellt viktat snitt, None = av
+    FEATURE_DECAY_HALF_LIFE: Optional[float] = None
+
+    # Lagkatalogen (app/core/team_directory.py) fylls om efter så här många sekunder
+    TEAM_DIRECTORY_TTL_SECONDS: float = 300.0
+
+    # Mikrobatchning av inferens (app/core/inference_batcher.py)
+    INFERENCE_BATCHING_ENABLED: bool = True
+    INFERENCE_BATCH_MAX_SIZE: int = 64
+    INFERENCE_BATCH_MAX_WAIT_MS: float = 2.0
+
+    # Liveuppdateringar via GET /matches/stream (app/core/match_events.py)
+    # Antal händelser som får vänta per klient innan en långsam klient kopplas bort
+    MATCH_EVENTS_QUEUE_SIZE: int = 256
+    # Antal kommande matcher per ändring som får nya prediktioner i strömmen
+    MATCH_EVENTS_UPCOMING_FIXTURES: int = 50
+    # LISTEN/NOTIFY-brygga så att händelser når klienter i alla workers
+    MATCH_EVENTS_NOTIFY_ENABLED: bool = False
+    MATCH_EVENTS_CHANNEL: str = "match_events"
+    # Kommentarrad som håller SSE-anslutningen vid liv genom proxyer
+    MATCH_STREAM_KEEPALIVE_SECONDS: float = 15.0
+
+    # Förberäknade prediktioner för kommande matcher (app/core/prediction_scheduler.py).
+    # Slå bara på i EN process, eller kör python -m app.db.precompute_predictions i stället
+    PREDICTION_SCHEDULER_ENABLED: bool = False
+    PREDICTION_SCHEDULER_INTERVAL_SECONDS: float = 60.0
+    PREDICTION_SCHEDULER_BATCH_SIZE: int = 500
+
     # Bygg ihop databas-URL för SQLAlchemy (asynkron version)
     @property
     def ASYNC_DATABASE_URI(self) -> str:
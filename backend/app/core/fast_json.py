@@ -0,0 +1,45 @@
+# app/core/fast_json.py
+"""
+Snabb JSON-kodning för list-endpoints som bygger svaren direkt från
+databasrader (dicts och listor), utan en pydantic-modell per rad.
+
+Med paketet 'orjson' (valfritt beroende) används det, annars json från
+standardbiblioteket. Datum kodas som pydantic gör det (UTC som 'Z'), så
+svaren ser likadana ut som via response_model.
+"""
+import datetime
+import json
+from typing import Any
+
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        text = value.isoformat()
+        return text[:-6] + "Z" if text.endswith("+00:00") else text
+    if isinstance(value, datetime.date):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+    return json.dumps(content, separators=(",", ":"), ensure_ascii=False, default=_default).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse med dumps ovan. Innehållet valideras inte, så den används bara
+    för data som kommer direkt från databasen, med response_model=None och
+    svarsschemat i responses= (OpenAPI tar schemat därifrån för JSONResponse).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
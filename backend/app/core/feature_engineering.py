@@ -1,119 +1,558 @@
-import pandas as pd
+import logging
 import numpy as np
+from dataclasses import dataclass
+from typing import NamedTuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.sql import or_, and_ 
+from sqlalchemy.sql import or_, and_, func, union_all
 from app.models.match import Match as MatchModel
 from app.models.team import Team as TeamModel
+from app.models.team_form import TeamForm as TeamFormModel
+from app.models.team_rating import TeamRating as TeamRatingModel
+from app.core.config import settings
+from app.core.ratings import INITIAL_RATING
+from app.core.metrics import prediction_stage_seconds
+from app.core.compute_executor import compute_executor
 
-# Antal matcher bakåt vi tittar på för rullande medelvärden 
+logger = logging.getLogger(__name__)
+
+# Antal matcher bakåt vi tittar på för rullande medelvärden
 FORM_WINDOW = 5
 
-async def get_team_recent_matches(db: AsyncSession, team_id: int, limit: int = FORM_WINDOW) -> pd.DataFrame:
+# Features som används när ett lag saknar spelade matcher
+DEFAULT_TEAM_FEATURES = {
+    "avg_goals_scored": 1.0,
+    "avg_goals_conceded": 1.0,
+    "form_points": 1.0
+}
+TEAM_FEATURE_NAMES = list(DEFAULT_TEAM_FEATURES)
+
+# Kolumnordningen i match-arrayerna som feature-kärnan arbetar på
+MATCH_COLUMNS = ['home_team_id', 'away_team_id', 'home_score', 'away_score']
+
+# Höjs när beräkningen bakom ett befintligt feature-namn ändras, så att äldre
+# modeller inte längre godkänns vid laddning (se model_registry.feature_columns)
+FEATURE_SCHEMA_VERSION = 1
+
+
+@dataclass(frozen=True)
+class FeatureSchema:
     """
-    Hämtar de senaste 'limit' spelade matcherna för ett givet lag.
+    Vilka form-features som räknas fram och i vilken ordning de ligger.
+
+    Varje block ger de tre lag-featurena i TEAM_FEATURE_NAMES: ett block per
+    fönster i 'windows' (de senaste N matcherna), ett för säsongen hittills
+    (lagets matcher i säsongen för dess senaste match) om season_to_date, och
+    ett exponentiellt viktat snitt över det största fönstret om decay_half_life
+    (halveringstid i antal matcher) är satt. Alla block räknas från EN hämtning
+    av det största fönstret per lag (plus resten av säsongen).
+
+    I match-matrisen blir varje block sex kolumner i build_feature_vector-ordning
+    och Elo-skillnaden ligger sist. Standardschemat (ett fönster på FORM_WINDOW)
+    ger samma sju kolumner som modeller tränade före schemat.
     """
-    stmt = (
-        select(
-            MatchModel.match_date,
-            MatchModel.home_team_id,
-            MatchModel.away_team_id,
-            MatchModel.home_score,
-            MatchModel.away_score
+    windows: tuple[int, ...] = (FORM_WINDOW,)
+    season_to_date: bool = False
+    decay_half_life: Optional[float] = None
+
+    def __post_init__(self):
+        if not self.windows or any(window < 1 for window in self.windows):
+            raise ValueError("Feature schema needs at least one form window of 1 or more matches.")
+        if self.decay_half_life is not None and self.decay_half_life <= 0:
+            raise ValueError("decay_half_life must be positive.")
+
+    @classmethod
+    def from_settings(cls, config) -> "FeatureSchema":
+        return cls(
+            windows=tuple(config.FEATURE_FORM_WINDOWS),
+            season_to_date=config.FEATURE_SEASON_TO_DATE,
+            decay_half_life=config.FEATURE_DECAY_HALF_LIFE,
         )
-        .filter(
-            or_(MatchModel.home_team_id == team_id, MatchModel.away_team_id == team_id),
-            MatchModel.status == 'FINISHED' 
+
+    @property
+    def version(self) -> int:
+        return FEATURE_SCHEMA_VERSION
+
+    @property
+    def fetch_window(self) -> int:
+        # Antal senaste matcher per lag som måste hämtas (utöver säsongen)
+        return max(self.windows)
+
+    @property
+    def blocks(self) -> list[str]:
+        blocks = [f"w{window}" for window in self.windows]
+        if self.season_to_date:
+            blocks.append("season")
+        if self.decay_half_life is not None:
+            blocks.append(f"decay{self.decay_half_life:g}")
+        return blocks
+
+    @property
+    def key(self) -> str:
+        # Lagras i team_form, så att rader byggda för ett annat schema känns igen
+        return f"v{self.version}:" + ",".join(self.blocks)
+
+    @property
+    def team_feature_names(self) -> list[str]:
+        return [f"{name}_{block}" for block in self.blocks for name in TEAM_FEATURE_NAMES]
+
+    @property
+    def feature_names(self) -> list[str]:
+        names = []
+        for block in self.blocks:
+            names += [
+                f"home_avg_goals_scored_{block}", f"home_avg_goals_conceded_{block}",
+                f"away_avg_goals_scored_{block}", f"away_avg_goals_conceded_{block}",
+                f"home_form_points_{block}", f"away_form_points_{block}",
+            ]
+        return names + ["rating_difference"]
+
+    def to_dict(self) -> dict:
+        """
+        Sparas med modellen (training.train_model) och jämförs vid laddning.
+        """
+        return {"version": self.version, "key": self.key, "names": self.feature_names}
+
+
+# Schemat som servern räknar fram, styrs av FEATURE_* i config
+feature_schema = FeatureSchema.from_settings(settings)
+
+
+class RecentMatches(NamedTuple):
+    """
+    Senaste matcherna för flera lag i array-form.
+    team_ids: (T,) lagens id, sorterade
+    matches: (M, 4) int-array med kolumnerna i MATCH_COLUMNS, äldsta matchen först per lag
+    owners: (M,) index i team_ids för laget som raden tillhör
+    seasons: (M,) heltalskod för matchens säsong (samma kod = samma säsong)
+    """
+    team_ids: np.ndarray
+    matches: np.ndarray
+    owners: np.ndarray
+    seasons: np.ndarray
+
+
+class TeamFeatures(NamedTuple):
+    """
+    Features för flera lag i array-form.
+    team_ids: (T,) lagens id, sorterade
+    features: (T, F) float-array i ordningen schema.team_feature_names
+    has_history: (T,) True om laget har minst en spelad match
+    ratings: (T,) Elo-rating (INITIAL_RATING för lag utan spelade matcher)
+    """
+    team_ids: np.ndarray
+    features: np.ndarray
+    has_history: np.ndarray
+    ratings: np.ndarray
+
+    def positions(self, team_ids) -> np.ndarray:
+        return np.searchsorted(self.team_ids, team_ids)
+
+
+def points_from_goals(goals_scored: np.ndarray, goals_conceded: np.ndarray) -> np.ndarray:
+    """
+    Poäng per match: sign 1 = vinst, 0 = oavgjort, -1 = förlust -> 3, 1, 0 poäng.
+    """
+    result_sign = np.sign(goals_scored - goals_conceded)
+    return 1 + result_sign + (result_sign > 0)
+
+
+def compute_form_features(team_ids: np.ndarray, matches: np.ndarray, owners: np.ndarray) -> np.ndarray:
+    """
+    Vektoriserad feature-kärna: beräknar snitt av gjorda mål, insläppta mål och
+    poäng för ett eller flera lag på en gång, utan radvisa Python-loopar.
+    matches är en (M, 4) int-array med kolumnerna i MATCH_COLUMNS och owners
+    anger (som index i team_ids) vilket lag varje rad gäller.
+    Returnerar en (T, 3) float-array i ordningen TEAM_FEATURE_NAMES.
+    Lag utan matcher får DEFAULT_TEAM_FEATURES (1.0).
+    """
+    team_ids = np.asarray(team_ids)
+    matches = np.asarray(matches).reshape(-1, len(MATCH_COLUMNS))
+    owners = np.asarray(owners, dtype=np.intp)
+    n_teams = len(team_ids)
+
+    values = team_match_values(team_ids[owners], matches)
+
+    counts = np.bincount(owners, minlength=n_teams)
+    sums = np.stack([
+        np.bincount(owners, weights=values[:, column], minlength=n_teams) for column in range(3)
+    ], axis=1)
+
+    features = np.tile(np.array(list(DEFAULT_TEAM_FEATURES.values()), dtype=np.float64), (n_teams, 1))
+    has_matches = counts > 0
+    features[has_matches] = sums[has_matches] / counts[has_matches, None]
+    return features
+
+
+def team_match_values(row_team_ids: np.ndarray, matches: np.ndarray) -> np.ndarray:
+    """
+    (M, 3) float-array med gjorda mål, insläppta mål och poäng ur lagets
+    perspektiv, där row_team_ids anger vilket lag varje rad i matches gäller.
+    """
+    home_ids, home_scores, away_scores = matches[:, 0], matches[:, 2], matches[:, 3]
+    is_home = home_ids == row_team_ids
+    goals_scored = np.where(is_home, home_scores, away_scores)
+    goals_conceded = np.where(is_home, away_scores, home_scores)
+    return np.column_stack([
+        goals_scored, goals_conceded, points_from_goals(goals_scored, goals_conceded)
+    ]).astype(np.float64)
+
+
+def season_run_starts(is_group_start: np.ndarray, seasons: np.ndarray) -> np.ndarray:
+    """
+    För rader grupperade per lag (äldst först): index för första raden i samma
+    lag och säsong. is_group_start markerar första raden för varje lag.
+    """
+    positions = np.arange(len(seasons))
+    is_run_start = np.asarray(is_group_start, dtype=bool).copy()
+    is_run_start[1:] |= seasons[1:] != seasons[:-1]
+    return np.maximum.accumulate(np.where(is_run_start, positions, 0))
+
+
+def window_features(
+    values: np.ndarray,
+    starts: np.ndarray,
+    ends: np.ndarray,
+    run_starts: np.ndarray,
+    schema: FeatureSchema
+) -> np.ndarray:
+    """
+    Feature-kärnan för ett FeatureSchema. values är (M, 3) från team_match_values,
+    grupperade per lag och äldsta matchen först. För varje fråga p räknas alla
+    block över lagets rader [starts[p], ends[p]), dvs. matcherna FÖRE ends[p]:
+    fönstren och säsongen är differenser av EN kumulativ summa, det viktade
+    snittet summerar de senaste fetch_window raderna med vikten
+    0.5 ** (ålder / decay_half_life). run_starts kommer från season_run_starts.
+    Returnerar (P, 3 * len(schema.blocks)); block utan matcher får DEFAULT_TEAM_FEATURES.
+    """
+    starts = np.asarray(starts, dtype=np.intp)
+    ends = np.asarray(ends, dtype=np.intp)
+    default = np.array(list(DEFAULT_TEAM_FEATURES.values()), dtype=np.float64)
+    cumulative = np.vstack([np.zeros((1, 3)), np.cumsum(values, axis=0)])
+
+    def averages(sums, weights):
+        block = np.tile(default, (len(ends), 1))
+        has_matches = weights > 0
+        block[has_matches] = sums[has_matches] / weights[has_matches, None]
+        return block
+
+    def window_averages(block_starts):
+        return averages(cumulative[ends] - cumulative[block_starts], (ends - block_starts).astype(np.float64))
+
+    blocks = [window_averages(np.maximum(starts, ends - window)) for window in schema.windows]
+
+    if schema.season_to_date:
+        # Säsongen för lagets senaste match före frågan
+        has_history = ends > starts
+        last_rows = np.where(has_history, ends - 1, 0)
+        season_starts = np.where(has_history, run_starts[last_rows] if len(run_starts) else 0, starts)
+        blocks.append(window_averages(np.maximum(starts, season_starts)))
+
+    if schema.decay_half_life is not None:
+        ratio = 0.5 ** (1 / schema.decay_half_life)
+        sums = np.zeros((len(ends), 3))
+        weights = np.zeros(len(ends))
+        for age in range(schema.fetch_window):
+            rows = ends - 1 - age
+            valid = rows >= starts
+            sums[valid] += ratio ** age * values[rows[valid]]
+            weights[valid] += ratio ** age
+        blocks.append(averages(sums, weights))
+
+    return np.hstack(blocks)
+
+
+def compute_schema_features(
+    team_ids: np.ndarray,
+    matches: np.ndarray,
+    owners: np.ndarray,
+    seasons: np.ndarray,
+    schema: Optional[FeatureSchema] = None
+) -> np.ndarray:
+    """
+    Features enligt schemat för flera lag ur en hämtning i RecentMatches-form
+    (raderna grupperade per lag i stigande owners-ordning, äldsta matchen först).
+    Returnerar en (T, F) float-array i ordningen schema.team_feature_names.
+    """
+    schema = schema or feature_schema
+    team_ids = np.asarray(team_ids)
+    matches = np.asarray(matches).reshape(-1, len(MATCH_COLUMNS))
+    owners = np.asarray(owners, dtype=np.intp)
+
+    counts = np.bincount(owners, minlength=len(team_ids))
+    ends = np.cumsum(counts)
+    starts = ends - counts
+    is_group_start = np.zeros(len(matches), dtype=bool)
+    is_group_start[starts[counts > 0]] = True
+
+    values = team_match_values(team_ids[owners], matches)
+    run_starts = season_run_starts(is_group_start, np.asarray(seasons))
+    return window_features(values, starts, ends, run_starts, schema)
+
+
+def _as_match_array(team_matches) -> np.ndarray:
+    """
+    Tar emot en (k, 4) array eller en DataFrame med kolumnerna i MATCH_COLUMNS
+    och returnerar en int-array utan att ändra indata.
+    """
+    if hasattr(team_matches, 'to_numpy'):
+        if len(team_matches) == 0:
+            return np.empty((0, len(MATCH_COLUMNS)), dtype=np.int64)
+        return team_matches[MATCH_COLUMNS].to_numpy(dtype=np.int64)
+    return np.asarray(team_matches, dtype=np.int64).reshape(-1, len(MATCH_COLUMNS))
+
+
+def recent_matches_statement(team_id: int, limit: int = FORM_WINDOW):
+    """
+    Frågan bakom get_team_recent_matches, skriven som UNION ALL av en hemma- och
+    en bortagren med egen LIMIT, så att varje gren kan använda sitt partiella
+    index (se app/models/match.py) istället för ett OR-filter över hela tabellen.
+    """
+    def branch(team_column):
+        return (
+            select(
+                MatchModel.match_date,
+                MatchModel.home_team_id,
+                MatchModel.away_team_id,
+                MatchModel.home_score,
+                MatchModel.away_score
+            )
+            .filter(
+                team_column == team_id,
+                MatchModel.status == 'FINISHED',
+                MatchModel.home_score.is_not(None),
+                MatchModel.away_score.is_not(None)
+            )
+            .order_by(MatchModel.match_date.desc())
+            .limit(limit)
+            .subquery()
         )
-        .order_by(MatchModel.match_date.desc()) 
+
+    home_branch = branch(MatchModel.home_team_id)
+    away_branch = branch(MatchModel.away_team_id)
+    recent = union_all(select(home_branch), select(away_branch)).subquery()
+
+    return (
+        select(*(recent.c[name] for name in MATCH_COLUMNS))
+        .order_by(recent.c.match_date.desc())
         .limit(limit)
     )
-    result = await db.execute(stmt)
-    matches = result.all() 
 
-    # Konvertera till DataFrame
-    df = pd.DataFrame(matches, columns=['match_date', 'home_team_id', 'away_team_id', 'home_score', 'away_score'])
-    # Sortera igen med äldsta matchen först för rullande beräkningar
-    return df.sort_values(by='match_date', ascending=True)
+
+async def get_team_recent_matches(db: AsyncSession, team_id: int, limit: int = FORM_WINDOW) -> np.ndarray:
+    """
+    Hämtar de senaste 'limit' spelade matcherna för ett givet lag.
+    Returnerar en (k, 4) int-array med kolumnerna i MATCH_COLUMNS, äldsta matchen först.
+    """
+    result = await db.execute(recent_matches_statement(team_id, limit))
+    matches = result.all()
+
+    # Vänd ordningen så att äldsta matchen kommer först för rullande beräkningar
+    return np.array(matches[::-1], dtype=np.int64).reshape(-1, len(MATCH_COLUMNS))
 
 
-def calculate_features_for_team(team_id: int, team_matches_df: pd.DataFrame) -> dict:
+async def get_recent_matches_for_teams(
+    db: AsyncSession,
+    team_ids: list[int],
+    limit: int = FORM_WINDOW,
+    season_to_date: bool = False
+) -> RecentMatches:
     """
-    Beräknar features för ETT lag baserat på dess senaste matcher.
-    team_matches_df ska vara sorterad med äldsta matchen först.
-    """
-    if team_matches_df.empty or len(team_matches_df) == 0:
-        print(f"Warning: No historical matches found for team_id {team_id} to calculate features. Returning defaults.")
-        return {
-            "avg_goals_scored": 1.0, 
-            "avg_goals_conceded": 1.0, 
-            "form_points": 1.0 
-        }
-
-    # Skapar kolumner för gjorda mål, insläppta mål och poäng för DETTA LAG
-    team_matches_df['goals_scored'] = np.where(
-        team_matches_df['home_team_id'] == team_id, 
-        team_matches_df['home_score'], 
-        team_matches_df['away_score']
+    Hämtar de senaste 'limit' spelade matcherna för flera lag i EN fråga.
+    Varje match blir en rad per deltagande lag och numreras med ROW_NUMBER()
+    partitionerat på lag, så att bara de 'limit' senaste per lag behålls.
+    Med season_to_date behålls dessutom alla lagets matcher i säsongen för
+    dess senaste match (FIRST_VALUE i samma fönster), för säsongsblocket i FeatureSchema.
+    """
+    distinct_ids = np.array(sorted(set(team_ids)), dtype=np.int64)
+    if len(distinct_ids) == 0:
+        return RecentMatches(
+            distinct_ids,
+            np.empty((0, len(MATCH_COLUMNS)), dtype=np.int64),
+            np.empty(0, dtype=np.intp),
+            np.empty(0, dtype=np.intp)
+        )
+
+    id_list = distinct_ids.tolist()
+    match_columns = (
+        MatchModel.match_date,
+        MatchModel.season,
+        MatchModel.home_team_id,
+        MatchModel.away_team_id,
+        MatchModel.home_score,
+        MatchModel.away_score
     )
-    team_matches_df['goals_conceded'] = np.where(
-        team_matches_df['home_team_id'] == team_id, 
-        team_matches_df['away_score'], 
-        team_matches_df['home_score']
+    finished = and_(
+        MatchModel.status == 'FINISHED',
+        MatchModel.home_score.is_not(None),
+        MatchModel.away_score.is_not(None)
     )
+    appearances = union_all(
+        select(MatchModel.home_team_id.label('team_id'), *match_columns)
+        .filter(MatchModel.home_team_id.in_(id_list), finished),
+        select(MatchModel.away_team_id.label('team_id'), *match_columns)
+        .filter(MatchModel.away_team_id.in_(id_list), finished),
+    ).subquery()
 
-    def get_points(row_team_id, row_home_id, row_away_id, row_home_score, row_away_score):
-        if row_team_id == row_home_id: 
-            if row_home_score > row_away_score: return 3
-            if row_home_score == row_away_score: return 1
-            return 0
-        else: # Laget är bortalag
-            if row_away_score > row_home_score: return 3
-            if row_away_score == row_home_score: return 1
-            return 0
-
-    team_matches_df['points'] = team_matches_df.apply(
-        lambda row: get_points(team_id, row['home_team_id'], row['away_team_id'], row['home_score'], row['away_score']), 
-        axis=1
+    latest_first = {'partition_by': appearances.c.team_id, 'order_by': appearances.c.match_date.desc()}
+    ranked = select(
+        appearances,
+        func.row_number().over(**latest_first).label('rn'),
+        func.first_value(appearances.c.season).over(**latest_first).label('latest_season')
+    ).subquery()
+
+    keep = ranked.c.rn <= limit
+    if season_to_date:
+        keep = or_(keep, ranked.c.season == ranked.c.latest_season)
+    stmt = (
+        select(ranked.c.team_id, *(ranked.c[name] for name in MATCH_COLUMNS), ranked.c.season)
+        .filter(keep)
+        .order_by(ranked.c.team_id, ranked.c.match_date.asc())
     )
+    result = await db.execute(stmt)
+    rows = result.all()
+    numbers = np.array([row[:-1] for row in rows], dtype=np.int64).reshape(-1, len(MATCH_COLUMNS) + 1)
+    _, seasons = np.unique(np.array([row[-1] for row in rows], dtype=object), return_inverse=True)
 
-    # Beräkna rullande medelvärden för de senaste matcherna (exklusive den "aktuella" om det vore en ny match)
-    # Eftersom vi här beräknar formen *inför* en ny match, använder vi all data vi har.
-    avg_goals_scored = team_matches_df['goals_scored'].mean()
-    avg_goals_conceded = team_matches_df['goals_conceded'].mean()
-    form_points = team_matches_df['points'].mean() # Snittpoäng från de senaste matcherna
+    owners = np.searchsorted(distinct_ids, numbers[:, 0])
+    return RecentMatches(distinct_ids, numbers[:, 1:], owners, seasons.reshape(-1))
+
+
+async def get_team_features(
+    db: AsyncSession,
+    team_ids: list[int],
+    schema: Optional[FeatureSchema] = None
+) -> TeamFeatures:
+    """
+    Läser förberäknade features från team_form och Elo-rating från team_ratings
+    (outer join): en rad per lag, en fråga oavsett hur mycket matchhistorik
+    som finns. Lag utan rad får DEFAULT_TEAM_FEATURES och INITIAL_RATING.
+    Rader byggda för ett annat schema (konfigurationen ändrad men team_form
+    inte ombyggd) räknas om från matches med en extra fråga.
+    """
+    schema = schema or feature_schema
+    distinct_ids = np.array(sorted(set(team_ids)), dtype=np.int64)
+    default = np.tile(np.array(list(DEFAULT_TEAM_FEATURES.values()), dtype=np.float64), len(schema.blocks))
+    features = np.tile(default, (len(distinct_ids), 1))
+    has_history = np.zeros(len(distinct_ids), dtype=bool)
+    ratings = np.full(len(distinct_ids), INITIAL_RATING)
+    if len(distinct_ids) == 0:
+        return TeamFeatures(distinct_ids, features, has_history, ratings)
 
-    return {
-        "avg_goals_scored": avg_goals_scored if pd.notna(avg_goals_scored) else 1.0,
-        "avg_goals_conceded": avg_goals_conceded if pd.notna(avg_goals_conceded) else 1.0,
-        "form_points": form_points if pd.notna(form_points) else 1.0,
-    }
+    stmt = (
+        select(
+            TeamFormModel.team_id,
+            TeamFormModel.matches_counted,
+            TeamFormModel.feature_schema,
+            TeamFormModel.features,
+            TeamRatingModel.rating
+        )
+        .outerjoin(TeamRatingModel, TeamRatingModel.team_id == TeamFormModel.team_id)
+        .filter(TeamFormModel.team_id.in_(distinct_ids.tolist()))
+    )
+    result = await db.execute(stmt)
+    stale_team_ids = []
+    for team_id, matches_counted, schema_key, values, rating in result.all():
+        position = np.searchsorted(distinct_ids, team_id)
+        if rating is not None:
+            ratings[position] = rating
+        if matches_counted == 0:
+            continue
+        if schema_key != schema.key:
+            stale_team_ids.append(team_id)
+            continue
+        features[position] = values
+        has_history[position] = True
+
+    if stale_team_ids:
+        if schema.key not in _stale_schema_warnings:
+            _stale_schema_warnings.add(schema.key)
+            logger.warning(
+                "team_form was built for another feature schema than %s; computing features from matches "
+                "until it is rebuilt (python -m app.db.rebuild_team_form).", schema.key
+            )
+        recent = await get_recent_matches_for_teams(db, stale_team_ids, schema.fetch_window, schema.season_to_date)
+        positions = np.searchsorted(distinct_ids, recent.team_ids)
+        features[positions] = await compute_executor.run(
+            compute_schema_features, recent.team_ids, recent.matches, recent.owners, recent.seasons, schema,
+            rows=len(recent.matches)
+        )
+        has_history[positions] = np.bincount(recent.owners, minlength=len(recent.team_ids)) > 0
+
+    return TeamFeatures(distinct_ids, features, has_history, ratings)
+
+
+# Scheman som det redan varnats för att team_form inte är ombyggd för
+_stale_schema_warnings: set[str] = set()
+
+
+async def _load_team_features(db: AsyncSession, team_ids: list[int], snapshot) -> TeamFeatures:
+    if snapshot is not None:
+        with prediction_stage_seconds.time(stage="snapshot_fetch"):
+            return await compute_executor.run(snapshot.team_features, team_ids, rows=len(team_ids))
+    with prediction_stage_seconds.time(stage="db_fetch"):
+        return await get_team_features(db, team_ids)
+
+
+def calculate_features_for_team(team_id: int, team_matches) -> dict:
+    """
+    Beräknar features för ETT lag baserat på dess senaste matcher.
+    team_matches är en (k, 4) array (eller DataFrame) med kolumnerna i MATCH_COLUMNS.
+    Indata ändras inte.
+    """
+    matches = _as_match_array(team_matches)
+    if len(matches) == 0:
+        logger.warning("No historical matches found for team_id %s to calculate features. Returning defaults.", team_id)
+        return dict(DEFAULT_TEAM_FEATURES)
+
+    # Eftersom vi här beräknar formen *inför* en ny match, använder vi all data vi har.
+    features = compute_form_features(
+        np.array([team_id]), matches, np.zeros(len(matches), dtype=np.intp)
+    )[0]
+    return dict(zip(TEAM_FEATURE_NAMES, features))
 
 
 async def generate_features_for_prediction(
-    db: AsyncSession, 
-    home_team_id: int, 
-    away_team_id: int
+    db: AsyncSession,
+    home_team_id: int,
+    away_team_id: int,
+    snapshot=None
 ) -> np.ndarray | None:
     """
     Genererar feature-vektorn för en given match mellan home_team_id och away_team_id.
+    Med en aktuell MatchSnapshot (app/core/match_snapshot.py) läses formen ur
+    minnet, annars från team_form.
     Returnerar en NumPy-array med features i rätt ordning, eller None om features inte kan skapas.
     """
-    print(f"Generating features for match between home_id={home_team_id} and away_id={away_team_id}")
+    logger.debug("Generating features for match between home_id=%s and away_id=%s", home_team_id, away_team_id)
+
+    team_features = await _load_team_features(db, [home_team_id, away_team_id], snapshot)
+
+    with prediction_stage_seconds.time(stage="features"):
+        home_index, away_index = team_features.positions([home_team_id, away_team_id])
+
+        if not team_features.has_history[home_index] and not team_features.has_history[away_index]:
+            # Om ingen data finns för något av lagen kan vi inte skapa meningsfulla features
+            logger.debug(
+                "Could not generate features: Insufficient historical data for both teams %s and %s.",
+                home_team_id, away_team_id
+            )
+            # Alternativt, returnera en vektor med genomsnittliga ligavärden eller liknande. För demon: None.
+            return None
 
-    home_team_matches_df = await get_team_recent_matches(db, home_team_id, limit=FORM_WINDOW)
-    away_team_matches_df = await get_team_recent_matches(db, away_team_id, limit=FORM_WINDOW)
+        feature_vector = build_feature_matrix(
+            team_features.features, [home_index], [away_index], team_features.ratings
+        )[0]
 
-    if home_team_matches_df.empty and away_team_matches_df.empty :
-        # Om ingen data finns för något av lagen kan vi inte skapa meningsfulla features
-        print(f"  Could not generate features: Insufficient historical data for both teams {home_team_id} and {away_team_id}.")
-        # Alternativt, returnera en vektor med genomsnittliga ligavärden eller liknande. För demon: None.
-        return None 
+    logger.debug("Generated feature vector: %s", feature_vector)
+    return feature_vector
 
-    home_features = calculate_features_for_team(home_team_id, home_team_matches_df)
-    away_features = calculate_features_for_team(away_team_id, away_team_matches_df)
 
-    feature_vector = np.array([
+def build_feature_vector(home_features: dict, away_features: dict) -> np.ndarray:
+    """
+    Sätter ihop feature-vektorn i samma ordning som modellen tränats på.
+    """
+    return np.array([
         home_features["avg_goals_scored"],
         home_features["avg_goals_conceded"],
         away_features["avg_goals_scored"],
@@ -122,5 +561,70 @@ async def generate_features_for_prediction(
         away_features["form_points"]
     ])
 
-    print(f"  Generated feature vector: {feature_vector}")
-    return feature_vector
+
+def build_feature_matrix(
+    team_features: np.ndarray,
+    home_index: np.ndarray,
+    away_index: np.ndarray,
+    ratings: np.ndarray
+) -> np.ndarray:
+    """
+    Bygger en (N, 6B + 1) feature-matris från en (T, 3B) array med lag-features
+    (B block enligt FeatureSchema), (T,) Elo-ratingar och index för hemma- respektive
+    bortalag. Varje block blir sex kolumner i samma ordning som build_feature_vector
+    och ratingskillnaden (hemma - borta) ligger sist, se FeatureSchema.feature_names.
+    """
+    n_rows, n_blocks = len(home_index), team_features.shape[1] // 3
+    home = team_features[home_index].reshape(n_rows, n_blocks, 3)
+    away = team_features[away_index].reshape(n_rows, n_blocks, 3)
+    blocks = np.stack([
+        home[:, :, 0], home[:, :, 1], away[:, :, 0], away[:, :, 1], home[:, :, 2], away[:, :, 2]
+    ], axis=2).reshape(n_rows, 6 * n_blocks)
+    rating_difference = ratings[home_index] - ratings[away_index]
+    return np.column_stack([blocks, rating_difference])
+
+
+async def generate_features_for_batch(
+    db: AsyncSession,
+    fixtures: list[tuple[int, int]],
+    snapshot=None
+) -> tuple[np.ndarray, list[int], dict[int, str]]:
+    """
+    Genererar features för flera matcher (home_team_id, away_team_id) på en gång.
+    Alla inblandade lags förberäknade form hämtas med EN fråga.
+    Returnerar (feature-matris N x F för de giltiga matcherna, index för de giltiga
+    matcherna i 'fixtures', dict index -> felmeddelande för de ogiltiga).
+    """
+    team_ids = [team_id for fixture in fixtures for team_id in fixture]
+    team_features = await _load_team_features(db, team_ids, snapshot)
+
+    with prediction_stage_seconds.time(stage="features"):
+        # Stora batcher räknas i compute_executor, så eventloopen inte blockeras
+        return await compute_executor.run(_batch_feature_matrix, team_features, fixtures, rows=len(fixtures))
+
+
+def _batch_feature_matrix(
+    team_features: TeamFeatures,
+    fixtures: list[tuple[int, int]]
+) -> tuple[np.ndarray, list[int], dict[int, str]]:
+    has_history = team_features.has_history
+    position = {int(team_id): i for i, team_id in enumerate(team_features.team_ids)}
+
+    valid_indices = []
+    errors = {}
+    for index, (home_team_id, away_team_id) in enumerate(fixtures):
+        if home_team_id == away_team_id:
+            errors[index] = "Home team and away team cannot be the same."
+            continue
+        if not has_history[position[home_team_id]] and not has_history[position[away_team_id]]:
+            errors[index] = (
+                f"Could not generate features: Insufficient historical data for both teams "
+                f"{home_team_id} and {away_team_id}."
+            )
+            continue
+        valid_indices.append(index)
+
+    home_index = np.array([position[fixtures[i][0]] for i in valid_indices], dtype=np.intp)
+    away_index = np.array([position[fixtures[i][1]] for i in valid_indices], dtype=np.intp)
+    feature_matrix = build_feature_matrix(team_features.features, home_index, away_index, team_features.ratings)
+    return feature_matrix, valid_indices, errors
@@ -0,0 +1,151 @@
+# app/core/inference_batcher.py
+import asyncio
+import time
+from typing import Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.compute_executor import ComputeSaturated, compute_executor
+from app.core.metrics import Histogram
+from app.core.model_registry import LoadedModel
+
+
+class _PendingRequest:
+    __slots__ = ("loaded_model", "features", "future")
+
+    def __init__(self, loaded_model: LoadedModel, features: np.ndarray, future: asyncio.Future):
+        self.loaded_model = loaded_model
+        self.features = features
+        self.future = future
+
+
+class MicroBatcher:
+    """
+    Samlar feature-vektorer från samtidiga requests och kör ett predict_proba
+    på den staplade matrisen, istället för ett anrop per request.
+
+    Är kön tom och ingen körning pågår körs anropet direkt (ingen väntetid).
+    Medan en körning pågår i compute_executor köas nya requests; de samlas i upp
+    till max_wait_seconds eller max_batch_size rader och körs sedan tillsammans.
+    Varje request får tillbaka sina egna rader. Kön rymmer högst max_queued
+    requests; är den full kastas ComputeSaturated (503) direkt.
+    """
+    def __init__(self, max_batch_size: int, max_wait_seconds: float, enabled: bool = True, max_queued: int = 0):
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+        self.max_queued = max_queued
+        self.enabled = enabled
+        self.bypassed = 0
+        self.batch_size_histogram = Histogram(
+            "inference_batch_size", "Rows per predict_proba call",
+            [1, 2, 4, 8, 16, 32, 64, 128, 256, 512],
+        )
+        self.batch_latency_histogram = Histogram(
+            "inference_batch_seconds", "Wall time per predict_proba call",
+            [0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0],
+        )
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_task: Optional[asyncio.Task] = None
+        self._running = 0
+
+    async def _execute(self, loaded_model: LoadedModel, features: np.ndarray) -> np.ndarray:
+        self._running += 1
+        started = time.perf_counter()
+        try:
+            return await compute_executor.predict_proba(loaded_model, features)
+        finally:
+            self._running -= 1
+            self.batch_size_histogram.observe(len(features))
+            self.batch_latency_histogram.observe(time.perf_counter() - started)
+
+    async def _run_batch(self, batch: list[_PendingRequest]) -> None:
+        # En omladdning kan ge två modellversioner i samma fönster; kör en gång per modell
+        by_model: dict[int, list[_PendingRequest]] = {}
+        for request in batch:
+            by_model.setdefault(id(request.loaded_model), []).append(request)
+
+        for requests in by_model.values():
+            stacked = np.vstack([request.features for request in requests])
+            try:
+                probabilities = await self._execute(requests[0].loaded_model, stacked)
+            except Exception as e:
+                for request in requests:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+            offset = 0
+            for request in requests:
+                rows = len(request.features)
+                if not request.future.done():
+                    request.future.set_result(probabilities[offset:offset + rows])
+                offset += rows
+
+    async def _worker(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            rows = len(batch[0].features)
+            deadline = loop.time() + self.max_wait_seconds
+            while rows < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(request)
+                rows += len(request.features)
+            await self._run_batch(batch)
+
+    async def predict_proba(self, loaded_model: LoadedModel, features: np.ndarray) -> np.ndarray:
+        """
+        predict_proba för en (k, n_features)-matris via batchern.
+        """
+        features = loaded_model.model_input(features)
+        if not self.enabled:
+            return await self._execute(loaded_model, features)
+
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queued)
+        if self._queue.empty() and self._running == 0:
+            self.bypassed += 1
+            return await self._execute(loaded_model, features)
+
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker())
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait(_PendingRequest(loaded_model, features, future))
+        except asyncio.QueueFull:
+            raise ComputeSaturated(f"Inference queue is full ({self.max_queued} requests), try again later.")
+        return await future
+
+    async def stop(self) -> None:
+        if self._worker_task is not None:
+            self._worker_task.cancel()
+            try:
+                await self._worker_task
+            except asyncio.CancelledError:
+                pass
+            self._worker_task = None
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_seconds": self.max_wait_seconds,
+            "bypassed": self.bypassed,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "batch_size": self.batch_size_histogram.snapshot(),
+            "batch_seconds": self.batch_latency_histogram.snapshot(),
+        }
+
+
+inference_batcher = MicroBatcher(
+    max_batch_size=settings.INFERENCE_BATCH_MAX_SIZE,
+    max_wait_seconds=settings.INFERENCE_BATCH_MAX_WAIT_MS / 1000,
+    enabled=settings.INFERENCE_BATCHING_ENABLED,
+    max_queued=settings.COMPUTE_EXECUTOR_MAX_PENDING,
+)
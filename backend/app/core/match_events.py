@@ -0,0 +1,287 @@
+# app/core/match_events.py
+"""
+Liveuppdateringar av matcher till GET /matches/stream (server-sent events).
+
+crud_match publicerar efter varje commit som skapar, ändrar eller raderar
+matcher. Varje ändring kodas EN gång till en SSE-ram som delas av alla
+prenumeranter. Har lagens form ändrats räknas prediktionerna för lagens
+kommande matcher om, också en gång, och skickas som egna händelser.
+
+Varje prenumerant har en begränsad kö. En klient som inte hinner läsa (kön är
+full) kopplas bort i stället för att hålla uppe de andra eller växa i minnet;
+klienten får ansluta igen och hämta läget med GET /matches/.
+
+Med flera workers (MATCH_EVENTS_NOTIFY_ENABLED) skickas varje händelse även
+med Postgres NOTIFY. Alla workers lyssnar (LISTEN) på kanalen och lägger
+händelser från andra workers i sina egna köer.
+"""
+import asyncio
+import datetime
+import json
+import logging
+import uuid
+from typing import Iterable, Optional
+
+from sqlalchemy.future import select
+from sqlalchemy.sql import or_
+
+from app.core.config import settings
+from app.core.feature_engineering import generate_features_for_batch
+from app.core.inference_batcher import inference_batcher
+from app.core.match_snapshot import match_snapshot_store
+from app.core.metrics import Counter
+from app.core.model_registry import model_registry, probabilities_to_output
+from app.core.prediction_cache import prediction_cache
+from app.models.match import Match as MatchModel
+
+logger = logging.getLogger(__name__)
+
+# Fälten i en match-händelse (samma som MatchRead utan lagobjekten)
+MATCH_EVENT_FIELDS = (
+    "id", "match_date", "league", "season", "home_team_id", "away_team_id",
+    "status", "home_score", "away_score"
+)
+# NOTIFY-payload får vara högst 8000 byte i Postgres
+MAX_NOTIFY_PAYLOAD_BYTES = 7900
+
+match_events_published = Counter(
+    "match_events_published_total", "Match stream events published per event type", labelnames=("event",)
+)
+match_stream_dropped = Counter(
+    "match_stream_dropped_subscribers_total", "SSE subscribers disconnected because their queue was full"
+)
+
+
+def _json_default(value):
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_event(event: str, data: dict) -> str:
+    """
+    En SSE-ram: 'event: <typ>' och JSON på en rad.
+    """
+    return f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'), default=_json_default)}\n\n"
+
+
+def match_payload(match) -> dict:
+    """
+    Matchens fält från ett ORM-objekt eller en rad som dict (PATCH /matches/bulk).
+    """
+    if isinstance(match, dict):
+        return {field: match[field] for field in MATCH_EVENT_FIELDS}
+    return {field: getattr(match, field) for field in MATCH_EVENT_FIELDS}
+
+
+class Subscription:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self.dropped = False
+
+
+class MatchEventHub:
+    """
+    Fan-out av match- och prediktionshändelser till alla prenumeranter i processen.
+    """
+    def __init__(
+        self,
+        queue_size: int,
+        upcoming_fixtures: int,
+        notify_enabled: bool,
+        channel: str,
+    ):
+        self.queue_size = queue_size
+        self.upcoming_fixtures = upcoming_fixtures
+        self.notify_enabled = notify_enabled
+        self.channel = channel
+        # Känner igen våra egna NOTIFY när de kommer tillbaka via LISTEN
+        self.origin = uuid.uuid4().hex
+        self._subscribers: set[Subscription] = set()
+        self._tasks: set[asyncio.Task] = set()
+        self._connection = None
+        self._connection_lock = asyncio.Lock()
+        self._last_error: Optional[str] = None
+
+    def subscribe(self) -> Subscription:
+        subscription = Subscription(self.queue_size)
+        self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        self._subscribers.discard(subscription)
+
+    def _fan_out(self, frame: str) -> None:
+        for subscription in list(self._subscribers):
+            try:
+                subscription.queue.put_nowait(frame)
+            except asyncio.QueueFull:
+                # Långsam klient: koppla bort den, strömmen avslutas när den läst klart kön
+                subscription.dropped = True
+                self._subscribers.discard(subscription)
+                match_stream_dropped.inc()
+                logger.info("Dropped slow match stream subscriber (queue size %s).", self.queue_size)
+
+    def _has_listeners(self) -> bool:
+        # Med NOTIFY kan det finnas prenumeranter i andra workers
+        return bool(self._subscribers) or self._connection is not None
+
+    def _publish_local(self, event: str, data: dict) -> None:
+        match_events_published.inc(event=event)
+        self._fan_out(encode_event(event, data))
+
+    async def publish(self, event: str, data: dict) -> None:
+        self._publish_local(event, data)
+        if self._connection is not None:
+            await self._notify(event, data)
+
+    def publish_changes(self, action: str, matches: Iterable, team_ids: set[int]) -> None:
+        """
+        Anropas av crud_match efter commit. Arbetet görs i en bakgrundsuppgift
+        så att skrivningen inte väntar på prediktionerna. Ingenting görs om
+        ingen lyssnar.
+        """
+        if not self._has_listeners():
+            return
+        events = [{"action": action, "match": match_payload(match)} for match in matches]
+        # Lokala klienter får matchändringarna direkt och i commit-ordning
+        for data in events:
+            self._publish_local("match", data)
+        task = asyncio.create_task(self._publish_changes(events, set(team_ids)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _publish_changes(self, events: list[dict], team_ids: set[int]) -> None:
+        try:
+            if self._connection is not None:
+                for data in events:
+                    await self._notify("match", data)
+            if team_ids:
+                for prediction in await self._upcoming_predictions(team_ids):
+                    await self.publish("prediction", prediction)
+        except Exception:
+            logger.exception("Failed to publish match events")
+
+    async def _upcoming_predictions(self, team_ids: set[int]) -> list[dict]:
+        """
+        Nya prediktioner för de berörda lagens närmaste kommande matcher.
+        """
+        loaded_model = model_registry.active
+        if loaded_model is None or self.upcoming_fixtures <= 0:
+            return []
+        # Sen import: app.crud importerar crud_match, som importerar den här modulen
+        from app.crud.crud_match_prediction import UPCOMING
+        from app.db.session import AsyncSessionLocal
+
+        async with AsyncSessionLocal() as db:
+            stmt = (
+                select(MatchModel.id, MatchModel.match_date, MatchModel.home_team_id, MatchModel.away_team_id)
+                .filter(
+                    UPCOMING,
+                    MatchModel.match_date >= datetime.datetime.now(datetime.timezone.utc),
+                    or_(MatchModel.home_team_id.in_(team_ids), MatchModel.away_team_id.in_(team_ids))
+                )
+                .order_by(MatchModel.match_date, MatchModel.id)
+                .limit(self.upcoming_fixtures)
+            )
+            fixtures = (await db.execute(stmt)).all()
+            if not fixtures:
+                return []
+            # Bilden i minnet är inaktuell efter ändringen, så formen läses från databasen
+            X, valid_indices, _ = await generate_features_for_batch(
+                db, [(row.home_team_id, row.away_team_id) for row in fixtures],
+                snapshot=match_snapshot_store.current()
+            )
+        if not valid_indices:
+            return []
+        probabilities = await inference_batcher.predict_proba(loaded_model, X)
+        predictions = []
+        for index, row_probabilities in zip(valid_indices, probabilities):
+            fixture = fixtures[index]
+            output = probabilities_to_output(row_probabilities, loaded_model.version)
+            # Samma svar som POST /predict/ skulle ge, så pollande klienter får det ur cachen
+            cache_key = await prediction_cache.make_key(fixture.home_team_id, fixture.away_team_id, loaded_model.version)
+            await prediction_cache.set(cache_key, output)
+            predictions.append({
+                "match_id": fixture.id,
+                "match_date": fixture.match_date,
+                "home_team_id": fixture.home_team_id,
+                "away_team_id": fixture.away_team_id,
+                "prediction": output,
+            })
+        return predictions
+
+    async def _notify(self, event: str, data: dict) -> None:
+        payload = json.dumps(
+            {"origin": self.origin, "event": event, "data": data},
+            separators=(',', ':'), default=_json_default
+        )
+        if len(payload.encode()) > MAX_NOTIFY_PAYLOAD_BYTES:
+            logger.warning("Match event too large for NOTIFY (%s bytes), not sent to other workers.", len(payload))
+            return
+        try:
+            async with self._connection_lock:
+                await self._connection.execute("SELECT pg_notify($1, $2)", self.channel, payload)
+        except Exception as e:
+            self._last_error = f"Failed to NOTIFY match event: {e}"
+            logger.error(self._last_error)
+
+    def _on_notification(self, connection, pid, channel, payload) -> None:
+        try:
+            message = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed match event notification.")
+            return
+        if message.get("origin") == self.origin:
+            return
+        self._fan_out(encode_event(message["event"], message["data"]))
+
+    async def start(self) -> None:
+        """
+        Startar LISTEN-bryggan (om MATCH_EVENTS_NOTIFY_ENABLED). Utan brygga
+        når händelserna bara prenumeranter i den här processen.
+        """
+        if not self.notify_enabled or self._connection is not None:
+            return
+        import asyncpg
+
+        dsn = settings.ASYNC_DATABASE_URI.replace("postgresql+asyncpg://", "postgresql://", 1)
+        try:
+            connection = await asyncpg.connect(dsn)
+            await connection.add_listener(self.channel, self._on_notification)
+        except Exception as e:
+            self._last_error = f"Failed to start match event bridge: {e}"
+            logger.error(self._last_error)
+            return
+        self._connection = connection
+        logger.info("Listening for match events on channel '%s'.", self.channel)
+
+    async def stop(self) -> None:
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            try:
+                await connection.close()
+            except Exception as e:
+                logger.warning("Error closing match event bridge: %s", e)
+
+    def status(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "queue_size": self.queue_size,
+            "pending_tasks": len(self._tasks),
+            "notify_bridge": self._connection is not None,
+            "channel": self.channel,
+            "last_error": self._last_error,
+        }
+
+
+match_event_hub = MatchEventHub(
+    queue_size=settings.MATCH_EVENTS_QUEUE_SIZE,
+    upcoming_fixtures=settings.MATCH_EVENTS_UPCOMING_FIXTURES,
+    notify_enabled=settings.MATCH_EVENTS_NOTIFY_ENABLED,
+    channel=settings.MATCH_EVENTS_CHANNEL,
+)
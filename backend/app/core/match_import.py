@@ -0,0 +1,182 @@
+# app/core/match_import.py
+import csv
+import datetime
+import json
+import time
+from typing import AsyncIterator, Iterable, Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.schemas.match import MatchImportReport
+
+SUPPORTED_FORMATS = ("csv", "ndjson")
+
+# Max antal radfel som tas med i rapporten (alla räknas ändå i rows_failed)
+MAX_REPORTED_ERRORS = 100
+
+
+async def iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """
+    Delar upp en ström av byte-block (t.ex. request.stream()) i textrader.
+    """
+    buffer = b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            yield line.decode("utf-8").rstrip("\r")
+    if buffer:
+        yield buffer.decode("utf-8").rstrip("\r")
+
+
+async def iter_file_lines(lines: Iterable[str]) -> AsyncIterator[str]:
+    for line in lines:
+        yield line.rstrip("\r\n")
+
+
+async def iter_records(lines: AsyncIterator[str], fmt: str) -> AsyncIterator[tuple[int, dict]]:
+    """
+    Tolkar rader som CSV (med rubrikrad) eller NDJSON och ger (radnummer, fält).
+    Tomma rader hoppas över.
+    """
+    header = None
+    line_number = 0
+    async for line in lines:
+        line_number += 1
+        if not line.strip():
+            continue
+        if fmt == "ndjson":
+            try:
+                record = json.loads(line)
+            except ValueError as e:
+                yield line_number, {"__error__": f"Invalid JSON: {e}"}
+                continue
+            yield line_number, record if isinstance(record, dict) else {"__error__": "Expected a JSON object"}
+        else:
+            values = next(csv.reader([line]))
+            if header is None:
+                header = [name.strip() for name in values]
+                continue
+            yield line_number, dict(zip(header, values))
+
+
+def _optional_int(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def parse_record(record: dict) -> tuple:
+    """
+    Validerar en importrad i minnet och returnerar
+    (match_date, home_team, away_team, home_score, away_score, league, season, status).
+    Kastar ValueError med ett läsbart meddelande om raden är ogiltig.
+    """
+    if "__error__" in record:
+        raise ValueError(record["__error__"])
+    try:
+        match_date = datetime.datetime.fromisoformat(str(record["match_date"]).strip())
+        home_team = str(record["home_team"]).strip()
+        away_team = str(record["away_team"]).strip()
+        league = str(record["league"]).strip()
+        season = str(record["season"]).strip()
+    except KeyError as e:
+        raise ValueError(f"Missing field {e}") from e
+    if match_date.tzinfo is None:
+        match_date = match_date.replace(tzinfo=datetime.timezone.utc)
+    if not home_team or not away_team or not league or not season:
+        raise ValueError("home_team, away_team, league and season must not be empty")
+    if home_team == away_team:
+        raise ValueError("Home team and away team cannot be the same.")
+    status = record.get("status") or None
+    return (
+        match_date,
+        home_team,
+        away_team,
+        _optional_int(record.get("home_score")),
+        _optional_int(record.get("away_score")),
+        league,
+        season,
+        status,
+    )
+
+
+class MatchImporter:
+    """
+    Bulkimport av matcher: lagnamn slås upp mot en i förväg laddad dict,
+    saknade lag skapas i en fråga per block och matcherna skrivs med
+    crud.match.insert_matches_bulk (COPY med asyncpg). Allt committas i en
+    transaktion på slutet, efter att lagens form räknats om. Skapade lag läggs
+    till i lagkatalogen efter commit.
+    """
+    def __init__(self, db: AsyncSession, chunk_size: int):
+        self.db = db
+        self.chunk_size = chunk_size
+        self.team_ids: dict[str, int] = {}
+        self.created_teams: dict[str, str] = {}
+        self.finished_team_ids: set[int] = set()
+        self.earliest_finished_date: Optional[datetime.datetime] = None
+        self.finished_seasons: set[tuple[str, str]] = set()
+        self.report = MatchImportReport()
+
+    async def _flush(self, parsed: list[tuple]) -> None:
+        missing_teams = {}
+        for row in parsed:
+            for name in (row[1], row[2]):
+                if name not in self.team_ids:
+                    missing_teams.setdefault(name, row[5])
+        if missing_teams:
+            created = await crud.team.create_teams_bulk(self.db, missing_teams)
+            self.team_ids.update(created)
+            self.created_teams.update({name: missing_teams[name] for name in created})
+            self.report.teams_created += len(created)
+
+        rows = []
+        for match_date, home, away, home_score, away_score, league, season, status in parsed:
+            home_id, away_id = self.team_ids[home], self.team_ids[away]
+            rows.append((match_date, home_id, away_id, home_score, away_score, league, season, status))
+            if status == 'FINISHED':
+                self.finished_team_ids.update((home_id, away_id))
+                self.finished_seasons.add((league, season))
+                if self.earliest_finished_date is None or match_date < self.earliest_finished_date:
+                    self.earliest_finished_date = match_date
+        self.report.rows_inserted += await crud.match.insert_matches_bulk(self.db, rows)
+
+    async def run(self, records: AsyncIterator[tuple[int, dict]]) -> MatchImportReport:
+        started = time.perf_counter()
+        # Laddar alla lag en gång, startar också transaktionen som COPY körs i
+        self.team_ids = await crud.team.get_team_ids_by_name(self.db)
+
+        parsed = []
+        async for line_number, record in records:
+            self.report.rows_read += 1
+            try:
+                parsed.append(parse_record(record))
+            except (ValueError, TypeError) as e:
+                self.report.rows_failed += 1
+                if len(self.report.errors) < MAX_REPORTED_ERRORS:
+                    self.report.errors.append(f"line {line_number}: {e}")
+                continue
+            if len(parsed) >= self.chunk_size:
+                await self._flush(parsed)
+                parsed = []
+        if parsed:
+            await self._flush(parsed)
+
+        await crud.match.finish_bulk_insert(
+            self.db, self.finished_team_ids, self.earliest_finished_date, self.finished_seasons
+        )
+        crud.team.add_created_teams(self.created_teams, self.team_ids)
+
+        self.report.seconds = time.perf_counter() - started
+        if self.report.seconds > 0:
+            self.report.rows_per_second = self.report.rows_inserted / self.report.seconds
+        return self.report
+
+
+async def import_matches(db: AsyncSession, lines: AsyncIterator[str], fmt: str, chunk_size: int) -> MatchImportReport:
+    if fmt not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported format '{fmt}', expected one of {SUPPORTED_FORMATS}")
+    importer = MatchImporter(db, chunk_size=chunk_size)
+    return await importer.run(iter_records(lines, fmt))
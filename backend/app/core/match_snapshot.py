@@ -0,0 +1,413 @@
+# app/core/match_snapshot.py
+"""
+Kolumnär ögonblicksbild av alla spelade matcher i processens minne.
+
+Matcherna ligger som NumPy-arrayer sorterade på (match_date, id). Ett
+CSR-index per lag (team_ids, indptr, positions) pekar ut lagets matcher i
+kronologisk ordning, så formen för ett lag är en slice av de sista
+positionerna (största fönstret i FeatureSchema, plus säsongen), utan någon
+databasfråga. Elo-ratingarna räknas fram ur samma arrayer när bilden byggs
+(app/core/ratings.py).
+
+Bilden laddas i bakgrunden vid start och hålls aktuell på två sätt:
+- crud_match markerar den som inaktuell efter varje commit som ändrar ett
+  resultat (mark_stale) och skickar med de ändrade matchernas id. Nästa
+  omladdning läser om just de matcherna (ändrat resultat eller datum, raderad
+  eller spelad match) och hämtar nya rader. Tills dess faller prediktionerna
+  tillbaka på team_form i databasen, så ett nytt resultat syns direkt.
+- En bakgrundsloop pollar (antal, max(id)) för spelade matcher och hämtar bara
+  nya rader när något har lagts till av en annan process. Ändringar av äldre
+  matcher från andra processer fångas av en full omladdning med jämna mellanrum.
+"""
+import asyncio
+import datetime
+import logging
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+from sqlalchemy import and_, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.feature_engineering import (
+    FORM_WINDOW,
+    MATCH_COLUMNS,
+    FeatureSchema,
+    TeamFeatures,
+    compute_schema_features,
+    feature_schema,
+)
+from app.core.ratings import INITIAL_RATING, replay_ratings
+from app.models.match import Match as MatchModel
+
+logger = logging.getLogger(__name__)
+
+_FINISHED = and_(
+    MatchModel.status == 'FINISHED',
+    MatchModel.home_score.is_not(None),
+    MatchModel.away_score.is_not(None)
+)
+
+
+class MatchSnapshot:
+    """
+    Oföränderlig bild av spelade matcher. En ny bild byggs vid varje omladdning
+    och byts in med en referenstilldelning (som LoadedModel i modellregistret).
+    """
+    def __init__(
+        self,
+        ids: np.ndarray,
+        dates: np.ndarray,
+        home_team_ids: np.ndarray,
+        away_team_ids: np.ndarray,
+        home_scores: np.ndarray,
+        away_scores: np.ndarray,
+        seasons: Optional[np.ndarray] = None,
+        previous: Optional["MatchSnapshot"] = None,
+    ):
+        order = np.lexsort((ids, dates))
+        self.ids = np.asarray(ids, dtype=np.int64)[order]
+        self.dates = np.asarray(dates, dtype="datetime64[us]")[order]
+        self.home_team_ids = np.asarray(home_team_ids, dtype=np.int32)[order]
+        self.away_team_ids = np.asarray(away_team_ids, dtype=np.int32)[order]
+        self.home_scores = np.asarray(home_scores, dtype=np.int16)[order]
+        self.away_scores = np.asarray(away_scores, dtype=np.int16)[order]
+        # Heltalskod per säsong (MatchSnapshotStore håller koderna stabila mellan omladdningar)
+        self.seasons = (
+            np.zeros(len(order), dtype=np.int32) if seasons is None else np.asarray(seasons, dtype=np.int32)[order]
+        )
+        self.max_id = int(self.ids.max()) if len(self.ids) else 0
+        self.loaded_at = time.time()
+        self._build_team_index()
+        self._build_ratings(previous)
+
+    def _build_team_index(self) -> None:
+        # Varje match förekommer två gånger (hemma och borta); sortera på lag och sedan position
+        n_matches = len(self.ids)
+        appearance_teams = np.concatenate([self.home_team_ids, self.away_team_ids])
+        appearance_positions = np.tile(np.arange(n_matches, dtype=np.int32), 2)
+        order = np.lexsort((appearance_positions, appearance_teams))
+        self.team_ids, starts = np.unique(appearance_teams[order], return_index=True)
+        self.indptr = np.append(starts, 2 * n_matches).astype(np.int64)
+        self.positions = appearance_positions[order]
+
+    def _build_ratings(self, previous: Optional["MatchSnapshot"]) -> None:
+        # Ligger alla nya matcher efter föregående bilds matcher fortsätter uppspelningen därifrån
+        start = 0
+        ratings: dict[int, float] = {}
+        if previous is not None and len(previous) <= len(self) and np.array_equal(self.ids[:len(previous)], previous.ids):
+            start = len(previous)
+            ratings = dict(zip(previous.team_ids.tolist(), previous.ratings.tolist()))
+        replay = replay_ratings(self._match_rows(np.arange(start, len(self))), ratings)
+        ratings.update(zip(replay.team_ids.tolist(), replay.ratings.tolist()))
+        self.ratings = np.array([ratings.get(team_id, INITIAL_RATING) for team_id in self.team_ids.tolist()])
+
+    def merged(
+        self, ids, dates, home_team_ids, away_team_ids, home_scores, away_scores, seasons=None
+    ) -> "MatchSnapshot":
+        """
+        Ny bild med de nya raderna tillagda (de kan ha vilket datum som helst).
+        """
+        return MatchSnapshot(
+            np.concatenate([self.ids, ids]),
+            np.concatenate([self.dates, np.asarray(dates, dtype="datetime64[us]")]),
+            np.concatenate([self.home_team_ids, home_team_ids]),
+            np.concatenate([self.away_team_ids, away_team_ids]),
+            np.concatenate([self.home_scores, home_scores]),
+            np.concatenate([self.away_scores, away_scores]),
+            np.concatenate([self.seasons, np.zeros(len(ids), dtype=np.int32) if seasons is None else seasons]),
+            previous=self,
+        )
+
+    def replaced(
+        self, removed_ids: np.ndarray, ids, dates, home_team_ids, away_team_ids, home_scores, away_scores, seasons
+    ) -> "MatchSnapshot":
+        """
+        Ny bild utan matcherna i removed_ids och med de givna raderna tillagda
+        (ändrade matcher läses om och läggs till på nytt).
+        """
+        keep = ~np.isin(self.ids, removed_ids)
+        return MatchSnapshot(
+            np.concatenate([self.ids[keep], ids]),
+            np.concatenate([self.dates[keep], np.asarray(dates, dtype="datetime64[us]")]),
+            np.concatenate([self.home_team_ids[keep], home_team_ids]),
+            np.concatenate([self.away_team_ids[keep], away_team_ids]),
+            np.concatenate([self.home_scores[keep], home_scores]),
+            np.concatenate([self.away_scores[keep], away_scores]),
+            np.concatenate([self.seasons[keep], seasons]),
+            # Ratingerna kan bara fortsätta från den här bilden om ingen av dess matcher ändrats
+            previous=self if keep.all() else None,
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _team_positions(self, team_id: int, limit: int) -> np.ndarray:
+        slot = np.searchsorted(self.team_ids, team_id)
+        if slot == len(self.team_ids) or self.team_ids[slot] != team_id:
+            return self.positions[:0]
+        end = self.indptr[slot + 1]
+        return self.positions[max(self.indptr[slot], end - limit):end]
+
+    def _match_rows(self, positions: np.ndarray) -> np.ndarray:
+        return np.column_stack([
+            self.home_team_ids[positions],
+            self.away_team_ids[positions],
+            self.home_scores[positions],
+            self.away_scores[positions],
+        ]).astype(np.int64).reshape(-1, len(MATCH_COLUMNS))
+
+    def recent_matches(self, team_id: int, limit: int = FORM_WINDOW) -> np.ndarray:
+        """
+        Samma som get_team_recent_matches: (k, 4) int-array, äldsta matchen först.
+        """
+        return self._match_rows(self._team_positions(team_id, limit))
+
+    def team_features(self, team_ids: list[int], schema: Optional[FeatureSchema] = None) -> TeamFeatures:
+        """
+        Samma resultat som get_team_features (team_form och team_ratings), men utan databasfråga.
+        """
+        schema = schema or feature_schema
+        distinct_ids = np.array(sorted(set(team_ids)), dtype=np.int64)
+        team_positions = [self._feature_positions(team_id, schema) for team_id in distinct_ids.tolist()]
+        counts = np.array([len(positions) for positions in team_positions], dtype=np.intp)
+        positions = np.concatenate(team_positions) if team_positions else self.positions[:0]
+        owners = np.repeat(np.arange(len(distinct_ids)), counts)
+        features = compute_schema_features(
+            distinct_ids, self._match_rows(positions), owners, self.seasons[positions], schema
+        )
+        return TeamFeatures(distinct_ids, features, counts > 0, self._ratings_for(distinct_ids))
+
+    def _feature_positions(self, team_id: int, schema: FeatureSchema) -> np.ndarray:
+        # Samma rader som get_recent_matches_for_teams hämtar: största fönstret plus säsongen
+        positions = self._team_positions(team_id, len(self))
+        limit = schema.fetch_window
+        if schema.season_to_date and len(positions) > limit:
+            team_seasons = self.seasons[positions]
+            other_seasons = np.flatnonzero(team_seasons != team_seasons[-1])
+            limit = max(limit, len(positions) - (other_seasons[-1] + 1 if len(other_seasons) else 0))
+        return positions[len(positions) - min(limit, len(positions)):]
+
+    def _ratings_for(self, team_ids: np.ndarray) -> np.ndarray:
+        ratings = np.full(len(team_ids), INITIAL_RATING)
+        if len(self.team_ids):
+            slots = np.searchsorted(self.team_ids, team_ids).clip(max=len(self.team_ids) - 1)
+            known = self.team_ids[slots] == team_ids
+            ratings[known] = self.ratings[slots[known]]
+        return ratings
+
+    def memory_bytes(self) -> int:
+        arrays = (
+            self.ids, self.dates, self.home_team_ids, self.away_team_ids,
+            self.home_scores, self.away_scores, self.seasons, self.team_ids, self.indptr, self.positions,
+            self.ratings,
+        )
+        return sum(array.nbytes for array in arrays)
+
+    def stats(self) -> dict:
+        memory = self.memory_bytes()
+        return {
+            "matches": len(self),
+            "teams": len(self.team_ids),
+            "max_id": self.max_id,
+            "loaded_at": self.loaded_at,
+            "memory_bytes": memory,
+            "memory_bytes_per_million_matches": round(memory / len(self) * 1_000_000) if len(self) else None,
+        }
+
+
+def _utc_naive(date: datetime.datetime) -> datetime.datetime:
+    # datetime64 saknar tidszon; tidszonsmedvetna datum görs om till UTC
+    if date.tzinfo is None:
+        return date
+    return date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+async def _fetch_finished_rows(
+    db: AsyncSession,
+    season_codes: dict[str, int],
+    after_id: int = 0,
+    match_ids: Optional[list[int]] = None
+) -> tuple[np.ndarray, ...]:
+    # Spelade matcher med id > after_id, plus de spelade bland match_ids
+    stmt = (
+        select(
+            MatchModel.id,
+            MatchModel.match_date,
+            MatchModel.home_team_id,
+            MatchModel.away_team_id,
+            MatchModel.home_score,
+            MatchModel.away_score,
+            MatchModel.season
+        )
+        .filter(_FINISHED)
+    )
+    if match_ids:
+        stmt = stmt.filter(or_(MatchModel.id > after_id, MatchModel.id.in_(match_ids)))
+    else:
+        stmt = stmt.filter(MatchModel.id > after_id)
+    result = await db.execute(stmt)
+    rows = result.all()
+    ids, dates, home_team_ids, away_team_ids, home_scores, away_scores, seasons = zip(*rows) if rows else ((),) * 7
+    return (
+        np.array(ids, dtype=np.int64),
+        np.array([_utc_naive(date) for date in dates], dtype="datetime64[us]"),
+        np.array(home_team_ids, dtype=np.int32),
+        np.array(away_team_ids, dtype=np.int32),
+        np.array(home_scores, dtype=np.int16),
+        np.array(away_scores, dtype=np.int16),
+        np.array([season_codes.setdefault(season, len(season_codes)) for season in seasons], dtype=np.int32),
+    )
+
+
+class MatchSnapshotStore:
+    """
+    Håller den aktuella MatchSnapshot och laddar om den i bakgrunden.
+    """
+    def __init__(self, enabled: bool, poll_interval: float, full_reload_interval: float):
+        self.enabled = enabled
+        self.poll_interval = poll_interval
+        self.full_reload_interval = full_reload_interval
+        self._snapshot: Optional[MatchSnapshot] = None
+        self._season_codes: dict[str, int] = {}
+        # mark_stale räknar upp _changes; bilden används bara om den byggdes efter senaste ändringen
+        self._changes = 0
+        self._snapshot_changes = -1
+        # Matcher som ändrats sedan bilden byggdes, och om en ändring kom utan id (kräver full omladdning)
+        self._changed_ids: set[int] = set()
+        self._changed_unknown = False
+        self._last_full_reload = 0.0
+        self._last_error: Optional[str] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+
+    def current(self) -> Optional[MatchSnapshot]:
+        """
+        Bilden om den är aktuell, annars None (anroparen läser då från databasen).
+        """
+        if self._snapshot_changes != self._changes:
+            return None
+        return self._snapshot
+
+    def mark_stale(self, match_ids: Optional[Iterable[int]] = None) -> None:
+        """
+        Anropas efter commit när ett spelat resultat har ändrats i den här processen.
+        match_ids är de ändrade matcherna; en tom lista betyder att matcher bara
+        har lagts till, None att det är okänt vilka (nästa omladdning blir full).
+        """
+        if not self.enabled:
+            return
+        if match_ids is None:
+            self._changed_unknown = True
+        else:
+            self._changed_ids.update(match_ids)
+        self._changes += 1
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def refresh(self, db: AsyncSession, full: bool = False) -> MatchSnapshot:
+        """
+        Läser om matcherna som mark_stale rapporterat och hämtar nya matcher
+        (id > max_id). Stämmer inte antalet efteråt (t.ex. ändringar från en
+        annan process), eller är det okänt vad som ändrats, laddas allt om.
+        """
+        async with self._lock:
+            # Ändringarna fram till hit tas över; mark_stale under omladdningen samlar nya
+            changes = self._changes
+            changed_ids, self._changed_ids = self._changed_ids, set()
+            changed_unknown, self._changed_unknown = self._changed_unknown, False
+            try:
+                snapshot = await self._reload(db, full, sorted(changed_ids), changed_unknown)
+            except BaseException:
+                # Ändringarna finns inte i någon bild än
+                self._changed_ids |= changed_ids
+                self._changed_unknown = self._changed_unknown or changed_unknown
+                raise
+
+            if snapshot is not self._snapshot:
+                logger.info("Match snapshot loaded with %s finished matches.", len(snapshot))
+            self._snapshot = snapshot
+            self._snapshot_changes = changes
+            self._last_error = None
+            return snapshot
+
+    async def _reload(
+        self, db: AsyncSession, full: bool, changed_ids: list[int], changed_unknown: bool
+    ) -> MatchSnapshot:
+        snapshot = self._snapshot
+        count, max_id = (await db.execute(select(func.count(), func.max(MatchModel.id)).filter(_FINISHED))).one()
+        max_id = max_id or 0
+
+        if full or snapshot is None or changed_unknown:
+            snapshot = None
+        elif changed_ids or (count, max_id) != (len(snapshot), snapshot.max_id):
+            rows = await _fetch_finished_rows(
+                db, self._season_codes, after_id=snapshot.max_id, match_ids=changed_ids
+            )
+            if changed_ids:
+                snapshot = await asyncio.to_thread(
+                    snapshot.replaced, np.array(changed_ids, dtype=np.int64), *rows
+                )
+            else:
+                snapshot = await asyncio.to_thread(snapshot.merged, *rows)
+            if len(snapshot) != count:
+                # Matcher har raderats eller blivit spelade i en annan process: bygg om allt
+                snapshot = None
+        if snapshot is None:
+            rows = await _fetch_finished_rows(db, self._season_codes)
+            snapshot = await asyncio.to_thread(MatchSnapshot, *rows)
+            self._last_full_reload = time.monotonic()
+        return snapshot
+
+    async def _run(self) -> None:
+        from app.db.session import AsyncSessionLocal
+
+        self._wakeup = asyncio.Event()
+        while True:
+            full = time.monotonic() - self._last_full_reload >= self.full_reload_interval > 0
+            try:
+                async with AsyncSessionLocal() as db:
+                    await self.refresh(db, full=full)
+            except Exception as e:
+                self._last_error = f"Failed to refresh match snapshot: {e}"
+                logger.error(self._last_error)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def status(self) -> dict:
+        snapshot = self._snapshot
+        return {
+            "enabled": self.enabled,
+            "current": self.current() is not None,
+            "poll_interval": self.poll_interval,
+            "full_reload_interval": self.full_reload_interval,
+            "last_error": self._last_error,
+            **({"snapshot": snapshot.stats()} if snapshot is not None else {}),
+        }
+
+
+match_snapshot_store = MatchSnapshotStore(
+    enabled=settings.MATCH_SNAPSHOT_ENABLED,
+    poll_interval=settings.MATCH_SNAPSHOT_POLL_SECONDS,
+    full_reload_interval=settings.MATCH_SNAPSHOT_FULL_RELOAD_SECONDS,
+)
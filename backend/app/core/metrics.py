@@ -0,0 +1,188 @@
+# app/core/metrics.py
+"""
+Mätvärden i Prometheus-format utan externa beroenden.
+
+Histogram och räknare registreras i REGISTRY när de skapas och skrivs ut av
+render_prometheus() (GET /metrics). Uppdateringarna har inga lås: observe()
+och inc() får bara anropas från eventloopens tråd. Kod som körs i andra
+trådar (t.ex. compute_executor) mäter där men registrerar värdet i loopen.
+"""
+import bisect
+import time
+from contextlib import contextmanager
+from typing import Iterator, Sequence, Union
+
+# Alla mätvärden som skapats i processen, namn -> objekt
+REGISTRY: dict[str, Union["Histogram", "Counter"]] = {}
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Standardhinkar för latenser i sekunder
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _escape_label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], labelvalues: tuple, extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label_value(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _HistogramSeries:
+    __slots__ = ("bucket_counts", "count", "sum")
+
+    def __init__(self, n_buckets: int):
+        self.bucket_counts = [0] * (n_buckets + 1)  # sista hinken = +Inf
+        self.count = 0
+        self.sum = 0.0
+
+
+class Histogram:
+    """
+    Histogram med fasta hinkgränser (kumulativt som i Prometheus), valfritt med etiketter.
+    """
+    def __init__(self, name: str, description: str, buckets: Sequence[float], labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.buckets = sorted(buckets)
+        self.labelnames = tuple(labelnames)
+        self._series: dict[tuple, _HistogramSeries] = {}
+        REGISTRY[name] = self
+
+    def _get_series(self, labels: dict) -> _HistogramSeries:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = _HistogramSeries(len(self.buckets))
+        return series
+
+    def observe(self, value: float, **labels) -> None:
+        series = self._get_series(labels)
+        series.bucket_counts[bisect.bisect_left(self.buckets, value)] += 1
+        series.count += 1
+        series.sum += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """
+        Mäter väggtiden för ett kodblock:  with histogram.time(stage="db_fetch"): ...
+        """
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def snapshot(self, **labels) -> dict:
+        series = self._get_series(labels)
+        cumulative = []
+        running = 0
+        for upper_bound, bucket_count in zip([*self.buckets, float("inf")], series.bucket_counts):
+            running += bucket_count
+            cumulative.append({"le": upper_bound if upper_bound != float("inf") else "+Inf", "count": running})
+        return {"count": series.count, "sum": series.sum, "buckets": cumulative}
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            running = 0
+            for upper_bound, bucket_count in zip([*self.buckets, float("inf")], series.bucket_counts):
+                running += bucket_count
+                le = _format_labels(self.labelnames, key, f'le="{_format_value(upper_bound)}"')
+                lines.append(f"{self.name}_bucket{le} {running}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(series.sum)}")
+            lines.append(f"{self.name}_count{labels} {series.count}")
+        return lines
+
+
+class Counter:
+    """
+    Räknare som bara ökar, valfritt med etiketter.
+    """
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, float] = {}
+        REGISTRY[name] = self
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = tuple(labels.get(name, "") for name in self.labelnames)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(tuple(labels.get(name, "") for name in self.labelnames), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+def render_prometheus() -> str:
+    lines = []
+    for metric in REGISTRY.values():
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+# Gemensamma mätvärden för prediktionsvägen, HTTP-lagret och databasen
+prediction_stage_seconds = Histogram(
+    "prediction_stage_seconds", "Time spent per stage of a prediction request",
+    LATENCY_BUCKETS, labelnames=("stage",),
+)
+http_request_duration_seconds = Histogram(
+    "http_request_duration_seconds", "HTTP request latency per route",
+    LATENCY_BUCKETS, labelnames=("method", "route", "status"),
+)
+db_pool_checkout_seconds = Histogram(
+    "db_pool_checkout_seconds", "Time spent waiting for a connection from the pool",
+    LATENCY_BUCKETS,
+)
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware som mäter varje HTTP-request per route-mall (t.ex.
+    /api/v1/matches/{match_id}), så att id:n inte ger en serie per värde.
+    Tiden räknas tills svaret är helt skickat, även för strömmade svar.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status_code = 500
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            http_request_duration_seconds.observe(
+                time.perf_counter() - started,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status_code,
+            )
@@ -0,0 +1,282 @@
+# app/core/model_registry.py
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.core.feature_engineering import FEATURE_SCHEMA_VERSION, FeatureSchema, feature_schema
+
+logger = logging.getLogger(__name__)
+
+# Hur länge en misslyckad laddning "gäller" innan en request får försöka igen
+LOAD_RETRY_SECONDS = 5.0
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    """
+    En färdigladdad modell. Objektet byts ut i sin helhet vid omladdning, så en
+    request som har hämtat det ser samma modell och version hela vägen.
+    """
+    model: Any
+    version: str
+    path: str
+    signature: tuple[int, int]
+    loaded_at: float
+    # Modellens FeatureSchema.to_dict() och var dess kolumner ligger i serverns
+    # feature-matris (None = hela matrisen i samma ordning), se feature_columns
+    feature_schema: dict
+    feature_columns: Optional[np.ndarray] = None
+
+    @property
+    def n_features(self) -> Optional[int]:
+        return getattr(self.model, "n_features_in_", None)
+
+    def model_input(self, features):
+        """
+        Kolumnerna som modellen tränades på, i modellens ordning. Uppslaget
+        görs en gång vid laddning, så här är det bara en indexering.
+        """
+        if self.feature_columns is None:
+            return features
+        return features[:, self.feature_columns]
+
+
+class FeatureSchemaMismatch(ValueError):
+    """
+    Modellen är tränad på features som servern inte räknar fram.
+    """
+
+
+def model_feature_schema(model) -> dict:
+    """
+    Schemat som modellen tränades med (feature_schema_, sätts av training.train_model).
+    En modell från före schemat antas följa standardschemat: sju kolumner, eller
+    de sex första för en modell från före Elo-skillnaden.
+    """
+    schema = getattr(model, "feature_schema_", None)
+    if schema is not None:
+        return schema
+    names = FeatureSchema().feature_names
+    n_features = getattr(model, "n_features_in_", None) or len(names)
+    if n_features > len(names):
+        raise FeatureSchemaMismatch(f"model expects {n_features} features but has no stored feature schema")
+    return {"version": FEATURE_SCHEMA_VERSION, "key": None, "names": names[:n_features]}
+
+
+def feature_columns(
+    schema: FeatureSchema,
+    model_schema: dict,
+    n_features: Optional[int] = None
+) -> Optional[np.ndarray]:
+    """
+    Index i feature-matrisen för 'schema' för modellens kolumner, i modellens
+    ordning; None om modellen använder matrisen som den är. En modell tränad
+    på en delmängd av serverns features (t.ex. ett fönster färre) fungerar
+    alltså, men en annan schemaversion eller en feature som servern inte
+    räknar fram ger FeatureSchemaMismatch.
+    """
+    if model_schema.get("version") != schema.version:
+        raise FeatureSchemaMismatch(
+            f"model was trained with feature schema version {model_schema.get('version')}, "
+            f"the server computes version {schema.version}"
+        )
+    model_names = list(model_schema["names"])
+    if n_features is not None and n_features != len(model_names):
+        raise FeatureSchemaMismatch(f"model expects {n_features} features but its schema lists {len(model_names)}")
+
+    server_names = schema.feature_names
+    position = {name: index for index, name in enumerate(server_names)}
+    missing = [name for name in model_names if name not in position]
+    if missing:
+        raise FeatureSchemaMismatch(
+            f"model needs {', '.join(missing[:5])}{' ...' if len(missing) > 5 else ''} "
+            f"which the server schema {schema.key} does not compute"
+        )
+    columns = np.array([position[name] for name in model_names], dtype=np.intp)
+    if np.array_equal(columns, np.arange(len(server_names))):
+        return None
+    return columns
+
+
+def probabilities_to_output(probabilities, model_version: str) -> dict:
+    """
+    Översätter en rad från predict_proba till svarsformatet (PredictionOutput).
+    """
+    return {
+        "home_win_probability": float(probabilities[1]), # Sannolikhet för klass 1 (Home Win)
+        "draw_probability": float(probabilities[0]),     # Sannolikhet för klass 0 (Draw)
+        "away_win_probability": float(probabilities[2]), # Sannolikhet för klass 2 (Away Win)
+        "model_version": model_version
+    }
+
+
+def artifact_signature(path: str) -> tuple[int, int]:
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def artifact_version(path: str, signature: tuple[int, int]) -> str:
+    # Hela signaturen (mtime i ns och storlek), så att en fil som skrivs om två
+    # gånger inom samma sekund ändå får en ny version och nya cachenycklar
+    stem = os.path.splitext(os.path.basename(path))[0]
+    mtime_ns, size = signature
+    return f"{stem}@{mtime_ns}-{size}"
+
+
+def load_artifact(path: str, mmap_mode: Optional[str] = None) -> Any:
+    """
+    Läser en modellfil. En .npz-fil är en CompiledScorer och laddas utan
+    joblib/sklearn. Med mmap_mode='r' minnesmappas stora numpy-arrayer i en
+    .joblib-fil, så att flera workers delar samma sidor istället för att kopiera dem.
+    """
+    if path.endswith(".npz"):
+        from app.core.compiled_scorer import CompiledScorer
+
+        return CompiledScorer.load(path)
+
+    import joblib
+
+    return joblib.load(path, mmap_mode=mmap_mode)
+
+
+class ModelRegistry:
+    """
+    Håller den aktiva modellen. Laddning sker lat (första request) eller i
+    bakgrunden vid start, aldrig vid import. En ny modellfil laddas färdigt i en
+    tråd och byts sedan in med en enda referenstilldelning (atomiskt för requests).
+    En modell vars feature-schema inte passar serverns schema laddas aldrig.
+    """
+    def __init__(
+        self,
+        path: str,
+        mmap_mode: Optional[str] = None,
+        watch_interval: float = 0.0,
+        schema: Optional[FeatureSchema] = None,
+    ):
+        self.path = path
+        self.mmap_mode = mmap_mode
+        self.watch_interval = watch_interval
+        self.schema = schema or feature_schema
+        self._active: Optional[LoadedModel] = None
+        self._lock = asyncio.Lock()
+        self._last_error: Optional[str] = None
+        self._last_attempt = 0.0
+        self._watch_task: Optional[asyncio.Task] = None
+
+    @property
+    def active(self) -> Optional[LoadedModel]:
+        return self._active
+
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+
+    async def get(self) -> Optional[LoadedModel]:
+        """
+        Den aktiva modellen, laddas vid behov. None om ingen modell kan laddas.
+        """
+        if self._active is not None:
+            return self._active
+        if time.monotonic() - self._last_attempt < LOAD_RETRY_SECONDS:
+            return None
+        return await self.reload()
+
+    async def reload(self, force: bool = False) -> Optional[LoadedModel]:
+        """
+        Ladda om modellen om filen har ändrats (eller alltid med force=True).
+        Misslyckas laddningen behålls den tidigare modellen.
+        """
+        async with self._lock:
+            self._last_attempt = time.monotonic()
+            try:
+                signature = artifact_signature(self.path)
+            except FileNotFoundError:
+                self._last_error = f"Model file not found at '{self.path}'"
+                logger.warning("%s. Prediction endpoint will return errors.", self._last_error)
+                return self._active
+
+            if not force and self._active is not None and self._active.signature == signature:
+                return self._active
+
+            try:
+                model = await asyncio.to_thread(load_artifact, self.path, self.mmap_mode)
+            except Exception as e:
+                self._last_error = f"Failed to load model '{self.path}': {e}"
+                logger.error(self._last_error)
+                return self._active
+
+            try:
+                model_schema = model_feature_schema(model)
+                columns = feature_columns(self.schema, model_schema, getattr(model, "n_features_in_", None))
+            except FeatureSchemaMismatch as e:
+                self._last_error = f"Model '{self.path}' does not match the feature schema: {e}"
+                logger.error(self._last_error)
+                return self._active
+
+            self._active = LoadedModel(
+                model=model,
+                version=artifact_version(self.path, signature),
+                path=self.path,
+                signature=signature,
+                loaded_at=time.time(),
+                feature_schema=model_schema,
+                feature_columns=columns,
+            )
+            self._last_error = None
+            logger.info("Model '%s' loaded as version %s.", self.path, self._active.version)
+            return self._active
+
+    async def _watch(self) -> None:
+        while True:
+            await asyncio.sleep(self.watch_interval)
+            await self.reload()
+
+    def start(self) -> None:
+        """
+        Starta laddning i bakgrunden och, om watch_interval > 0, bevakning av modellfilen.
+        """
+        if self._watch_task is not None:
+            return
+
+        async def run():
+            await self.reload()
+            if self.watch_interval > 0:
+                await self._watch()
+
+        self._watch_task = asyncio.create_task(run())
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            try:
+                await self._watch_task
+            except asyncio.CancelledError:
+                pass
+            self._watch_task = None
+
+    def status(self) -> dict:
+        active = self._active
+        return {
+            "path": self.path,
+            "loaded": active is not None,
+            "version": active.version if active else None,
+            "loaded_at": active.loaded_at if active else None,
+            "mmap_mode": self.mmap_mode,
+            "watch_interval": self.watch_interval,
+            "feature_schema": self.schema.key,
+            "model_feature_schema": active.feature_schema.get("key") if active else None,
+            "last_error": self._last_error,
+        }
+
+
+model_registry = ModelRegistry(
+    path=settings.MODEL_PATH,
+    mmap_mode=settings.MODEL_MMAP_MODE,
+    watch_interval=settings.MODEL_WATCH_INTERVAL_SECONDS,
+)
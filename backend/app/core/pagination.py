@@ -0,0 +1,61 @@
+# app/core/pagination.py
+import base64
+import datetime
+import json
+from typing import Any, Optional
+
+# Id-kolumnerna är INTEGER, större värden går inte att jämföra med i databasen
+MAX_CURSOR_INT = 2**31 - 1
+
+# Header som bär markören till nästa sida i list-endpoints
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def _to_json(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+def _from_json(value: Any, expected: type) -> Any:
+    # Värdet på en position i markören, som expected; ValueError om det har fel typ
+    if expected is datetime.datetime:
+        if isinstance(value, dict) and value.keys() == {"dt"} and isinstance(value["dt"], str):
+            return datetime.datetime.fromisoformat(value["dt"])
+    elif expected is int:
+        if isinstance(value, int) and not isinstance(value, bool) and -MAX_CURSOR_INT <= value <= MAX_CURSOR_INT:
+            return value
+    elif isinstance(value, expected):
+        return value
+    raise ValueError("Invalid cursor")
+
+def encode_cursor(*values: Any) -> str:
+    """
+    Kodar sorteringsnyckeln för sista raden på en sida, t.ex. (match_date, id),
+    till en opak sträng som klienten skickar tillbaka som ?cursor=...
+    """
+    raw = json.dumps([_to_json(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """
+    Avkodar en markör från encode_cursor, med en typ per position i
+    sorteringsnyckeln, t.ex. decode_cursor(cursor, datetime.datetime, int).
+    Kastar ValueError om den är ogiltig eller har fel längd eller typer, så att
+    endpointen svarar 400 i stället för att frågan misslyckas i databasen.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(values, list) or len(values) != len(types):
+        raise ValueError("Invalid cursor")
+    return tuple(_from_json(value, expected) for value, expected in zip(values, types))
+
+def next_cursor(rows: list, limit: int, *attributes: str) -> Optional[str]:
+    """
+    Markören till nästa sida, eller None om sidan inte var full (sista sidan).
+    """
+    if not rows or len(rows) < limit:
+        return None
+    last = rows[-1]
+    return encode_cursor(*(getattr(last, attribute) for attribute in attributes))
@@ -0,0 +1,157 @@
+# app/core/prediction_cache.py
+import json
+import time
+from collections import OrderedDict, defaultdict
+from typing import Iterable, Optional, Protocol
+
+from app.core.config import settings
+
+
+class CacheBackend(Protocol):
+    """
+    Lagring för prediktionscachen. Utöver själva posterna håller backenden en
+    "vattenstämpel" per lag som räknas upp varje gång lagets form ändras.
+    Vattenstämplarna ingår i cachenyckeln, så gamla poster blir aldrig träffade igen.
+    """
+    evictions: int
+
+    async def get(self, key: str) -> Optional[dict]: ...
+    async def set(self, key: str, value: dict, ttl_seconds: float) -> None: ...
+    async def get_watermarks(self, team_ids: list[int]) -> list[int]: ...
+    async def bump_watermarks(self, team_ids: list[int]) -> None: ...
+
+
+class LocalCacheBackend:
+    """
+    LRU + TTL i processens minne. Vattenstämplarna är lokala för processen:
+    en ändring som görs i en annan worker (eller av en CLI) syns inte här
+    förrän posten gått ut. Därför begränsas TTL:en till
+    PREDICTION_CACHE_LOCAL_TTL_SECONDS (se create_prediction_cache).
+    Använd RedisCacheBackend för en delad cache med full TTL.
+    """
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.evictions = 0
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._watermarks: defaultdict[int, int] = defaultdict(int)
+
+    async def get(self, key: str) -> Optional[dict]:
+        item = self._entries.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            self.evictions += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: dict, ttl_seconds: float) -> None:
+        self._entries[key] = (time.monotonic() + ttl_seconds, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_watermarks(self, team_ids: list[int]) -> list[int]:
+        return [self._watermarks.get(team_id, 0) for team_id in team_ids]
+
+    async def bump_watermarks(self, team_ids: list[int]) -> None:
+        for team_id in team_ids:
+            self._watermarks[team_id] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Delad cache för flera workers. Kräver paketet 'redis' (valfritt beroende).
+    Redis sköter själv utträngning (maxmemory-policy), så evictions räknas inte här.
+    """
+    def __init__(self, url: str, prefix: str = "prediction-cache"):
+        try:
+            import redis.asyncio as redis
+        except ImportError as e:
+            raise RuntimeError("PREDICTION_CACHE_URL requires the 'redis' package to be installed.") from e
+        self.evictions = 0
+        self._redis = redis.from_url(url)
+        self._prefix = prefix
+
+    def _watermark_key(self, team_id: int) -> str:
+        return f"{self._prefix}:watermark:{team_id}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        raw = await self._redis.get(f"{self._prefix}:entry:{key}")
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: dict, ttl_seconds: float) -> None:
+        await self._redis.set(f"{self._prefix}:entry:{key}", json.dumps(value), ex=max(1, int(ttl_seconds)))
+
+    async def get_watermarks(self, team_ids: list[int]) -> list[int]:
+        values = await self._redis.mget([self._watermark_key(team_id) for team_id in team_ids])
+        return [int(value) if value is not None else 0 for value in values]
+
+    async def bump_watermarks(self, team_ids: list[int]) -> None:
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for team_id in team_ids:
+                pipe.incr(self._watermark_key(team_id))
+            await pipe.execute()
+
+
+class PredictionCache:
+    """
+    Cache för PredictionOutput nycklad på (hemmalag, bortalag, modellversion,
+    vattenstämpel per lag). crud_match räknar upp vattenstämplarna efter commit
+    när ett spelat resultat skapas, ändras eller raderas.
+    """
+    def __init__(self, backend: CacheBackend, ttl_seconds: float):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+
+    async def make_key(self, home_team_id: int, away_team_id: int, model_version: str) -> str:
+        home_watermark, away_watermark = await self.backend.get_watermarks([home_team_id, away_team_id])
+        return f"{home_team_id}:{away_team_id}:{model_version}:{home_watermark}:{away_watermark}"
+
+    async def get(self, key: str) -> Optional[dict]:
+        value = await self.backend.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: str, value: dict) -> None:
+        await self.backend.set(key, value, self.ttl_seconds)
+
+    async def invalidate_teams(self, team_ids: Iterable[int]) -> None:
+        team_ids = sorted(set(team_ids))
+        if team_ids:
+            await self.backend.bump_watermarks(team_ids)
+
+    def stats(self) -> dict:
+        stats = {
+            "backend": type(self.backend).__name__,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.backend.evictions,
+            "ttl_seconds": self.ttl_seconds,
+        }
+        if isinstance(self.backend, LocalCacheBackend):
+            stats["entries"] = len(self.backend)
+        return stats
+
+
+def create_prediction_cache() -> PredictionCache:
+    if settings.PREDICTION_CACHE_URL:
+        backend = RedisCacheBackend(settings.PREDICTION_CACHE_URL)
+        return PredictionCache(backend, ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS)
+    backend = LocalCacheBackend(max_entries=settings.PREDICTION_CACHE_MAX_ENTRIES)
+    ttl_seconds = min(settings.PREDICTION_CACHE_TTL_SECONDS, settings.PREDICTION_CACHE_LOCAL_TTL_SECONDS)
+    return PredictionCache(backend, ttl_seconds=ttl_seconds)
+
+
+prediction_cache = create_prediction_cache()
@@ -0,0 +1,172 @@
+# app/core/prediction_scheduler.py
+"""
+Förberäknade prediktioner för alla kommande matcher (status allt utom FINISHED).
+
+Nästan alla /predict-anrop gäller matcher som redan finns i matches, så
+sannolikheterna kan räknas i förväg och läsas med ett uppslag på primärnyckeln
+(GET /matches/{id}/prediction och ?include_prediction=true på matchlistorna).
+
+Ett pass lägger först till rader för nya matcher och räknar sedan bara om det
+som är inaktuellt (crud_match_prediction.get_pending_fixtures), i batchar med
+en feature-hämtning och ett predict_proba per batch. När ett resultat ändras
+räknar crud_match upp inputs_version för lagens kommande matcher i samma
+transaktion och väcker schemaläggaren, så bara de matcherna räknas om.
+
+Schemaläggaren körs i bakgrunden i servern om PREDICTION_SCHEDULER_ENABLED är
+satt, eller som en separat process:
+    python -m app.db.precompute_predictions
+Kör den i EN process; flera samtidiga pass gör samma arbete flera gånger.
+"""
+import asyncio
+import datetime
+import logging
+import time
+from typing import Optional
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.feature_engineering import generate_features_for_batch
+from app.core.inference_batcher import inference_batcher
+from app.core.match_snapshot import match_snapshot_store
+from app.core.metrics import Counter
+from app.core.model_registry import model_registry, probabilities_to_output
+
+logger = logging.getLogger(__name__)
+
+match_predictions_computed_total = Counter(
+    "match_predictions_computed_total", "Precomputed predictions written for upcoming fixtures", labelnames=("result",)
+)
+
+
+class PredictionScheduler:
+    """
+    Håller match_predictions aktuell för kommande matcher.
+    """
+    def __init__(self, enabled: bool, interval: float, batch_size: int):
+        self.enabled = enabled
+        self.interval = interval
+        self.batch_size = batch_size
+        self._last_pass: Optional[dict] = None
+        self._last_error: Optional[str] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def notify(self) -> None:
+        """
+        Anropas efter commit när ett resultat har ändrats, så att berörda
+        matcher räknas om direkt i stället för vid nästa intervall.
+        """
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_pass(self, db: AsyncSession) -> int:
+        """
+        Räknar alla inaktuella prediktioner, en batch per transaktion.
+        Returnerar antal skrivna rader (0 om ingen modell är laddad).
+        """
+        from app.crud import crud_match_prediction
+
+        loaded_model = await model_registry.get()
+        if loaded_model is None:
+            return 0
+
+        await crud_match_prediction.add_missing_fixtures(db)
+        await db.commit()
+
+        written = 0
+        while True:
+            pending = await crud_match_prediction.get_pending_fixtures(db, loaded_model.version, self.batch_size)
+            if not pending:
+                break
+            fixtures = [(row.home_team_id, row.away_team_id) for row in pending]
+            X, valid_indices, errors = await generate_features_for_batch(
+                db, fixtures, snapshot=match_snapshot_store.current()
+            )
+            probabilities = await inference_batcher.predict_proba(loaded_model, X) if valid_indices else []
+            outputs = {
+                index: probabilities_to_output(row, loaded_model.version)
+                for index, row in zip(valid_indices, probabilities)
+            }
+
+            computed_at = datetime.datetime.now(datetime.timezone.utc)
+            rows = []
+            for index, fixture in enumerate(pending):
+                output = outputs.get(index, {})
+                rows.append({
+                    "match_id": fixture.match_id,
+                    "home_team_id": fixture.home_team_id,
+                    "away_team_id": fixture.away_team_id,
+                    "home_win_probability": output.get("home_win_probability"),
+                    "draw_probability": output.get("draw_probability"),
+                    "away_win_probability": output.get("away_win_probability"),
+                    "error": errors.get(index),
+                    "model_version": loaded_model.version,
+                    "computed_version": fixture.inputs_version,
+                    "computed_at": computed_at,
+                })
+            await crud_match_prediction.save_predictions(db, rows)
+            await db.commit()
+
+            match_predictions_computed_total.inc(len(outputs), result="predicted")
+            match_predictions_computed_total.inc(len(errors), result="error")
+            written += len(rows)
+        return written
+
+    async def _run(self) -> None:
+        from app.db.session import AsyncSessionLocal
+
+        self._wakeup = asyncio.Event()
+        while True:
+            started = time.perf_counter()
+            try:
+                async with AsyncSessionLocal() as db:
+                    written = await self.run_pass(db)
+                self._last_pass = {
+                    "finished_at": time.time(),
+                    "seconds": round(time.perf_counter() - started, 3),
+                    "written": written,
+                }
+                self._last_error = None
+                if written:
+                    logger.info("Precomputed %s match predictions.", written)
+            except Exception as e:
+                self._last_error = f"Failed to precompute predictions: {e}"
+                logger.error(self._last_error)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if not self.enabled or self._task is not None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._wakeup = None
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None,
+            "interval": self.interval,
+            "batch_size": self.batch_size,
+            "last_pass": self._last_pass,
+            "last_error": self._last_error,
+        }
+
+
+prediction_scheduler = PredictionScheduler(
+    enabled=settings.PREDICTION_SCHEDULER_ENABLED,
+    interval=settings.PREDICTION_SCHEDULER_INTERVAL_SECONDS,
+    batch_size=settings.PREDICTION_SCHEDULER_BATCH_SIZE,
+)
@@ -0,0 +1,99 @@
+# app/core/ratings.py
+"""
+Elo-rating för lagen, med hemmafördel och skalning med målskillnaden.
+
+För en match mellan hemmalag H och bortalag B:
+    E = 1 / (1 + 10 ** ((R_B - (R_H + HOME_ADVANTAGE)) / 400))
+    delta = K_FACTOR * G * (S - E)
+    R_H += delta, R_B -= delta
+där S är 1, 0.5 eller 0 för hemmalaget och G växer med målskillnaden
+(1 för 0-1 mål, 1.5 för 2 mål, (11 + mål) / 8 därefter).
+
+Ratingen beror på i vilken ordning matcherna spelas, så en omräkning går
+igenom matcherna i kronologisk ordning (match_date, id). replay_ratings gör
+det i ett pass: S och G räknas vektoriserat för alla matcher och själva
+uppdateringen är en tight loop över heltalsindex.
+"""
+from typing import NamedTuple, Optional
+
+import numpy as np
+
+INITIAL_RATING = 1500.0
+K_FACTOR = 20.0
+HOME_ADVANTAGE = 65.0
+
+
+class RatingReplay(NamedTuple):
+    """
+    team_ids: (T,) lagen som förekommer, sorterade
+    ratings: (T,) ratingen efter sista matchen
+    before: (N, 2) hemma- och bortalagets rating inför varje match
+    after: (N, 2) hemma- och bortalagets rating efter varje match
+    """
+    team_ids: np.ndarray
+    ratings: np.ndarray
+    before: np.ndarray
+    after: np.ndarray
+
+
+def match_outcome(home_scores, away_scores) -> np.ndarray:
+    """
+    S för hemmalaget: 1 = vinst, 0.5 = oavgjort, 0 = förlust.
+    """
+    return (np.sign(np.asarray(home_scores) - np.asarray(away_scores)) + 1) / 2
+
+
+def goal_difference_multiplier(home_scores, away_scores) -> np.ndarray:
+    goal_difference = np.abs(np.asarray(home_scores) - np.asarray(away_scores))
+    return np.select([goal_difference <= 1, goal_difference == 2], [1.0, 1.5], default=(11 + goal_difference) / 8)
+
+
+def expected_home_score(home_rating, away_rating):
+    return 1 / (1 + 10 ** ((away_rating - (home_rating + HOME_ADVANTAGE)) / 400))
+
+
+def elo_update(home_rating: float, away_rating: float, home_score: int, away_score: int) -> tuple[float, float]:
+    """
+    Nya ratingar efter EN match (O(1), används när en match blir spelad).
+    Samma formel som de vektoriserade funktionerna ovan, med Python-skalärer.
+    """
+    goal_difference = abs(home_score - away_score)
+    multiplier = 1.0 if goal_difference <= 1 else 1.5 if goal_difference == 2 else (11 + goal_difference) / 8
+    outcome = 1.0 if home_score > away_score else 0.5 if home_score == away_score else 0.0
+    change = K_FACTOR * multiplier * (outcome - expected_home_score(home_rating, away_rating))
+    return home_rating + change, away_rating - change
+
+
+def replay_ratings(matches: np.ndarray, initial: Optional[dict[int, float]] = None) -> RatingReplay:
+    """
+    Spelar upp matcherna i given ordning (kronologisk). matches är en (N, 4)
+    int-array med kolumnerna home_team_id, away_team_id, home_score, away_score.
+    initial anger ratingen inför första matchen per lag (standard INITIAL_RATING).
+    """
+    matches = np.asarray(matches, dtype=np.int64).reshape(-1, 4)
+    initial = initial or {}
+    team_ids, team_index = np.unique(matches[:, :2], return_inverse=True)
+    team_index = team_index.reshape(-1, 2)
+    ratings = [initial.get(team_id, INITIAL_RATING) for team_id in team_ids.tolist()]
+
+    home_scores, away_scores = matches[:, 2], matches[:, 3]
+    weights = (K_FACTOR * goal_difference_multiplier(home_scores, away_scores)).tolist()
+    outcomes = match_outcome(home_scores, away_scores).tolist()
+
+    n_matches = len(matches)
+    before = np.empty((n_matches, 2))
+    after = np.empty((n_matches, 2))
+    before_home, before_away, after_home, after_away = [], [], [], []
+    for (home, away), weight, outcome in zip(team_index.tolist(), weights, outcomes):
+        home_rating, away_rating = ratings[home], ratings[away]
+        change = weight * (outcome - 1 / (1 + 10 ** ((away_rating - home_rating - HOME_ADVANTAGE) / 400)))
+        ratings[home] = home_rating + change
+        ratings[away] = away_rating - change
+        before_home.append(home_rating)
+        before_away.append(away_rating)
+        after_home.append(home_rating + change)
+        after_away.append(away_rating - change)
+
+    before[:, 0], before[:, 1] = before_home, before_away
+    after[:, 0], after[:, 1] = after_home, after_away
+    return RatingReplay(team_ids, np.array(ratings, dtype=np.float64), before, after)
@@ -0,0 +1,83 @@
+# app/core/team_directory.py
+import time
+from typing import Iterable, Optional
+
+from app.core.config import settings
+from app.schemas.team import TeamRead
+
+
+class TeamDirectory:
+    """
+    Processlokal katalog över lagen (id -> TeamRead, namn -> id). Lag ändras
+    nästan aldrig, så validering av lag-id och lagnamn i match- och lag-
+    endpoints kan göras utan databasfrågor.
+
+    Katalogen fylls helt vid start (och igen när ttl_seconds har gått, så att
+    ändringar från andra workers syns) och uppdateras av crud_team när ett lag
+    skapas eller ändras i den här processen. Id som saknas hämtas från
+    databasen av crud_team.get_teams_by_ids och läggs till.
+    """
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._by_id: dict[int, TeamRead] = {}
+        self._id_by_name: dict[str, int] = {}
+        self._loaded_at: Optional[float] = None
+        self.hits = 0
+        self.misses = 0
+
+    def is_complete(self) -> bool:
+        """
+        True om katalogen innehåller alla lag (nyligen fylld från databasen).
+        """
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl_seconds
+
+    def replace_all(self, teams: Iterable) -> None:
+        by_id = {team.id: TeamRead.model_validate(team) for team in teams}
+        self._by_id = by_id
+        self._id_by_name = {team.name: team_id for team_id, team in by_id.items()}
+        self._loaded_at = time.monotonic()
+
+    def add(self, team) -> TeamRead:
+        """
+        Lägg till eller ersätt ett lag (ORM-objekt eller TeamRead) efter commit.
+        """
+        entry = TeamRead.model_validate(team)
+        previous = self._by_id.get(entry.id)
+        if previous is not None and self._id_by_name.get(previous.name) == entry.id:
+            del self._id_by_name[previous.name]
+        self._by_id[entry.id] = entry
+        self._id_by_name[entry.name] = entry.id
+        return entry
+
+    def get(self, team_id: int) -> Optional[TeamRead]:
+        return self._by_id.get(team_id)
+
+    def lookup(self, team_ids: Iterable[int]) -> tuple[dict[int, TeamRead], list[int]]:
+        """
+        Returnerar (id -> TeamRead för kända lag, id som saknas i katalogen).
+        """
+        found = {}
+        missing = []
+        for team_id in set(team_ids):
+            entry = self._by_id.get(team_id)
+            if entry is None:
+                missing.append(team_id)
+            else:
+                found[team_id] = entry
+        self.hits += len(found)
+        self.misses += len(missing)
+        return found, missing
+
+    def id_for_name(self, name: str) -> Optional[int]:
+        return self._id_by_name.get(name)
+
+    def stats(self) -> dict:
+        return {
+            "teams": len(self._by_id),
+            "complete": self.is_complete(),
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+team_directory = TeamDirectory(ttl_seconds=settings.TEAM_DIRECTORY_TTL_SECONDS)
@@ -0,0 +1,263 @@
+# app/core/training.py
+"""
+Träningspipeline för prediktionsmodellen.
+
+Alla spelade matcher läses med EN fråga och görs om till en lång tabell med en
+rad per lag och match. Formen inför varje match räknas ut för alla rader på en
+gång med kumulativa summor per lag, där varje rad bara ser lagets TIDIGARE
+matcher (ingen läckage från matchen själv eller framtiden). Elo-ratingen inför
+varje match kommer från en uppspelning av alla matcher (app/core/ratings.py).
+Resultatet har samma features i samma ordning som generate_features_for_prediction
+för det valda FeatureSchema, och schemat sparas med modellen så att modell-
+registret kan vägra ladda en modell som inte passar serverns schema.
+
+Körs från backend-mappen:
+    python -m app.core.training --output ml_models/logistic_regression_v1.joblib
+
+Utan --output sparas modellen till MODEL_PATH, där servern plockar upp den.
+Schemat tas från FEATURE_* i config om det inte anges, t.ex.
+    python -m app.core.training --windows 3,5,10 --season-to-date --decay-half-life 4
+Slutar sökvägen på .npz sparas modellen som en CompiledScorer (se compiled_scorer.py).
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import NamedTuple, Optional
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.feature_engineering import (
+    MATCH_COLUMNS,
+    FeatureSchema,
+    build_feature_matrix,
+    feature_schema,
+    season_run_starts,
+    team_match_values,
+    window_features,
+)
+from app.core.ratings import replay_ratings
+from app.models.match import Match as MatchModel
+
+# Klassindex som predictions.py förväntar sig
+DRAW, HOME_WIN, AWAY_WIN = 0, 1, 2
+
+
+class TrainingSet(NamedTuple):
+    """
+    X: (N, F) features, y: (N,) klass, match_ids: (N,) matchens id,
+    schema: FeatureSchema som kolumnerna i X följer.
+    Bara matcher där minst ett av lagen har tidigare matcher tas med,
+    precis som generate_features_for_prediction returnerar None annars.
+    """
+    X: np.ndarray
+    y: np.ndarray
+    match_ids: np.ndarray
+    schema: FeatureSchema
+
+
+async def load_finished_matches(db: AsyncSession) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Hämtar alla spelade matcher med en fråga, i kronologisk ordning.
+    Returnerar (match_ids (N,), matches (N, 4) med kolumnerna i MATCH_COLUMNS,
+    seasons (N,) heltalskod per säsong).
+    """
+    stmt = (
+        select(
+            MatchModel.id,
+            MatchModel.home_team_id,
+            MatchModel.away_team_id,
+            MatchModel.home_score,
+            MatchModel.away_score,
+            MatchModel.season
+        )
+        .filter(
+            MatchModel.status == 'FINISHED',
+            MatchModel.home_score.is_not(None),
+            MatchModel.away_score.is_not(None)
+        )
+        .order_by(MatchModel.match_date, MatchModel.id)
+    )
+    result = await db.execute(stmt)
+    rows = result.all()
+    numbers = np.array([row[:-1] for row in rows], dtype=np.int64).reshape(-1, len(MATCH_COLUMNS) + 1)
+    season_codes: dict[str, int] = {}
+    seasons = np.array([season_codes.setdefault(row[-1], len(season_codes)) for row in rows], dtype=np.int64)
+    return numbers[:, 0], numbers[:, 1:], seasons
+
+
+def rolling_team_features(
+    matches: np.ndarray,
+    seasons: Optional[np.ndarray] = None,
+    schema: Optional[FeatureSchema] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Formen inför varje match för hemma- och bortalaget, i ett vektoriserat pass.
+    matches är en (N, 4) int-array (MATCH_COLUMNS) i kronologisk ordning och
+    seasons (N,) säsongskoder (utan dem räknas allt som en säsong).
+    Returnerar (features (2N, 3B) enligt schemat, antal tidigare matcher (2N,))
+    där rad 2i är hemmalaget och rad 2i+1 bortalaget i match i.
+    """
+    schema = schema or feature_schema
+    n_rows = 2 * len(matches)
+    seasons = np.zeros(len(matches), dtype=np.int64) if seasons is None else np.asarray(seasons)
+
+    # Lång tabell: en rad per lag och match, sammanflätad så att ordningen är kronologisk
+    team_ids = matches[:, :2].ravel()
+    values = team_match_values(team_ids, np.repeat(matches, 2, axis=0))
+
+    # Stabil sortering per lag behåller den kronologiska ordningen inom laget
+    order = np.argsort(team_ids, kind="stable")
+    sorted_teams = team_ids[order]
+
+    positions = np.arange(n_rows)
+    is_group_start = np.ones(n_rows, dtype=bool)
+    is_group_start[1:] = sorted_teams[1:] != sorted_teams[:-1]
+    group_start = np.maximum.accumulate(np.where(is_group_start, positions, 0))
+    run_starts = season_run_starts(is_group_start, np.repeat(seasons, 2)[order])
+
+    # Varje rad ser lagets rader [start, j), så raden själv ingår inte
+    sorted_features = window_features(values[order], group_start, positions, run_starts, schema)
+
+    features = np.empty_like(sorted_features)
+    features[order] = sorted_features
+    history_counts = np.empty(n_rows, dtype=np.intp)
+    history_counts[order] = positions - group_start
+    return features, history_counts
+
+
+def build_training_set(
+    match_ids: np.ndarray,
+    matches: np.ndarray,
+    seasons: Optional[np.ndarray] = None,
+    schema: Optional[FeatureSchema] = None
+) -> TrainingSet:
+    """
+    Bygger features och klasser för alla matcher (kronologisk ordning).
+    """
+    schema = schema or feature_schema
+    n_matches = len(matches)
+    features, history_counts = rolling_team_features(matches, seasons, schema)
+
+    # Ratingarna inför varje match, sammanflätade som raderna i features
+    ratings_before = replay_ratings(matches).before.ravel()
+
+    home_rows = np.arange(n_matches) * 2
+    away_rows = home_rows + 1
+    X = build_feature_matrix(features, home_rows, away_rows, ratings_before)
+
+    goal_difference = matches[:, 2] - matches[:, 3]
+    y = np.select([goal_difference > 0, goal_difference < 0], [HOME_WIN, AWAY_WIN], default=DRAW)
+
+    valid = (history_counts[home_rows] > 0) | (history_counts[away_rows] > 0)
+    return TrainingSet(X[valid], y[valid], match_ids[valid], schema)
+
+
+def train_model(X: np.ndarray, y: np.ndarray, schema: Optional[FeatureSchema] = None):
+    """
+    Tränar pipelinen (standardisering + multinomial logistisk regression).
+    Med schema sparas FeatureSchema.to_dict() som pipeline.feature_schema_,
+    som modellregistret jämför med serverns schema vid laddning.
+    """
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import StandardScaler
+
+    pipeline = Pipeline([
+        ("scaler", StandardScaler()),
+        ("classifier", LogisticRegression(max_iter=1000)),
+    ])
+    pipeline.fit(X, y)
+    if schema is not None:
+        pipeline.feature_schema_ = schema.to_dict()
+    return pipeline
+
+
+def evaluate_holdout(training_set: TrainingSet, holdout_fraction: float) -> dict:
+    """
+    Tränar på de äldsta matcherna och utvärderar på de senaste (tidsbaserad split).
+    """
+    from sklearn.metrics import accuracy_score, log_loss
+
+    split = int(len(training_set.y) * (1 - holdout_fraction))
+    model = train_model(training_set.X[:split], training_set.y[:split])
+    probabilities = model.predict_proba(training_set.X[split:])
+    return {
+        "train_rows": split,
+        "holdout_rows": len(training_set.y) - split,
+        "accuracy": accuracy_score(training_set.y[split:], model.classes_[probabilities.argmax(axis=1)]),
+        "log_loss": log_loss(training_set.y[split:], probabilities, labels=model.classes_),
+    }
+
+
+def save_model(pipeline, path: str) -> None:
+    """
+    Sparar modellen via en temporär fil och os.replace, så att modellregistret
+    aldrig läser en halvskriven fil.
+    """
+    if path.endswith(".npz"):
+        from app.core.compiled_scorer import CompiledScorer
+
+        CompiledScorer.from_pipeline(pipeline).save(path)
+        return
+
+    import joblib
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temporary_path = f"{path}.tmp-{os.getpid()}"
+    joblib.dump(pipeline, temporary_path)
+    os.replace(temporary_path, path)
+
+
+async def run_training(output: str, holdout_fraction: float, schema: FeatureSchema) -> None:
+    from app.db.session import AsyncSessionLocal
+
+    started = time.perf_counter()
+    async with AsyncSessionLocal() as db:
+        match_ids, matches, seasons = await load_finished_matches(db)
+    loaded = time.perf_counter()
+    print(f"Loaded {len(matches)} finished matches in {loaded - started:.2f}s.")
+
+    training_set = build_training_set(match_ids, matches, seasons, schema)
+    built = time.perf_counter()
+    print(
+        f"Built {len(training_set.y)} training rows with {training_set.X.shape[1]} features "
+        f"(schema {schema.key}) in {built - loaded:.2f}s."
+    )
+    if len(np.unique(training_set.y)) < 3:
+        raise SystemExit("Need at least one home win, draw and away win to train the model.")
+
+    if holdout_fraction > 0:
+        metrics = evaluate_holdout(training_set, holdout_fraction)
+        print(
+            f"Holdout ({metrics['holdout_rows']} latest matches): "
+            f"accuracy={metrics['accuracy']:.3f} log_loss={metrics['log_loss']:.3f}"
+        )
+
+    pipeline = train_model(training_set.X, training_set.y, schema)
+    save_model(pipeline, output)
+    print(f"Model trained on all rows and saved to '{output}' in {time.perf_counter() - built:.2f}s.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=settings.MODEL_PATH)
+    parser.add_argument("--holdout", type=float, default=0.2, help="Fraction of latest matches for evaluation (0 to skip).")
+    parser.add_argument(
+        "--windows", default=",".join(map(str, feature_schema.windows)),
+        help="Comma-separated form windows in matches."
+    )
+    parser.add_argument(
+        "--season-to-date", action=argparse.BooleanOptionalAction, default=feature_schema.season_to_date
+    )
+    parser.add_argument("--decay-half-life", type=float, default=feature_schema.decay_half_life)
+    args = parser.parse_args()
+    schema = FeatureSchema(
+        windows=tuple(int(window) for window in args.windows.split(",")),
+        season_to_date=args.season_to_date,
+        decay_half_life=args.decay_half_life,
+    )
+    asyncio.run(run_training(args.output, args.holdout, schema))
@@ -1,2 +1,6 @@
 from . import crud_team as team 
-from . import crud_match as match 
\ No newline at end of file
+from . import crud_team_form as team_form
+from . import crud_team_rating as team_rating
+from . import crud_match_prediction as match_prediction
+from . import crud_league_standing as league_standing
+from . import crud_match as match 
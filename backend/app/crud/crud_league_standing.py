@@ -0,0 +1,161 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import tuple_
+from sqlalchemy import case, delete, func, insert, literal, union_all
+from typing import Iterable, Optional
+
+from app.models.match import Match
+from app.models.league_standing import LeagueStanding
+from app.db.upsert import dialect_insert
+
+POINTS_FOR_WIN = 3
+POINTS_FOR_DRAW = 1
+
+# Nyckeln och räknarna i en tabellrad, i den ordning deltan byggs upp
+STANDING_KEY_COLUMNS = ["league", "season", "team_id"]
+STANDING_COLUMNS = ["played", "won", "drawn", "lost", "goals_for", "goals_against", "points"]
+
+def _result_counts(goals_for: int, goals_against: int) -> tuple:
+    # Ett lags bidrag till tabellen från en spelad match, i STANDING_COLUMNS-ordning
+    won, drawn, lost = goals_for > goals_against, goals_for == goals_against, goals_for < goals_against
+    points = POINTS_FOR_WIN * won + POINTS_FOR_DRAW * drawn
+    return (1, int(won), int(drawn), int(lost), goals_for, goals_against, points)
+
+def standing_deltas(changes: list[tuple[Optional[tuple], Optional[tuple]]]) -> dict[tuple, list[int]]:
+    """
+    Ändringen av tabellraderna för par (före, efter) av resultat-snapshots från
+    crud_match (home_team_id, away_team_id, home_score, away_score, match_date,
+    match_id, league, season): före dras bort och efter läggs till.
+    Returnerar (league, season, team_id) -> räknare i STANDING_COLUMNS-ordning,
+    utan nycklar där allt tar ut varandra.
+    """
+    deltas: dict[tuple, list[int]] = {}
+    for before, after in changes:
+        if before == after:
+            continue
+        for snapshot, sign in ((before, -1), (after, 1)):
+            if snapshot is None:
+                continue
+            home_team_id, away_team_id, home_score, away_score, _, _, league, season = snapshot
+            if home_score is None or away_score is None:
+                continue
+            for team_id, goals_for, goals_against in (
+                (home_team_id, home_score, away_score), (away_team_id, away_score, home_score)
+            ):
+                delta = deltas.setdefault((league, season, team_id), [0] * len(STANDING_COLUMNS))
+                for i, value in enumerate(_result_counts(goals_for, goals_against)):
+                    delta[i] += sign * value
+    return {key: delta for key, delta in deltas.items() if any(delta)}
+
+async def apply_standing_changes(
+    db: AsyncSession, changes: list[tuple[Optional[tuple], Optional[tuple]]]
+) -> set[tuple[str, str]]:
+    """
+    Lägg deltan för ändrade resultat på tabellraderna, utan att läsa dem först:
+        INSERT ... ON CONFLICT (league, season, team_id)
+        DO UPDATE SET played = league_standings.played + excluded.played, ...
+    Ökningen görs i databasen, så två samtidiga transaktioner som ändrar samma
+    rad inte skriver över varandras delta. Raderna skrivs i nyckelordning så att
+    samtidiga transaktioner låser dem i samma ordning. Rader utan spelade
+    matcher kvar raderas. Körs i anroparens transaktion.
+    Returnerar de (league, season) vars tabell ändrats.
+    """
+    deltas = standing_deltas(changes)
+    if not deltas:
+        return set()
+
+    stmt = (await dialect_insert(db))(LeagueStanding)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=STANDING_KEY_COLUMNS,
+        set_={
+            **{name: getattr(LeagueStanding, name) + getattr(stmt.excluded, name) for name in STANDING_COLUMNS},
+            "updated_at": func.now(),
+        },
+    )
+    await db.execute(stmt, [
+        dict(zip(STANDING_KEY_COLUMNS + STANDING_COLUMNS, (*key, *delta)))
+        for key, delta in sorted(deltas.items())
+    ])
+
+    # Bara rader där en match dragits bort kan ha blivit tomma
+    emptied = [key for key, delta in deltas.items() if delta[0] < 0]
+    if emptied:
+        await db.execute(
+            delete(LeagueStanding).where(
+                tuple_(LeagueStanding.league, LeagueStanding.season, LeagueStanding.team_id).in_(emptied),
+                LeagueStanding.played <= 0,
+            )
+        )
+    return {(league, season) for league, season, _ in deltas}
+
+def _standings_aggregate(seasons: Optional[list[tuple[str, str]]] = None):
+    # En rad per liga, säsong och lag ur spelade matcher: hemma- och bortaperspektivet
+    # som UNION ALL och en GROUP BY över båda
+    def team_results(team_id, goals_for, goals_against):
+        stmt = select(
+            Match.league, Match.season,
+            team_id.label("team_id"), goals_for.label("goals_for"), goals_against.label("goals_against"),
+        ).filter(Match.status == 'FINISHED', Match.home_score.is_not(None), Match.away_score.is_not(None))
+        if seasons is not None:
+            stmt = stmt.filter(tuple_(Match.league, Match.season).in_(seasons))
+        return stmt
+
+    results = union_all(
+        team_results(Match.home_team_id, Match.home_score, Match.away_score),
+        team_results(Match.away_team_id, Match.away_score, Match.home_score),
+    ).subquery("results")
+    won = func.sum(case((results.c.goals_for > results.c.goals_against, 1), else_=0))
+    drawn = func.sum(case((results.c.goals_for == results.c.goals_against, 1), else_=0))
+    lost = func.sum(case((results.c.goals_for < results.c.goals_against, 1), else_=0))
+    return select(
+        results.c.league, results.c.season, results.c.team_id,
+        func.count(),
+        won, drawn, lost,
+        func.sum(results.c.goals_for), func.sum(results.c.goals_against),
+        won * literal(POINTS_FOR_WIN) + drawn * literal(POINTS_FOR_DRAW),
+    ).group_by(results.c.league, results.c.season, results.c.team_id)
+
+async def rebuild_standings(db: AsyncSession, seasons: Optional[Iterable[tuple[str, str]]] = None) -> None:
+    """
+    Bygg om tabellerna för (league, season)-paren i seasons (alla om None) med
+    en DELETE och en INSERT ... SELECT som aggregerar matcherna i databasen.
+    Ingen commit här.
+    """
+    if seasons is not None:
+        seasons = sorted(set(seasons))
+        if not seasons:
+            return
+    stmt = delete(LeagueStanding)
+    if seasons is not None:
+        stmt = stmt.where(tuple_(LeagueStanding.league, LeagueStanding.season).in_(seasons))
+    await db.execute(stmt)
+    await db.execute(
+        insert(LeagueStanding).from_select(STANDING_KEY_COLUMNS + STANDING_COLUMNS, _standings_aggregate(seasons))
+    )
+
+async def rebuild_all_standings(db: AsyncSession) -> int:
+    """
+    Bygg om league_standings från matches (t.ex. efter import av historik eller
+    ändrade poängregler). Returnerar antal tabellrader.
+    """
+    await rebuild_standings(db)
+    await db.commit()
+    return (await db.execute(select(func.count()).select_from(LeagueStanding))).scalar_one()
+
+async def get_standings(db: AsyncSession, league: str, season: str) -> list[LeagueStanding]:
+    """
+    Tabellen för en liga och säsong: poäng, målskillnad och gjorda mål, fallande.
+    En indexfråga mot league_standings, oberoende av antalet matcher.
+    """
+    stmt = (
+        select(LeagueStanding)
+        .filter(LeagueStanding.league == league, LeagueStanding.season == season)
+        .order_by(
+            LeagueStanding.points.desc(),
+            (LeagueStanding.goals_for - LeagueStanding.goals_against).desc(),
+            LeagueStanding.goals_for.desc(),
+            LeagueStanding.team_id,
+        )
+    )
+    result = await db.execute(stmt)
+    return result.scalars().all()
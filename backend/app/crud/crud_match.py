@@ -1,17 +1,107 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload 
-from typing import List, Optional 
+from sqlalchemy.orm import aliased
+from sqlalchemy.sql import or_, tuple_
+from sqlalchemy import Integer, String, cast, column, delete, func, insert, update, values
+from typing import AsyncIterator, List, Optional 
+import datetime
 
 from app.models.match import Match 
 from app.models.team import Team 
 from app.schemas.match import MatchCreate, MatchUpdate 
+from app.crud import crud_league_standing, crud_match_prediction, crud_team_form, crud_team_rating
+from app.crud.crud_team_form import REBUILD_CHUNK_SIZE
+from app.core.prediction_cache import prediction_cache
+from app.core.match_snapshot import match_snapshot_store
+from app.core.match_events import match_event_hub
+from app.core.prediction_scheduler import prediction_scheduler
+
+def _result_tuple(
+    status, home_team_id, away_team_id, home_score, away_score, match_date, match_id, league, season
+) -> Optional[tuple]:
+    # Utan båda målen räknas matchen inte som spelad (som i formen, tabellen och bilden i minnet)
+    if status != 'FINISHED' or home_score is None or away_score is None:
+        return None
+    return (home_team_id, away_team_id, home_score, away_score, match_date, match_id, league, season)
+
+def _result_snapshot(db_match: Match) -> Optional[tuple]:
+    """
+    De fält i en spelad match som påverkar lagens form, rating och ligatabell,
+    eller None om matchen inte är spelad (eller saknar resultat). Två snapshots jämförs för att avgöra
+    om något måste räknas om; form och rating använder bara de sex första
+    (league och season påverkar bara tabellen).
+    """
+    return _result_tuple(
+        db_match.status,
+        db_match.home_team_id,
+        db_match.away_team_id,
+        db_match.home_score,
+        db_match.away_score,
+        db_match.match_date,
+        db_match.id,
+        db_match.league,
+        db_match.season,
+    )
+
+async def _apply_result_changes(db: AsyncSession, changes: list[tuple[Optional[tuple], Optional[tuple]]]) -> set[int]:
+    """
+    Uppdatera förberäknad form, Elo-rating och ligatabeller för de lag som berörs
+    när spelade resultat skapas, ändras eller raderas. changes är par (före, efter)
+    av snapshots. Tabellerna får bara deltan för de ändrade matcherna.
+    Körs före commit, i samma transaktion, med en formuppdatering för alla lag.
+    Returnerar id för de berörda lagen (tom mängd om inget ändrats); en omräkning
+    av ratingarna kan beröra fler lag än de som spelat matcherna. Lagens
+    förberäknade prediktioner markeras som inaktuella i samma transaktion.
+    Låsen tas i samma ordning i alla skrivningar: matchraderna (före läsningen av
+    före-snapshoten), lagen (formen), ratingarna, tabellraderna.
+    """
+    result_changes = [
+        (before[:6] if before else None, after[:6] if after else None)
+        for before, after in changes
+    ]
+    team_ids = {
+        team_id
+        for before, after in result_changes if before != after
+        for snapshot in (before, after) if snapshot
+        for team_id in snapshot[:2]
+    }
+    if team_ids:
+        await db.flush()
+        await crud_team_form.refresh_team_form(db, team_ids)
+        team_ids |= await crud_team_rating.apply_rating_changes(db, result_changes)
+    await crud_league_standing.apply_standing_changes(db, changes)
+    if team_ids:
+        await crud_match_prediction.mark_teams_stale(db, team_ids)
+    return team_ids
+
+async def _apply_result_change(db: AsyncSession, before: Optional[tuple], after: Optional[tuple]) -> set[int]:
+    return await _apply_result_changes(db, [(before, after)])
+
+async def _after_result_commit(team_ids: set[int], action: Optional[str] = None, matches=()) -> None:
+    """
+    Körs efter commit när lagens form har ändrats. Vattenstämplarna i
+    prediktionscachen räknas upp först nu, så att en samtidig request som
+    fortfarande läser den gamla formen inte kan spara den under den nya nyckeln.
+    action ("created", "updated", "deleted") och de ändrade matcherna skickas
+    till GET /matches/stream, tillsammans med nya prediktioner om formen ändrats.
+    Utan matches (bulkimport) har matcher bara lagts till.
+    """
+    if team_ids:
+        # Bilden i minnet används inte förrän den har laddats om med de ändrade matcherna
+        match_snapshot_store.mark_stale(
+            [match["id"] if isinstance(match, dict) else match.id for match in matches]
+        )
+        await prediction_cache.invalidate_teams(team_ids)
+        prediction_scheduler.notify()
+    if action is not None:
+        match_event_hub.publish_changes(action, matches, team_ids)
 
 async def create_match(db: AsyncSession, match: MatchCreate) -> Match:
     """
-    Skapa en ny match i databasen.
+    Skapa en ny match i databasen. INSERT ... RETURNING ger tillbaka hela raden
+    (inklusive id), så ingen refresh behövs efter commit.
     """
-    db_match = Match(
+    stmt = insert(Match).values(
         match_date=match.match_date,
         home_team_id=match.home_team_id,
         away_team_id=match.away_team_id,
@@ -20,75 +110,344 @@ async def create_match(db: AsyncSession, match: MatchCreate) -> Match:
         league=match.league,
         season=match.season,
         status=match.status
-    )
-    db.add(db_match)
+    ).returning(Match)
+    db_match = (await db.execute(stmt)).scalar_one()
+    affected_team_ids = await _apply_result_change(db, None, _result_snapshot(db_match))
     await db.commit()
-    await db.refresh(db_match)
-    await db.refresh(db_match, attribute_names=['home_team', 'away_team'])
+    await _after_result_commit(affected_team_ids, "created", [db_match])
     return db_match
 
-async def get_match(db: AsyncSession, match_id: int) -> Optional[Match]:
+# Kolumnordningen för rader till insert_matches_bulk
+BULK_MATCH_COLUMNS = [
+    "match_date", "home_team_id", "away_team_id", "home_score",
+    "away_score", "league", "season", "status"
+]
+
+async def insert_matches_bulk(db: AsyncSession, rows: list[tuple]) -> int:
     """
-    Hämta en specifik match baserat på dess ID, inklusive relaterad laginformation.
+    Skriv många matcher på en gång, rader som tupler i BULK_MATCH_COLUMNS-ordning.
+    Med asyncpg används COPY, annars en multi-row INSERT.
+    Ingen commit och ingen formuppdatering här, avsluta med finish_bulk_insert.
+    Transaktionen måste redan vara startad (t.ex. av en tidigare fråga i sessionen),
+    annars körs COPY utanför den.
     """
-    stmt = (
-        select(Match)
-        .options(
-            selectinload(Match.home_team), 
-            selectinload(Match.away_team) 
+    if not rows:
+        return 0
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            Match.__tablename__, records=rows, columns=BULK_MATCH_COLUMNS
         )
-        .filter(Match.id == match_id)
-    )
+    else:
+        await db.execute(insert(Match), [dict(zip(BULK_MATCH_COLUMNS, row)) for row in rows])
+    return len(rows)
+
+async def finish_bulk_insert(
+    db: AsyncSession,
+    finished_team_ids: set[int],
+    earliest_finished_date: Optional[datetime.datetime] = None,
+    finished_seasons: Optional[set[tuple[str, str]]] = None
+) -> None:
+    """
+    Avsluta en bulkimport: räkna om formen för lag med nya spelade matcher,
+    ratingarna från den tidigaste nya spelade matchen (alla matcher om datumet
+    inte anges) och ligatabellerna för (league, season)-paren med nya spelade
+    matcher (alla tabeller om de inte anges), committa allt i en transaktion
+    och invalidera prediktionscachen.
+    """
+    team_ids = sorted(finished_team_ids)
+    for start in range(0, len(team_ids), REBUILD_CHUNK_SIZE):
+        await crud_team_form.refresh_team_form(db, team_ids[start:start + REBUILD_CHUNK_SIZE])
+    rated_team_ids = set()
+    if team_ids:
+        rated_team_ids = await crud_team_rating.replay_ratings_since(db, earliest_finished_date)
+        # En import lägger till många matcher per tabell, då är en aggregering billigare än deltan
+        await crud_league_standing.rebuild_standings(db, finished_seasons)
+    await crud_match_prediction.mark_teams_stale(db, set(team_ids) | rated_team_ids)
+    await db.commit()
+    await _after_result_commit(set(team_ids) | rated_team_ids)
+
+async def get_match(db: AsyncSession, match_id: int) -> Optional[Match]:
+    """
+    Hämta en specifik match baserat på dess ID. Laginformationen i svaren
+    fylls i från lagkatalogen (crud_team.get_teams_by_ids), inte med en join.
+    """
+    stmt = select(Match).filter(Match.id == match_id)
     result = await db.execute(stmt)
     return result.scalar_one_or_none()
 
+def match_filters(
+    league: Optional[str] = None,
+    season: Optional[str] = None,
+    status: Optional[str] = None,
+    team_id: Optional[int] = None,
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = None,
+) -> list:
+    """
+    Bygg WHERE-villkor för matchlistor. Alla filter är valfria och kombineras med AND.
+    date_from är inkluderande, date_to exkluderande.
+    """
+    conditions = []
+    if league is not None:
+        conditions.append(Match.league == league)
+    if season is not None:
+        conditions.append(Match.season == season)
+    if status is not None:
+        conditions.append(Match.status == status)
+    if team_id is not None:
+        conditions.append(or_(Match.home_team_id == team_id, Match.away_team_id == team_id))
+    if date_from is not None:
+        conditions.append(Match.match_date >= date_from)
+    if date_to is not None:
+        conditions.append(Match.match_date < date_to)
+    return conditions
+
+def _match_page(
+    stmt,
+    skip: int,
+    limit: int,
+    after: Optional[tuple[datetime.datetime, int]],
+    filters: dict
+):
+    stmt = (
+        stmt
+        .filter(*match_filters(**filters))
+        .order_by(Match.match_date.desc(), Match.id.desc()) 
+        .limit(limit)
+    )
+    if after is not None:
+        return stmt.filter(tuple_(Match.match_date, Match.id) < tuple_(*after))
+    return stmt.offset(skip)
+
 async def get_matches(
-    db: AsyncSession, skip: int = 0, limit: int = 100
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[tuple[datetime.datetime, int]] = None,
+    **filters
 ) -> List[Match]: 
     """
-    Hämta en lista med matcher, inklusive relaterad laginformation, med paginering.
+    Hämta en lista med matcher sorterad på (match_date, id) fallande.
+    Med 'after' (match_date, id från sista raden på föregående sida) används
+    keyset-paginering, annars offset-paginering med 'skip'.
+    Övriga nyckelordsargument skickas till match_filters.
+    """
+    result = await db.execute(_match_page(select(Match), skip, limit, after, filters))
+    return result.scalars().all()
+
+# Kolumnerna i raderna från get_match_rows (fälten i MatchRead utom lagobjekten)
+MATCH_ROW_COLUMNS = [
+    "match_date", "league", "season", "home_team_id", "away_team_id",
+    "status", "id", "home_score", "away_score"
+]
+
+async def get_match_rows(
+    db: AsyncSession,
+    skip: int = 0,
+    limit: int = 100,
+    after: Optional[tuple[datetime.datetime, int]] = None,
+    **filters
+) -> list:
+    """
+    Samma sida som get_matches, men som rena rader i MATCH_ROW_COLUMNS-ordning
+    (inga ORM-objekt). Används av list-endpointen som kodar svaret direkt.
+    """
+    columns = [getattr(Match, name) for name in MATCH_ROW_COLUMNS]
+    result = await db.execute(_match_page(select(*columns), skip, limit, after, filters))
+    return result.all()
+
+# Kolumnerna i exporten, i samma ordning som raderna från stream_match_rows
+EXPORT_COLUMNS = [
+    "id", "match_date", "league", "season", "status",
+    "home_team_id", "home_team", "away_team_id", "away_team",
+    "home_score", "away_score"
+]
+
+async def stream_match_rows(
+    db: AsyncSession, batch_size: int = 1000, **filters
+) -> AsyncIterator[list[tuple]]:
     """
+    Strömma matcher som rena tupler (EXPORT_COLUMNS) i block om batch_size rader,
+    äldst först. Lagnamnen joinas in i SQL och raderna hämtas med en server-side
+    cursor, så minnesanvändningen är konstant oavsett antal rader.
+    Nyckelordsargumenten skickas till match_filters.
+    """
+    home_team = aliased(Team)
+    away_team = aliased(Team)
     stmt = (
-        select(Match)
-        .options(
-            selectinload(Match.home_team), 
-            selectinload(Match.away_team) 
+        select(
+            Match.id, Match.match_date, Match.league, Match.season, Match.status,
+            Match.home_team_id, home_team.name,
+            Match.away_team_id, away_team.name,
+            Match.home_score, Match.away_score
         )
-        .offset(skip)
-        .limit(limit)
-        .order_by(Match.match_date.desc()) 
+        .join(home_team, Match.home_team_id == home_team.id)
+        .join(away_team, Match.away_team_id == away_team.id)
+        .filter(*match_filters(**filters))
+        .order_by(Match.match_date, Match.id)
+        .execution_options(yield_per=batch_size)
     )
-    result = await db.execute(stmt)
-    return result.scalars().all()
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        yield partition
+
+async def _lock_match(db: AsyncSession, match_id: int) -> Optional[Match]:
+    # Läs om raden med FOR UPDATE i skrivtransaktionen. Före-snapshoten måste komma
+    # härifrån: två samtidiga PUT med samma resultat skulle annars båda se matchen
+    # som ospelad och lägga på tabelldeltan två gånger.
+    stmt = (
+        select(Match)
+        .filter(Match.id == match_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return (await db.execute(stmt)).scalar_one_or_none()
 
 async def update_match(
     db: AsyncSession, 
     db_match: Match, 
     match_in: MatchUpdate 
-) -> Match:
+) -> Optional[Match]:
     """
-    Uppdatera en existerande match.
+    Uppdatera en existerande match med UPDATE ... RETURNING (ingen refresh efter commit).
+    Raden låses och läses om innan ändringen räknas fram; None om matchen har
+    raderats sedan db_match lästes.
     """
     update_data = match_in.model_dump(exclude_unset=True)
-    
-    for field, value in update_data.items():
-        setattr(db_match, field, value)
-            
-    db.add(db_match)
+    db_match = await _lock_match(db, db_match.id)
+    if db_match is None:
+        return None
+    before = _result_snapshot(db_match)
+
+    if update_data:
+        stmt = (
+            update(Match)
+            .where(Match.id == db_match.id)
+            .values(**update_data)
+            .returning(Match)
+            .execution_options(populate_existing=True)
+        )
+        db_match = (await db.execute(stmt)).scalar_one()
+
+    affected_team_ids = await _apply_result_change(db, before, _result_snapshot(db_match))
     await db.commit()
-    await db.refresh(db_match)
-    await db.refresh(db_match, attribute_names=['home_team', 'away_team'])
+    await _after_result_commit(affected_team_ids, "updated", [db_match])
     return db_match 
 
+# Kolumnerna i VALUES-listan för update_match_scores_bulk
+BULK_SCORE_COLUMNS = ["id", "home_score", "away_score", "status"]
+
+async def update_match_scores_bulk(db: AsyncSession, updates: list[tuple]) -> list:
+    """
+    Uppdatera resultat och status för många matcher i en transaktion.
+    updates är tupler i BULK_SCORE_COLUMNS-ordning; None betyder "oförändrat".
+    I Postgres blir det EN sats:
+        UPDATE matches SET ... = COALESCE(v...., matches....)
+        FROM (VALUES ...) AS v, matches AS old
+        WHERE matches.id = v.id AND old.id = v.id
+        RETURNING matches.*, old.home_score, old.away_score, old.status
+    där 'old' ger raderna som de såg ut före satsen (för formuppdateringen).
+    Raderna låses först (SELECT ... ORDER BY id FOR UPDATE): under READ COMMITTED
+    läser 'old' annars versionen från före en samtidig skrivning som satsen
+    väntat på, och samma resultat skulle räknas in i tabellerna två gånger.
+    Returnerar de uppdaterade raderna som dicts (kolumnerna plus old_*);
+    okända id ignoreras.
+    """
+    if not updates:
+        return []
+    table = Match.__table__
+    old = table.alias("old")
+    returned_columns = (
+        *table.c,
+        old.c.home_score.label("old_home_score"),
+        old.c.away_score.label("old_away_score"),
+        old.c.status.label("old_status"),
+    )
+
+    await db.execute(
+        select(table.c.id)
+        .where(table.c.id.in_(sorted({update[0] for update in updates})))
+        .order_by(table.c.id)
+        .with_for_update()
+    )
+
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        new_values = values(
+            column("id", Integer), column("home_score", Integer),
+            column("away_score", Integer), column("status", String),
+            name="v"
+        ).data(updates)
+        stmt = (
+            update(table)
+            .where(table.c.id == new_values.c.id, old.c.id == new_values.c.id)
+            .values(
+                # Cast behövs om en kolumn bara innehåller NULL (då tolkas den som text)
+                home_score=func.coalesce(cast(new_values.c.home_score, Integer), table.c.home_score),
+                away_score=func.coalesce(cast(new_values.c.away_score, Integer), table.c.away_score),
+                status=func.coalesce(cast(new_values.c.status, String), table.c.status),
+            )
+            .returning(*returned_columns)
+        )
+        rows = [dict(row._mapping) for row in await db.execute(stmt)]
+    else:
+        # Andra databaser (t.ex. SQLite i tester): samma resultat, en sats per match
+        rows = []
+        for match_id, home_score, away_score, match_status in updates:
+            current = (await db.execute(select(table).filter(table.c.id == match_id))).first()
+            if current is None:
+                continue
+            stmt = (
+                update(table)
+                .where(table.c.id == match_id)
+                .values(
+                    home_score=func.coalesce(home_score, table.c.home_score),
+                    away_score=func.coalesce(away_score, table.c.away_score),
+                    status=func.coalesce(match_status, table.c.status),
+                )
+                .returning(*table.c)
+            )
+            row = (await db.execute(stmt)).one()
+            rows.append({
+                **row._mapping,
+                "old_home_score": current.home_score,
+                "old_away_score": current.away_score,
+                "old_status": current.status,
+            })
+
+    changes = [
+        (
+            _result_tuple(
+                row["old_status"], row["home_team_id"], row["away_team_id"],
+                row["old_home_score"], row["old_away_score"], row["match_date"], row["id"],
+                row["league"], row["season"]
+            ),
+            _result_tuple(
+                row["status"], row["home_team_id"], row["away_team_id"],
+                row["home_score"], row["away_score"], row["match_date"], row["id"],
+                row["league"], row["season"]
+            ),
+        )
+        for row in rows
+    ]
+    affected_team_ids = await _apply_result_changes(db, changes)
+    await db.commit()
+    await _after_result_commit(affected_team_ids, "updated", rows)
+    return rows
+
 async def delete_match(db: AsyncSession, match_id: int) -> Optional[Match]:
     """
-    Radera en match från databasen baserat på dess ID.
+    Radera en match från databasen baserat på dess ID, med DELETE ... RETURNING.
     Returnerar det raderade matchobjektet om det hittades, annars None.
     """
-    db_match = await get_match(db=db, match_id=match_id) 
+    stmt = delete(Match).where(Match.id == match_id).returning(Match)
+    db_match = (await db.execute(stmt)).scalar_one_or_none()
     if db_match:
-        await db.delete(db_match) 
+        affected_team_ids = await _apply_result_change(db, _result_snapshot(db_match), None)
         await db.commit()        
+        await _after_result_commit(affected_team_ids, "deleted", [db_match])
         
         return db_match 
     return None 
@@ -0,0 +1,97 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.sql import or_
+from sqlalchemy import insert, update
+from typing import Iterable, Optional
+
+from app.models.match import Match
+from app.models.match_prediction import MatchPrediction
+
+# Matcher som får förberäknade prediktioner: alla som inte är spelade, oavsett
+# status (saknas, SCHEDULED, TIMED, POSTPONED ...). IS DISTINCT FROM tar med NULL
+UPCOMING = Match.status.is_distinct_from('FINISHED')
+
+async def get_match_prediction(db: AsyncSession, match_id: int) -> Optional[MatchPrediction]:
+    """
+    Prediktionen för en match (uppslag på primärnyckeln), None om den saknas.
+    """
+    result = await db.execute(select(MatchPrediction).filter(MatchPrediction.match_id == match_id))
+    return result.scalar_one_or_none()
+
+async def get_match_predictions(db: AsyncSession, match_ids: Iterable[int]) -> dict[int, MatchPrediction]:
+    """
+    Prediktionerna för flera matcher med en fråga. Matcher utan prediktion saknas i svaret.
+    """
+    result = await db.execute(select(MatchPrediction).filter(MatchPrediction.match_id.in_(list(match_ids))))
+    return {prediction.match_id: prediction for prediction in result.scalars().all()}
+
+async def mark_teams_stale(db: AsyncSession, team_ids: Iterable[int]) -> None:
+    """
+    Räkna upp inputs_version för kommande matcher med något av lagen. Körs av
+    crud_match i samma transaktion som resultatändringen, så en prediktion som
+    räknas samtidigt med den gamla formen blir aldrig markerad som aktuell.
+    """
+    team_ids = list(team_ids)
+    if not team_ids:
+        return
+    upcoming = select(Match.id).filter(
+        UPCOMING,
+        or_(Match.home_team_id.in_(team_ids), Match.away_team_id.in_(team_ids))
+    )
+    await db.execute(
+        update(MatchPrediction)
+        .where(MatchPrediction.match_id.in_(upcoming))
+        .values(inputs_version=MatchPrediction.inputs_version + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+async def add_missing_fixtures(db: AsyncSession) -> int:
+    """
+    Lägg till en tom rad (ej beräknad) för varje kommande match som saknar en,
+    med en INSERT ... SELECT. Raden finns då innan prediktionen räknas, så att
+    mark_teams_stale fångar resultat som ändras under tiden. Ingen commit här.
+    """
+    missing = (
+        select(Match.id, Match.home_team_id, Match.away_team_id)
+        .outerjoin(MatchPrediction, MatchPrediction.match_id == Match.id)
+        .filter(UPCOMING, MatchPrediction.match_id.is_(None))
+    )
+    result = await db.execute(
+        insert(MatchPrediction).from_select(["match_id", "home_team_id", "away_team_id"], missing)
+    )
+    return result.rowcount
+
+async def get_pending_fixtures(db: AsyncSession, model_version: str, limit: int) -> list:
+    """
+    Kommande matcher vars prediktion behöver räknas (om): aldrig beräknad,
+    inaktuell efter ett ändrat resultat, räknad med en annan modellversion
+    eller för andra lag än matchen har nu. Närmaste matcherna först.
+    Raderna har match_id, home_team_id, away_team_id och inputs_version.
+    """
+    stmt = (
+        select(Match.id.label("match_id"), Match.home_team_id, Match.away_team_id, MatchPrediction.inputs_version)
+        .join(MatchPrediction, MatchPrediction.match_id == Match.id)
+        .filter(
+            UPCOMING,
+            or_(
+                MatchPrediction.computed_version < MatchPrediction.inputs_version,
+                MatchPrediction.model_version.is_distinct_from(model_version),
+                MatchPrediction.home_team_id != Match.home_team_id,
+                MatchPrediction.away_team_id != Match.away_team_id,
+            )
+        )
+        .order_by(Match.match_date, Match.id)
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return result.all()
+
+async def save_predictions(db: AsyncSession, rows: list[dict]) -> None:
+    """
+    Skriv beräknade prediktioner med en UPDATE per rad via primärnyckeln
+    (executemany). computed_version sätts till inputs_version som den lästes
+    före beräkningen, så en ändring under tiden lämnar raden inaktuell.
+    Ingen commit här.
+    """
+    if rows:
+        await db.execute(update(MatchPrediction), rows)
@@ -1,29 +1,120 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select 
+from sqlalchemy.sql import tuple_
+from sqlalchemy import insert
+from typing import Iterable, Optional
 from app.models.team import Team
-from app.schemas.team import TeamCreate, TeamUpdate
+from app.schemas.team import TeamCreate, TeamRead, TeamUpdate
+from app.core.team_directory import team_directory
 
 # Funktion för att hämta ett lag baserat på ID
 async def get_team(db: AsyncSession, team_id: int) -> Team | None:
     result = await db.execute(select(Team).filter(Team.id == team_id))
     return result.scalar_one_or_none()
 
+# Funktion för att fylla lagkatalogen med alla lag (en fråga)
+async def warm_team_directory(db: AsyncSession) -> int:
+    result = await db.execute(select(Team))
+    teams = result.scalars().all()
+    team_directory.replace_all(teams)
+    return len(teams)
+
+# Funktion för att hämta många lag på en gång, id -> TeamRead. Lag som inte finns saknas i svaret.
+# Lagkatalogen används först; saknade id hämtas med EN IN-fråga och läggs till i katalogen
+async def get_teams_by_ids(db: AsyncSession, team_ids: Iterable[int]) -> dict[int, TeamRead]:
+    if not team_directory.is_complete():
+        await warm_team_directory(db)
+    teams, missing = team_directory.lookup(team_ids)
+    if missing:
+        result = await db.execute(select(Team).filter(Team.id.in_(missing)))
+        for team in result.scalars().all():
+            teams[team.id] = team_directory.add(team)
+    return teams
+
+# Funktion för att låsa lagens rader till transaktionens slut, i id-ordning så att två
+# transaktioner inte kan låsa samma lag i olika ordning. FOR NO KEY UPDATE blockerar inte
+# främmande nycklar (nya matcher för lagen). SQLite saknar radlås men har bara en skrivare i taget
+async def lock_teams(db: AsyncSession, team_ids: Iterable[int]) -> None:
+    stmt = (
+        select(Team.id)
+        .filter(Team.id.in_(sorted(set(team_ids))))
+        .order_by(Team.id)
+        .with_for_update(key_share=True)
+    )
+    await db.execute(stmt)
+
+# Funktion för att slå upp ett lags id från namnet, utan fråga när lagkatalogen är fylld
+async def get_team_id_by_name(db: AsyncSession, name: str) -> Optional[int]:
+    team_id = team_directory.id_for_name(name)
+    if team_id is not None or team_directory.is_complete():
+        return team_id
+    db_team = await get_team_by_name(db, name)
+    return db_team.id if db_team else None
+
 # Funktion för att hämta ett lag baserat på namn (bra för att undvika dubbletter)
 async def get_team_by_name(db: AsyncSession, name: str) -> Team | None:
     result = await db.execute(select(Team).filter(Team.name == name))
     return result.scalar_one_or_none()
 
-# Funktion för att hämta en lista med lag (med paginering)
-async def get_teams(db: AsyncSession, skip: int = 0, limit: int = 100) -> list[Team]:
-    result = await db.execute(select(Team).offset(skip).limit(limit))
+# Funktion för att hämta en lista med lag, sorterad på (name, id)
+# Med 'after' (name, id från sista laget på föregående sida) används keyset-paginering, annars offset
+async def get_teams(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after: tuple[str, int] | None = None
+) -> list[Team]:
+    stmt = select(Team).order_by(Team.name, Team.id).limit(limit)
+    if after is not None:
+        stmt = stmt.filter(tuple_(Team.name, Team.id) > tuple_(*after))
+    else:
+        stmt = stmt.offset(skip)
+    result = await db.execute(stmt)
     return result.scalars().all() # Använd .scalars() för att få ORM-objekten
 
+# Kolumnerna i raderna från get_team_rows (fälten i TeamRead)
+TEAM_ROW_COLUMNS = ["name", "league", "id"]
+
+# Samma sida som get_teams men som rena rader i TEAM_ROW_COLUMNS-ordning (inga ORM-objekt)
+async def get_team_rows(
+    db: AsyncSession, skip: int = 0, limit: int = 100, after: tuple[str, int] | None = None
+) -> list:
+    stmt = select(*(getattr(Team, name) for name in TEAM_ROW_COLUMNS)).order_by(Team.name, Team.id).limit(limit)
+    if after is not None:
+        stmt = stmt.filter(tuple_(Team.name, Team.id) > tuple_(*after))
+    else:
+        stmt = stmt.offset(skip)
+    result = await db.execute(stmt)
+    return result.all()
+
+# Funktion för att hämta alla lag som en dict namn -> id med en fråga (används vid bulkimport)
+async def get_team_ids_by_name(db: AsyncSession) -> dict[str, int]:
+    result = await db.execute(select(Team.name, Team.id))
+    return {name: team_id for name, team_id in result.all()}
+
+# Funktion för att skapa många lag med en fråga, teams är namn -> liga
+# Ingen commit här, lagen skrivs i anroparens transaktion. Returnerar namn -> id
+async def create_teams_bulk(db: AsyncSession, teams: dict[str, str]) -> dict[str, int]:
+    if not teams:
+        return {}
+    stmt = (
+        insert(Team)
+        .values([{"name": name, "league": league} for name, league in teams.items()])
+        .returning(Team.name, Team.id)
+    )
+    result = await db.execute(stmt)
+    return {name: team_id for name, team_id in result.all()}
+
+# Lägg till lag skapade med create_teams_bulk i lagkatalogen, efter att anroparen har committat
+# (teams är namn -> liga som till create_teams_bulk, team_ids namn -> id som den returnerade)
+def add_created_teams(teams: dict[str, str], team_ids: dict[str, int]) -> None:
+    for name, league in teams.items():
+        team_directory.add(TeamRead(id=team_ids[name], name=name, league=league))
+
 # Funktion för att skapa ett nytt lag
 async def create_team(db: AsyncSession, team: TeamCreate) -> Team:
     db_team = Team(**team.model_dump()) 
     db.add(db_team) 
     await db.commit() 
     await db.refresh(db_team) 
+    team_directory.add(db_team)
     return db_team
 # Funktion för att updatera ett lag
 async def update_team(
@@ -45,4 +136,5 @@ async def update_team(
     db.add(db_team)
     await db.commit()
     await db.refresh(db_team)
+    team_directory.add(db_team)
     return db_team
\ No newline at end of file
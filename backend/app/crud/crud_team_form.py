@@ -0,0 +1,101 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete, func
+from typing import Iterable
+
+from app.core.feature_engineering import (
+    FORM_WINDOW,
+    TEAM_FEATURE_NAMES,
+    FeatureSchema,
+    compute_schema_features,
+    feature_schema,
+    get_recent_matches_for_teams,
+)
+from app.crud.crud_team import lock_teams
+from app.db.upsert import dialect_insert
+from app.models.team import Team
+from app.models.team_form import TeamForm
+
+# Antal lag per fråga vid ombyggnad av hela tabellen
+REBUILD_CHUNK_SIZE = 500
+
+# Kolumnerna avg_goals_scored, avg_goals_conceded och form_points gäller FORM_WINDOW
+_FORM_WINDOW_SCHEMA = FeatureSchema(windows=(FORM_WINDOW,))
+
+# Kolumnerna som skrivs om för ett lag (allt utom team_id)
+FORM_COLUMNS = ["matches_counted", *TEAM_FEATURE_NAMES, "features", "feature_schema", "recent_results"]
+
+async def refresh_team_form(db: AsyncSession, team_ids: Iterable[int]) -> list[int]:
+    """
+    Räkna om formen för de angivna lagen och skriv den till team_form.
+    Alla block i feature-schemat räknas från en hämtning per lag.
+    Körs i anroparens transaktion (ingen commit här), så att formen alltid
+    uppdateras tillsammans med matchen som ändrade den.
+
+    Lagen låses först (crud_team.lock_teams), så två samtidiga resultat för
+    samma lag räknas i tur och ordning och den andra ser den första matchen.
+    Raderna skrivs med INSERT ... ON CONFLICT DO UPDATE; lag utan spelade
+    matcher kvar får ingen rad, som efter en ombyggnad.
+    Returnerar id för lagen som har en rad.
+    """
+    team_ids = sorted(set(team_ids))
+    if not team_ids:
+        return []
+    await lock_teams(db, team_ids)
+    recent = await get_recent_matches_for_teams(
+        db, team_ids, limit=max(feature_schema.fetch_window, FORM_WINDOW),
+        season_to_date=feature_schema.season_to_date
+    )
+    written_ids = recent.team_ids.tolist()
+    removed_ids = sorted(set(team_ids) - set(written_ids))
+    if removed_ids:
+        await db.execute(delete(TeamForm).where(TeamForm.team_id.in_(removed_ids)))
+    if not written_ids:
+        return []
+
+    features = compute_schema_features(recent.team_ids, recent.matches, recent.owners, recent.seasons)
+    form_features = compute_schema_features(
+        recent.team_ids, recent.matches, recent.owners, recent.seasons, _FORM_WINDOW_SCHEMA
+    )
+
+    rows = []
+    for position, team_id in enumerate(written_ids):
+        team_rows = recent.matches[recent.owners == position]
+        rows.append({
+            "team_id": team_id,
+            "matches_counted": len(team_rows),
+            **{name: float(value) for name, value in zip(TEAM_FEATURE_NAMES, form_features[position])},
+            "features": features[position].tolist(),
+            "feature_schema": feature_schema.key,
+            "recent_results": team_rows.tolist(),
+        })
+
+    stmt = (await dialect_insert(db))(TeamForm)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["team_id"],
+        set_={**{name: getattr(stmt.excluded, name) for name in FORM_COLUMNS}, "updated_at": func.now()},
+    )
+    await db.execute(stmt, rows)
+    return written_ids
+
+async def get_team_forms(db: AsyncSession, team_ids: Iterable[int]) -> dict[int, TeamForm]:
+    """
+    Hämta formen för flera lag med en fråga. Lag utan rad saknas i svaret.
+    """
+    result = await db.execute(select(TeamForm).filter(TeamForm.team_id.in_(list(team_ids))))
+    return {form.team_id: form for form in result.scalars().all()}
+
+async def rebuild_all_team_forms(db: AsyncSession) -> int:
+    """
+    Bygg om hela team_form-tabellen från matches (t.ex. efter import av historik).
+    Returnerar antal lag som räknats om.
+    """
+    await db.execute(delete(TeamForm))
+    result = await db.execute(select(Team.id).order_by(Team.id))
+    team_ids = result.scalars().all()
+
+    for start in range(0, len(team_ids), REBUILD_CHUNK_SIZE):
+        await refresh_team_form(db, team_ids[start:start + REBUILD_CHUNK_SIZE])
+
+    await db.commit()
+    return len(team_ids)
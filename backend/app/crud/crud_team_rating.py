@@ -0,0 +1,222 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy import delete, func, insert
+from typing import Iterable, Optional
+import datetime
+
+import numpy as np
+
+from app.core.ratings import INITIAL_RATING, elo_update, replay_ratings
+from app.models.match import Match
+from app.models.team_rating import TeamRating, TeamRatingHistory
+
+# Kolumnordningen för historikrader till _insert_history
+HISTORY_COLUMNS = ["team_id", "match_id", "match_date", "rating_before", "rating_after"]
+
+# Nyckel för pg_advisory_xact_lock som gör att ratingarna skrivs av en transaktion i taget
+RATINGS_LOCK_KEY = 0x52415447
+
+async def _lock_ratings(db: AsyncSession) -> None:
+    # Ett lås för alla lag, inte per lag: en omräkning från ett datum skriver om
+    # ratingen för alla lag som spelat sedan dess, och vilka det är vet man först
+    # efter att ha läst matcherna. Utan låset kan två samtidiga resultat läsa samma
+    # rating och ett Elo-steg försvinna. Låset släpps vid commit/rollback.
+    # SQLite har bara en skrivare i taget och behöver inget lås.
+    connection = await db.connection()
+    if connection.dialect.name == "postgresql":
+        await db.execute(select(func.pg_advisory_xact_lock(RATINGS_LOCK_KEY)))
+
+async def get_team_ratings(db: AsyncSession, team_ids: Iterable[int]) -> dict[int, TeamRating]:
+    """
+    Hämta ratingen för flera lag med en fråga. Lag utan spelade matcher saknas i svaret.
+    """
+    result = await db.execute(select(TeamRating).filter(TeamRating.team_id.in_(list(team_ids))))
+    return {rating.team_id: rating for rating in result.scalars().all()}
+
+async def get_rating_history(db: AsyncSession, team_id: int, limit: int = 100) -> list[TeamRatingHistory]:
+    """
+    Lagets ratinghistorik, senaste matchen först.
+    """
+    stmt = (
+        select(TeamRatingHistory)
+        .filter(TeamRatingHistory.team_id == team_id)
+        .order_by(TeamRatingHistory.match_date.desc(), TeamRatingHistory.match_id.desc())
+        .limit(limit)
+    )
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
+async def _insert_history(db: AsyncSession, rows: list[tuple]) -> None:
+    # Samma mönster som crud_match.insert_matches_bulk: COPY med asyncpg, annars multi-row INSERT
+    if not rows:
+        return
+    connection = await db.connection()
+    if connection.dialect.driver == "asyncpg":
+        raw_connection = await connection.get_raw_connection()
+        await raw_connection.driver_connection.copy_records_to_table(
+            TeamRatingHistory.__tablename__, records=rows, columns=HISTORY_COLUMNS
+        )
+    else:
+        await db.execute(insert(TeamRatingHistory), [dict(zip(HISTORY_COLUMNS, row)) for row in rows])
+
+async def _write_ratings(db: AsyncSession, team_ids: Optional[set[int]], ratings: list[dict]) -> None:
+    # Ersätt raderna för lagen (alla lag om team_ids är None) med två satser
+    stmt = delete(TeamRating)
+    if team_ids is not None:
+        stmt = stmt.where(TeamRating.team_id.in_(list(team_ids)))
+    await db.execute(stmt)
+    if ratings:
+        await db.execute(insert(TeamRating), ratings)
+
+async def apply_rating_changes(db: AsyncSession, changes: list[tuple[Optional[tuple], Optional[tuple]]]) -> set[int]:
+    """
+    Uppdatera ratingarna när spelade resultat skapas, ändras eller raderas.
+    changes är par (före, efter) av resultat-snapshots från crud_match
+    (home_team_id, away_team_id, home_score, away_score, match_date, match_id).
+
+    En match som blir spelad och är nyare än båda lagens senast ratade match
+    läggs på direkt: två rader läses, två skrivs och två historikrader läggs
+    till. Allt annat (ändrat eller raderat resultat, match före lagets senaste)
+    räknas om från det tidigaste berörda datumet med replay_ratings_since.
+    Körs i anroparens transaktion, som håller ratinglåset (_lock_ratings) till
+    commit. Returnerar id för lag vars rating ändrats.
+    """
+    changed = [(before, after) for before, after in changes if before != after]
+    if not changed:
+        return set()
+    await _lock_ratings(db)
+
+    if all(before is None for before, _ in changed):
+        team_ids = await _apply_new_results(db, [after for _, after in changed])
+        if team_ids is not None:
+            return team_ids
+
+    since = min(snapshot[4] for pair in changed for snapshot in pair if snapshot)
+    return await replay_ratings_since(db, since)
+
+async def _apply_new_results(db: AsyncSession, results: list[tuple]) -> Optional[set[int]]:
+    """
+    O(1)-vägen i apply_rating_changes. Returnerar None (och skriver inget) om
+    någon match inte är nyare än lagens senast ratade match.
+    """
+    results = sorted(results, key=lambda result: (result[4], result[5]))
+    team_ids = {team_id for result in results for team_id in result[:2]}
+    stmt = select(
+        TeamRating.team_id, TeamRating.rating, TeamRating.matches_rated,
+        TeamRating.last_match_date, TeamRating.last_match_id
+    ).filter(TeamRating.team_id.in_(list(team_ids)))
+    state = {row.team_id: dict(row._mapping) for row in await db.execute(stmt)}
+
+    history = []
+    for home_team_id, away_team_id, home_score, away_score, match_date, match_id in results:
+        for team_id in (home_team_id, away_team_id):
+            current = state.get(team_id)
+            if current is not None and (current["last_match_date"], current["last_match_id"]) >= (match_date, match_id):
+                return None
+        home = state.setdefault(home_team_id, {"team_id": home_team_id, "rating": INITIAL_RATING, "matches_rated": 0})
+        away = state.setdefault(away_team_id, {"team_id": away_team_id, "rating": INITIAL_RATING, "matches_rated": 0})
+        home_rating, away_rating = elo_update(home["rating"], away["rating"], home_score, away_score)
+        history.append((home_team_id, match_id, match_date, home["rating"], home_rating))
+        history.append((away_team_id, match_id, match_date, away["rating"], away_rating))
+        for team, rating in ((home, home_rating), (away, away_rating)):
+            team.update(
+                rating=rating, matches_rated=team["matches_rated"] + 1,
+                last_match_date=match_date, last_match_id=match_id
+            )
+
+    await _insert_history(db, history)
+    await _write_ratings(db, team_ids, [state[team_id] for team_id in team_ids])
+    return team_ids
+
+async def replay_ratings_since(db: AsyncSession, since: Optional[datetime.datetime]) -> set[int]:
+    """
+    Räkna om ratingarna från och med 'since' (alla matcher om None) i ett
+    kronologiskt pass. Startvärdet per lag är ratingen efter lagets sista
+    match före 'since', ur historiken. Historiken från 'since' skrivs om.
+    Ingen commit här. Returnerar id för lag vars rating kan ha ändrats.
+    """
+    await _lock_ratings(db)
+    starting: dict[int, tuple] = {}
+    if since is None:
+        removed_team_ids = set((await db.execute(select(TeamRating.team_id))).scalars().all())
+        await db.execute(delete(TeamRatingHistory))
+    else:
+        ranked = select(
+            TeamRatingHistory.team_id,
+            TeamRatingHistory.rating_after,
+            TeamRatingHistory.match_id,
+            TeamRatingHistory.match_date,
+            func.row_number().over(
+                partition_by=TeamRatingHistory.team_id,
+                order_by=(TeamRatingHistory.match_date.desc(), TeamRatingHistory.match_id.desc())
+            ).label("rn")
+        ).filter(TeamRatingHistory.match_date < since).subquery()
+        stmt = select(ranked.c.team_id, ranked.c.rating_after, ranked.c.match_id, ranked.c.match_date).filter(ranked.c.rn == 1)
+        starting = {team_id: (rating, match_id, match_date) for team_id, rating, match_id, match_date in await db.execute(stmt)}
+
+        stmt = select(TeamRatingHistory.team_id).filter(TeamRatingHistory.match_date >= since).distinct()
+        removed_team_ids = set((await db.execute(stmt)).scalars().all())
+        await db.execute(delete(TeamRatingHistory).where(TeamRatingHistory.match_date >= since))
+
+    stmt = (
+        select(
+            Match.id, Match.match_date, Match.home_team_id, Match.away_team_id, Match.home_score, Match.away_score
+        )
+        .filter(Match.status == 'FINISHED', Match.home_score.is_not(None), Match.away_score.is_not(None))
+        .order_by(Match.match_date, Match.id)
+    )
+    if since is not None:
+        stmt = stmt.filter(Match.match_date >= since)
+    rows = (await db.execute(stmt)).all()
+    match_ids = [row.id for row in rows]
+    match_dates = [row.match_date for row in rows]
+    matches = np.array([row[2:] for row in rows], dtype=np.int64).reshape(-1, 4)
+
+    replay = replay_ratings(matches, {team_id: values[0] for team_id, values in starting.items()})
+
+    history = []
+    last_match = {}
+    for (home_team_id, away_team_id), match_id, match_date, before, after in zip(
+        matches[:, :2].tolist(), match_ids, match_dates, replay.before.tolist(), replay.after.tolist()
+    ):
+        history.append((home_team_id, match_id, match_date, before[0], after[0]))
+        history.append((away_team_id, match_id, match_date, before[1], after[1]))
+        last_match[home_team_id] = last_match[away_team_id] = (match_id, match_date)
+    await _insert_history(db, history)
+
+    affected = removed_team_ids | set(replay.team_ids.tolist())
+    count_stmt = select(TeamRatingHistory.team_id, func.count()).group_by(TeamRatingHistory.team_id)
+    if since is not None:
+        count_stmt = count_stmt.filter(TeamRatingHistory.team_id.in_(list(affected)))
+    counts = dict((await db.execute(count_stmt)).all())
+
+    final = dict(zip(replay.team_ids.tolist(), replay.ratings.tolist()))
+    ratings = []
+    for team_id in affected:
+        if team_id in final:
+            rating = final[team_id]
+            last_match_id, last_match_date = last_match[team_id]
+        elif team_id in starting:
+            rating, last_match_id, last_match_date = starting[team_id]
+        else:
+            # Lagets enda ratade matcher har raderats eller blivit ospelade
+            continue
+        ratings.append({
+            "team_id": team_id,
+            "rating": rating,
+            "matches_rated": counts.get(team_id, 0),
+            "last_match_id": last_match_id,
+            "last_match_date": last_match_date,
+        })
+    await _write_ratings(db, None if since is None else affected, ratings)
+    return affected
+
+async def rebuild_all_ratings(db: AsyncSession) -> int:
+    """
+    Bygg om team_ratings och team_rating_history från matches i ett
+    kronologiskt pass (t.ex. efter import av historik eller ändrade Elo-parametrar).
+    Returnerar antal lag med rating.
+    """
+    await replay_ratings_since(db, None)
+    await db.commit()
+    return (await db.execute(select(func.count()).select_from(TeamRating))).scalar_one()
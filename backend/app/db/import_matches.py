@@ -0,0 +1,42 @@
+import argparse
+import asyncio
+import os
+from app.core.config import settings
+from app.core.match_import import SUPPORTED_FORMATS, import_matches, iter_file_lines
+from app.db.session import AsyncSessionLocal
+
+async def import_file(path: str, fmt: str, chunk_size: int):
+    async with AsyncSessionLocal() as db:
+        with open(path, encoding="utf-8", newline="") as f:
+            report = await import_matches(db, iter_file_lines(f), fmt=fmt, chunk_size=chunk_size)
+
+    print(
+        f"Imported {report.rows_inserted}/{report.rows_read} rows "
+        f"({report.rows_failed} failed, {report.teams_created} new teams) "
+        f"in {report.seconds:.2f}s = {report.rows_per_second:,.0f} rows/sec."
+    )
+    for error in report.errors:
+        print(f"  {error}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk import matches from a CSV or NDJSON file.")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=SUPPORTED_FORMATS, default=None,
+                        help="Defaults to the file extension (.csv or .ndjson/.jsonl).")
+    parser.add_argument("--chunk-size", type=int, default=settings.MATCH_IMPORT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format
+    if fmt is None:
+        fmt = "csv" if os.path.splitext(args.path)[1].lower() == ".csv" else "ndjson"
+
+    print(f"Importing matches from {args.path} ({fmt})...")
+    # Hantera eventloopen korrekt
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+    loop.run_until_complete(import_file(args.path, fmt, args.chunk_size))
+    print("Match import finished.")
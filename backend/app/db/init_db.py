@@ -3,12 +3,24 @@ from app.db.base_class import Base
 from app.db.session import async_engine 
 from app.models.team import Team 
 from app.models.match import Match 
+from app.models.team_form import TeamForm
+from app.models.team_rating import TeamRating, TeamRatingHistory
+from app.models.match_prediction import MatchPrediction
+from app.models.league_standing import LeagueStanding
+
+def create_missing_indexes(sync_conn):
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=sync_conn, checkfirst=True)
 
 async def init_db():
     async with async_engine.begin() as conn:
         print("Creating all tables...")
         await conn.run_sync(Base.metadata.create_all) 
         print("Tables created (if they didn't exist).")
+        # create_all skapar bara index för nya tabeller, lägg till saknade index på befintliga
+        await conn.run_sync(create_missing_indexes)
+        print("Indexes created (if they didn't exist).")
 
 if __name__ == "__main__":
     print("Initializing database...")
@@ -0,0 +1,43 @@
+import argparse
+import asyncio
+import time
+from app.db.session import AsyncSessionLocal
+from app.core.config import settings
+from app.core.model_registry import model_registry
+from app.core.prediction_scheduler import PredictionScheduler
+
+async def precompute_predictions(scheduler: PredictionScheduler) -> int:
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        written = await scheduler.run_pass(db)
+        if await model_registry.get() is None:
+            print(f"No model loaded, nothing computed: {model_registry.last_error}")
+        else:
+            print(f"Precomputed {written} match predictions in {time.perf_counter() - started:.2f}s.")
+        return written
+
+async def run_worker(scheduler: PredictionScheduler) -> None:
+    # Schemaläggaren som egen process: ett pass per intervall. Inaktuella rader
+    # hittas i databasen, så ändringar från API-processerna fångas också.
+    while True:
+        await precompute_predictions(scheduler)
+        await asyncio.sleep(scheduler.interval)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute predictions for all scheduled matches.")
+    parser.add_argument("--loop", action="store_true", help="Keep running, one pass per interval")
+    parser.add_argument("--interval", type=float, default=settings.PREDICTION_SCHEDULER_INTERVAL_SECONDS)
+    parser.add_argument("--batch-size", type=int, default=settings.PREDICTION_SCHEDULER_BATCH_SIZE)
+    args = parser.parse_args()
+    scheduler = PredictionScheduler(enabled=True, interval=args.interval, batch_size=args.batch_size)
+
+    print("Precomputing match predictions...")
+    # Hantera eventloopen korrekt
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+    loop.run_until_complete(run_worker(scheduler) if args.loop else precompute_predictions(scheduler))
+    print("Match prediction precompute finished.")
@@ -0,0 +1,23 @@
+import asyncio
+import time
+from app.db.session import AsyncSessionLocal
+from app import crud
+
+async def rebuild_ratings():
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        print("Replaying Elo ratings from finished matches...")
+        team_count = await crud.team_rating.rebuild_all_ratings(db)
+        print(f"Ratings rebuilt for {team_count} teams in {time.perf_counter() - started:.2f}s.")
+
+if __name__ == "__main__":
+    print("Rebuilding team ratings...")
+    # Hantera eventloopen korrekt
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+    loop.run_until_complete(rebuild_ratings())
+    print("Team rating rebuild finished.")
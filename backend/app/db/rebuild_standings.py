@@ -0,0 +1,23 @@
+import asyncio
+import time
+from app.db.session import AsyncSessionLocal
+from app import crud
+
+async def rebuild_standings():
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        print("Aggregating league standings from finished matches...")
+        row_count = await crud.league_standing.rebuild_all_standings(db)
+        print(f"Standings rebuilt with {row_count} rows in {time.perf_counter() - started:.2f}s.")
+
+if __name__ == "__main__":
+    print("Rebuilding league standings...")
+    # Hantera eventloopen korrekt
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+    loop.run_until_complete(rebuild_standings())
+    print("League standings rebuild finished.")
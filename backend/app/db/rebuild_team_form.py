@@ -0,0 +1,23 @@
+import asyncio
+import time
+from app.db.session import AsyncSessionLocal
+from app import crud
+
+async def rebuild_team_form():
+    async with AsyncSessionLocal() as db:
+        started = time.perf_counter()
+        print("Rebuilding team_form from finished matches...")
+        team_count = await crud.team_form.rebuild_all_team_forms(db)
+        print(f"Team form rebuilt for {team_count} teams in {time.perf_counter() - started:.2f}s.")
+
+if __name__ == "__main__":
+    print("Backfilling team form...")
+    # Hantera eventloopen korrekt
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+    loop.run_until_complete(rebuild_team_form())
+    print("Team form backfill finished.")
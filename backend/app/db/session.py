@@ -1,12 +1,31 @@
 # app/db/session.py
+import time
+
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 # Korrekt import från app/core/config.py
 from app.core.config import settings 
+from app.core.metrics import db_pool_checkout_seconds
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Poolen som create_async_engine annars väljer, men som mäter hur länge en
+    session väntar på en anslutning (inklusive att öppna en ny vid behov).
+    """
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_checkout_seconds.observe(time.perf_counter() - started)
+
 
 # Skapa en asynkron SQLAlchemy engine
 async_engine = create_async_engine(
     settings.ASYNC_DATABASE_URI,
     pool_pre_ping=True, # Kollar anslutningen innan användning
+    poolclass=InstrumentedQueuePool, # Mäter väntetid på anslutningar (GET /metrics)
     # echo=True, # Avkommentera för att se SQL-frågor (bra för debugging)
 )
 
@@ -0,0 +1,12 @@
+# app/db/upsert.py
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+async def dialect_insert(db: AsyncSession):
+    """
+    insert() för sessionens databas med on_conflict_do_update (INSERT ... ON
+    CONFLICT ... DO UPDATE), som finns med samma API i Postgres och SQLite.
+    """
+    connection = await db.connection()
+    return postgresql.insert if connection.dialect.name == "postgresql" else sqlite.insert
@@ -1,16 +1,105 @@
 
-from fastapi import FastAPI
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request, Response
+from fastapi.responses import JSONResponse
 from app.routers import teams 
 from app.routers import matches
+from app.routers import predictions
+from app.routers import leagues
+from app.core.model_registry import model_registry
+from app.core.inference_batcher import inference_batcher
+from app.core.compute_executor import ComputeSaturated, compute_executor
+from app.core.match_snapshot import match_snapshot_store
+from app.core.match_events import match_event_hub
+from app.core.prediction_scheduler import prediction_scheduler
+from app.core.warmup import startup_warmup
+from app.core.config import settings
+from app.core.metrics import MetricsMiddleware, PROMETHEUS_CONTENT_TYPE, render_prometheus
 
-app = FastAPI(title="AI Football Predictor API")
+
+def configure_logging() -> None:
+    """
+    Loggarna under app.* skrivs till stderr med nivån LOG_LEVEL. Prediktionsvägen
+    loggar på DEBUG och kostar därför inget med standardnivån INFO.
+    """
+    app_logger = logging.getLogger("app")
+    app_logger.setLevel(settings.LOG_LEVEL.upper())
+    if not app_logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(levelname)s:  %(name)s: %(message)s"))
+        app_logger.addHandler(handler)
+
+configure_logging()
+logger = logging.getLogger("app.main")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Modellen laddas i bakgrunden så att starten inte blockeras av en stor eller saknad modellfil
+    model_registry.start()
+    # Bilden av spelade matcher laddas i bakgrunden om MATCH_SNAPSHOT_ENABLED är satt
+    match_snapshot_store.start()
+    # LISTEN/NOTIFY-bryggan för GET /matches/stream om MATCH_EVENTS_NOTIFY_ENABLED är satt
+    await match_event_hub.start()
+    # Förberäknade prediktioner för kommande matcher om PREDICTION_SCHEDULER_ENABLED är satt
+    prediction_scheduler.start()
+    # Anslutningar, förberedda frågor, lagkatalog, modell och inferens; GET /health/ready
+    # svarar 503 tills den är klar, medan /health/live svarar direkt
+    warmup_task = asyncio.create_task(startup_warmup.run())
+    yield
+    warmup_task.cancel()
+    await prediction_scheduler.stop()
+    await match_event_hub.stop()
+    await match_snapshot_store.stop()
+    await inference_batcher.stop()
+    await compute_executor.stop()
+    await model_registry.stop()
+
+app = FastAPI(title="AI Football Predictor API", lifespan=lifespan)
+# Latens per route för GET /metrics
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(ComputeSaturated)
+async def compute_saturated_handler(request: Request, exc: ComputeSaturated):
+    # Överbelastad exekverare: be klienten försöka igen istället för att köa utan gräns
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
 
 # Inkluderar team-routern
 app.include_router(teams.router, prefix="/api/v1", tags=["Teams"]) 
 #Inkluderar match-routern
 app.include_router(matches.router, prefix="/api/v1", tags=["Matches"])
+#Inkluderar prediktions-routern
+app.include_router(predictions.router, prefix="/api/v1", tags=["Predictions"])
+#Inkluderar liga-routern (tabeller)
+app.include_router(leagues.router, prefix="/api/v1", tags=["Leagues"])
 
 @app.get("/")
 def read_root():
     return {"message": "Welcome to AI Football Predictor API"}
 
+@app.get("/health/live", include_in_schema=False)
+def read_liveness():
+    """
+    Processen lever och eventloopen svarar; kontrollerar inte databas eller modell.
+    """
+    return {"status": "alive"}
+
+@app.get("/health/ready", include_in_schema=False)
+def read_readiness():
+    """
+    Redo för trafik när uppvärmningen är klar och databasen och modellen fungerar
+    (503 annars), med tiden per fas och de nödvändiga faser som misslyckats.
+    """
+    status = startup_warmup.status()
+    if not startup_warmup.ready:
+        return JSONResponse(status_code=503, content=status)
+    return status
+
+@app.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """
+    Alla mätvärden i Prometheus textformat.
+    """
+    return Response(content=render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+
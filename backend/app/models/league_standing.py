@@ -0,0 +1,35 @@
+from sqlalchemy import Integer, String, DateTime, ForeignKey, func
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+from app.db.base_class import Base
+
+class LeagueStanding(Base):
+    # Tabellrad per liga, säsong och lag, uppdateras med deltan av crud_match när ett resultat ändras
+    __tablename__ = "league_standings"
+
+    # Primärnyckeln börjar med (league, season), så en tabell läses med en indexfråga
+    league: Mapped[str] = mapped_column(String, primary_key=True)
+    season: Mapped[str] = mapped_column(String, primary_key=True)
+    team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
+
+    played: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    won: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    drawn: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    lost: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    goals_for: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    goals_against: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    points: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    @property
+    def goal_difference(self) -> int:
+        return self.goals_for - self.goals_against
+
+    def __repr__(self):
+        return (
+            f"<LeagueStanding(league='{self.league}', season='{self.season}', "
+            f"team_id={self.team_id}, played={self.played}, points={self.points})>"
+        )
@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, String, DateTime, ForeignKey, Column
+from sqlalchemy import Integer, String, DateTime, ForeignKey, Column, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from typing import Optional
 import datetime 
@@ -13,8 +13,8 @@ class Match(Base):
     match_date: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), index=True, nullable=False)
 
     # Foreign Key som pekar på id-kolumnen i 'teams'-tabellen
-    home_team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id"), nullable=False)
-    away_team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id"), nullable=False)
+    home_team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id"), index=True, nullable=False)
+    away_team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id"), index=True, nullable=False)
 
     home_score: Mapped[Optional[int]] = mapped_column(Integer, nullable=True) 
     away_score: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
@@ -22,7 +22,7 @@ class Match(Base):
     league: Mapped[str] = mapped_column(String, index=True, nullable=False)
     season: Mapped[str] = mapped_column(String, index=True, nullable=False) 
 
-    status: Mapped[Optional[str]] = mapped_column(String, nullable=True) 
+    status: Mapped[Optional[str]] = mapped_column(String, index=True, nullable=True) 
 
     # external_api_id: Mapped[Optional[str]] = mapped_column(String, unique=True, index=True, nullable=True) # För ID från externt API
 
@@ -36,4 +36,27 @@ class Match(Base):
             f"<Match(id={self.id}, date='{self.match_date}', "
             f"home_team_id={self.home_team_id}, away_team_id={self.away_team_id}, "
             f"league='{self.league}')>"
-        )
\ No newline at end of file
+        )
+
+# Partiella index för formfrågan i feature_engineering.get_team_recent_matches:
+# "senaste spelade matcherna för lag X" blir en top-N index-only scan per gren
+# (hemma/borta) istället för en sekventiell scan eller bitmap-OR följd av sortering.
+Index(
+    "matches_home_team_id_match_date_finished_ix",
+    Match.home_team_id,
+    Match.match_date.desc(),
+    postgresql_where=(Match.status == 'FINISHED'),
+    postgresql_include=["away_team_id", "home_score", "away_score"],
+)
+Index(
+    "matches_away_team_id_match_date_finished_ix",
+    Match.away_team_id,
+    Match.match_date.desc(),
+    postgresql_where=(Match.status == 'FINISHED'),
+    postgresql_include=["home_team_id", "home_score", "away_score"],
+)
+
+# Keyset-paginering av GET /matches sorterar på (match_date, id) och filtrerar
+# ofta på liga + säsong ("årets Allsvenskan").
+Index("matches_match_date_id_ix", Match.match_date, Match.id)
+Index("matches_league_season_match_date_ix", Match.league, Match.season, Match.match_date, Match.id)
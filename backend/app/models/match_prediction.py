@@ -0,0 +1,38 @@
+from sqlalchemy import Integer, Float, String, DateTime, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+import datetime
+from app.db.base_class import Base
+
+class MatchPrediction(Base):
+    # Förberäknad prediktion per kommande match, skrivs av app/core/prediction_scheduler.py
+    __tablename__ = "match_predictions"
+
+    match_id: Mapped[int] = mapped_column(Integer, ForeignKey("matches.id", ondelete="CASCADE"), primary_key=True)
+
+    # Lagen som prediktionen räknades för; ändras matchens lag räknas den om
+    home_team_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    away_team_id: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    home_win_probability: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    draw_probability: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    away_win_probability: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    # Satt i stället för sannolikheterna när features inte kan skapas (t.ex. ingen historik)
+    error: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    model_version: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+
+    # crud_match räknar upp inputs_version när ett av lagens resultat ändras;
+    # prediktionen är aktuell när computed_version har kommit ikapp
+    inputs_version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    computed_version: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    computed_at: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    @property
+    def stale(self) -> bool:
+        return self.computed_version < self.inputs_version
+
+    def __repr__(self):
+        return (
+            f"<MatchPrediction(match_id={self.match_id}, model_version='{self.model_version}', "
+            f"computed_version={self.computed_version}, inputs_version={self.inputs_version})>"
+        )
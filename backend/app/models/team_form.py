@@ -0,0 +1,37 @@
+from sqlalchemy import Integer, Float, String, DateTime, ForeignKey, JSON, func
+from sqlalchemy.orm import Mapped, mapped_column
+import datetime
+from app.db.base_class import Base
+
+class TeamForm(Base):
+    # Förberäknad form per lag, uppdateras av crud_match när ett resultat ändras
+    __tablename__ = "team_form"
+
+    team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
+
+    # Antal hämtade spelade matcher (största fönstret i FeatureSchema, plus säsongen)
+    matches_counted: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Snitten över de senaste FORM_WINDOW matcherna
+    avg_goals_scored: Mapped[float] = mapped_column(Float, nullable=False)
+    avg_goals_conceded: Mapped[float] = mapped_column(Float, nullable=False)
+    form_points: Mapped[float] = mapped_column(Float, nullable=False)
+
+    # Alla lag-features i FeatureSchema.team_feature_names-ordning och schemats
+    # nyckel; rader med en annan nyckel räknas om vid läsning tills tabellen byggts om
+    features: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+    feature_schema: Mapped[str] = mapped_column(String, nullable=False, default="")
+
+    # De hämtade resultaten, äldsta först, som
+    # [home_team_id, away_team_id, home_score, away_score]
+    recent_results: Mapped[list] = mapped_column(JSON, nullable=False, default=list)
+
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return (
+            f"<TeamForm(team_id={self.team_id}, matches_counted={self.matches_counted}, "
+            f"form_points={self.form_points})>"
+        )
@@ -0,0 +1,49 @@
+from sqlalchemy import Integer, Float, DateTime, ForeignKey, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+from typing import Optional
+import datetime
+from app.db.base_class import Base
+
+class TeamRating(Base):
+    # Aktuell Elo-rating per lag (app/core/ratings.py), uppdateras av crud_match när ett resultat ändras
+    __tablename__ = "team_ratings"
+
+    team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), primary_key=True)
+
+    rating: Mapped[float] = mapped_column(Float, nullable=False)
+    matches_rated: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+
+    # Senaste matchen som ingår i ratingen; nya resultat efter den kan läggas på direkt
+    last_match_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    last_match_date: Mapped[Optional[datetime.datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+    updated_at: Mapped[datetime.datetime] = mapped_column(
+        DateTime(timezone=True), nullable=False, server_default=func.now(), onupdate=func.now()
+    )
+
+    def __repr__(self):
+        return f"<TeamRating(team_id={self.team_id}, rating={self.rating:.1f}, matches_rated={self.matches_rated})>"
+
+class TeamRatingHistory(Base):
+    # En rad per lag och spelad match: ratingen före och efter matchen
+    __tablename__ = "team_rating_history"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+
+    team_id: Mapped[int] = mapped_column(Integer, ForeignKey("teams.id", ondelete="CASCADE"), nullable=False)
+    match_id: Mapped[int] = mapped_column(Integer, ForeignKey("matches.id", ondelete="CASCADE"), nullable=False)
+    match_date: Mapped[datetime.datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    rating_before: Mapped[float] = mapped_column(Float, nullable=False)
+    rating_after: Mapped[float] = mapped_column(Float, nullable=False)
+
+    def __repr__(self):
+        return (
+            f"<TeamRatingHistory(team_id={self.team_id}, match_id={self.match_id}, "
+            f"rating_after={self.rating_after:.1f})>"
+        )
+
+# Ratingen för ett lag vid en viss tidpunkt och historiken per lag (nyast först)
+Index("team_rating_history_team_id_match_date_ix", TeamRatingHistory.team_id, TeamRatingHistory.match_date)
+# Omräkning från ett datum raderar historiken från och med det datumet
+Index("team_rating_history_match_date_ix", TeamRatingHistory.match_date)
@@ -1,2 +1,3 @@
 from . import teams
-from . import matches 
\ No newline at end of file
+from . import matches
+from . import predictions
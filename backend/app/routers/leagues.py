@@ -0,0 +1,38 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app import schemas
+from app import crud
+from app.db.session import get_db
+
+router = APIRouter()
+
+# Endpoint för ligatabellen för en säsong
+# Läses ur league_standings (en rad per lag), inte ur matcherna, så svarstiden
+# beror på antalet lag och inte på hur många matcher som spelats
+@router.get("/leagues/{league}/seasons/{season}/standings", response_model=List[schemas.league.LeagueStandingRead])
+async def read_standings_endpoint(
+    league: str,
+    season: str,
+    db: AsyncSession = Depends(get_db)
+):
+    standings = await crud.league_standing.get_standings(db=db, league=league, season=season)
+    # Lagnamnen ur lagkatalogen (ingen fråga när den är fylld)
+    teams = await crud.team.get_teams_by_ids(db=db, team_ids=[row.team_id for row in standings])
+    return [
+        schemas.league.LeagueStandingRead(
+            position=position,
+            team_id=row.team_id,
+            team=teams[row.team_id].name,
+            played=row.played,
+            won=row.won,
+            drawn=row.drawn,
+            lost=row.lost,
+            goals_for=row.goals_for,
+            goals_against=row.goals_against,
+            goal_difference=row.goal_difference,
+            points=row.points,
+        )
+        for position, row in enumerate(standings, start=1)
+    ]
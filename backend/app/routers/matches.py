@@ -1,13 +1,68 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List 
+from typing import List, Optional, Union
+import asyncio
+import csv
+import datetime
+import io
+import json
 
 from app import schemas 
 from app import crud    
-from app.db.session import get_db 
+from app.db.session import get_db, AsyncSessionLocal
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.core.config import settings
+from app.core.match_import import import_matches, iter_lines
+from app.core.match_events import encode_event, match_event_hub
+from app.core.fast_json import FastJSONResponse
 
 router = APIRouter()
 
+# Max antal matcher i ett PATCH /matches/bulk-anrop
+MAX_BULK_SCORE_UPDATES = 1000
+
+def _match_read_from_row(row: dict, teams: dict[int, schemas.team.TeamRead]) -> schemas.match.MatchRead:
+    return schemas.match.MatchRead(
+        **row, home_team=teams.get(row["home_team_id"]), away_team=teams.get(row["away_team_id"])
+    )
+
+def _match_read(match, teams: dict[int, schemas.team.TeamRead]) -> schemas.match.MatchRead:
+    return schemas.match.MatchRead(
+        id=match.id,
+        match_date=match.match_date,
+        league=match.league,
+        season=match.season,
+        home_team_id=match.home_team_id,
+        away_team_id=match.away_team_id,
+        status=match.status,
+        home_score=match.home_score,
+        away_score=match.away_score,
+        home_team=teams.get(match.home_team_id),
+        away_team=teams.get(match.away_team_id),
+    )
+
+async def _match_reads(db: AsyncSession, matches) -> List[schemas.match.MatchRead]:
+    """
+    Bygg svaren för matcher med home_team/away_team från lagkatalogen
+    (ingen fråga när alla lag är kända, annars en IN-fråga för de saknade).
+    """
+    team_ids = {team_id for match in matches for team_id in (match.home_team_id, match.away_team_id)}
+    teams = await crud.team.get_teams_by_ids(db, team_ids)
+    return [_match_read(match, teams) for match in matches]
+
+def _prediction_read(prediction) -> Optional[schemas.match.MatchPredictionRead]:
+    # En rad som ännu inte har räknats (computed_at saknas) visas inte
+    if prediction is None or prediction.computed_at is None:
+        return None
+    return schemas.match.MatchPredictionRead.model_validate(prediction)
+
+async def _prediction_payloads(db: AsyncSession, match_ids) -> dict[int, dict]:
+    # Förberäknade prediktioner för en sida matcher med en IN-fråga på primärnyckeln
+    predictions = await crud.match_prediction.get_match_predictions(db, match_ids)
+    payloads = {match_id: _prediction_read(prediction) for match_id, prediction in predictions.items()}
+    return {match_id: payload.model_dump() for match_id, payload in payloads.items() if payload is not None}
+
 @router.post( 
     "/matches/", 
     response_model=schemas.match.MatchRead, 
@@ -21,53 +76,277 @@ async def create_match_endpoint(
     Skapa en ny match.
     Se till att team_id för home_team_id och away_team_id existerar i teams-tabellen.
     """
-    home_team = await crud.team.get_team(db, team_id=match_in.home_team_id)
-    if not home_team:
+    teams = await crud.team.get_teams_by_ids(db, [match_in.home_team_id, match_in.away_team_id])
+    if match_in.home_team_id not in teams:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Home team with id {match_in.home_team_id} not found",
         )
 
-    away_team = await crud.team.get_team(db, team_id=match_in.away_team_id)
-    if not away_team:
+    if match_in.away_team_id not in teams:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Away team with id {match_in.away_team_id} not found",
         )
 
-    if home_team.id == away_team.id:
+    if match_in.home_team_id == match_in.away_team_id:
          raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Home team and away team cannot be the same.",
         )
 
     created_match = await crud.match.create_match(db=db, match=match_in)
-    return created_match
+    return _match_read(created_match, teams)
+
+@router.post("/matches/bulk", response_model=schemas.match.MatchImportReport)
+async def bulk_create_matches_endpoint(
+    request: Request,
+    format: str = Query("csv", pattern="^(csv|ndjson)$"),
+    chunk_size: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Importera många matcher på en gång. Request-kroppen strömmas som CSV (med
+    rubrikrad) eller NDJSON med fälten match_date, home_team, away_team,
+    home_score, away_score, league, season och status. Lag anges med namn och
+    skapas om de saknas. Ogiltiga rader hoppas över och listas i rapporten.
+    """
+    report = await import_matches(
+        db,
+        iter_lines(request.stream()),
+        fmt=format,
+        chunk_size=chunk_size or settings.MATCH_IMPORT_CHUNK_SIZE
+    )
+    return report
 
-@router.get("/matches/", response_model=List[schemas.match.MatchRead]) 
+@router.patch("/matches/bulk", response_model=List[schemas.match.MatchRead])
+async def update_match_scores_bulk_endpoint(
+    updates: List[schemas.match.MatchScoreUpdate] = Body(..., min_length=1, max_length=MAX_BULK_SCORE_UPDATES),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Uppdatera resultat och status för många matcher (t.ex. en hel omgång) i en
+    transaktion och en SQL-sats. Fält som utelämnas lämnas oförändrade.
+    Returnerar de uppdaterade matcherna; id som inte finns hoppas över.
+    """
+    match_ids = [update.id for update in updates]
+    if len(set(match_ids)) != len(match_ids):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Each match id may only appear once.")
+
+    rows = await crud.match.update_match_scores_bulk(
+        db, [(update.id, update.home_score, update.away_score, update.status) for update in updates]
+    )
+    teams = await crud.team.get_teams_by_ids(
+        db, {team_id for row in rows for team_id in (row["home_team_id"], row["away_team_id"])}
+    )
+    return [_match_read_from_row(row, teams) for row in rows]
+
+def _match_rows_json(rows, teams: dict[int, dict], predictions: dict[int, dict]) -> list[dict]:
+    columns = crud.match.MATCH_ROW_COLUMNS
+    return [
+        {
+            **dict(zip(columns, row)),
+            "home_team": teams.get(row.home_team_id),
+            "away_team": teams.get(row.away_team_id),
+            "prediction": predictions.get(row.id),
+        }
+        for row in rows
+    ]
+
+def _match_rows_columnar(rows, teams: dict[int, dict], predictions: Optional[dict[int, dict]]) -> dict:
+    # En lista per kolumn och varje lag en gång, nycklat på id (JSON-nycklar är strängar)
+    columns = crud.match.MATCH_ROW_COLUMNS
+    values = list(zip(*rows)) if rows else [()] * len(columns)
+    content = {
+        **{name: list(column_values) for name, column_values in zip(columns, values)},
+        "teams": {str(team_id): team for team_id, team in teams.items()},
+    }
+    if predictions is not None:
+        content["predictions"] = {str(match_id): prediction for match_id, prediction in predictions.items()}
+    return content
+
+# Svaret kodas med FastJSONResponse utan response_model; båda formerna dokumenteras i OpenAPI
+@router.get(
+    "/matches/",
+    response_model=None,
+    response_class=FastJSONResponse,
+    responses={200: {
+        "model": Union[List[schemas.match.MatchRead], schemas.match.MatchColumnar],
+        "description": "En lista med matcher, eller med ?format=columnar en lista per fält",
+    }},
+)
 async def read_matches_endpoint(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
+    league: Optional[str] = None,
+    season: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    team_id: Optional[int] = None,
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = None,
+    format: str = Query("json", pattern="^(json|columnar)$"),
+    include_prediction: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Hämta en lista med matcher.
+    Hämta en lista med matcher, nyast först.
+    Skicka värdet från headern X-Next-Cursor som ?cursor=... för att hämta nästa
+    sida (keyset-paginering). Utan cursor används skip/limit som tidigare.
+
+    Svaret byggs direkt från raderna (ingen MatchRead per rad). Med
+    ?format=columnar blir svaret ett objekt med en lista per fält (id,
+    match_date, home_team_id, ...) och lagen en gång var i "teams" (id -> lag),
+    vilket ger mindre svar för t.ex. grafer.
+
+    Med ?include_prediction=true får kommande matcher sin förberäknade
+    prediktion i "prediction" (kolumnärt: "predictions", match-id -> prediktion),
+    hämtad med en fråga för hela sidan.
+    """
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, datetime.datetime, int)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    rows = await crud.match.get_match_rows(
+        db=db, skip=skip, limit=limit, after=after,
+        league=league, season=season, status=status_filter, team_id=team_id,
+        date_from=date_from, date_to=date_to
+    )
+    team_reads = await crud.team.get_teams_by_ids(
+        db, {team_id for row in rows for team_id in (row.home_team_id, row.away_team_id)}
+    )
+    teams = {team_id: team.model_dump() for team_id, team in team_reads.items()}
+    predictions = await _prediction_payloads(db, [row.id for row in rows]) if include_prediction else None
+    if format == "columnar":
+        content = _match_rows_columnar(rows, teams, predictions)
+    else:
+        content = _match_rows_json(rows, teams, predictions or {})
+
+    response = FastJSONResponse(content)
+    cursor_for_next_page = next_cursor(rows, limit, "match_date", "id")
+    if cursor_for_next_page:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_for_next_page
+    return response
+
+def _export_value(value):
+    return value.isoformat() if isinstance(value, datetime.datetime) else value
+
+async def _export_match_lines(fmt: str, filters: dict):
+    # Egen session: get_db-sessionen stängs innan en StreamingResponse har skickats klart
+    async with AsyncSessionLocal() as db:
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(crud.match.EXPORT_COLUMNS)
+            yield buffer.getvalue()
+        async for rows in crud.match.stream_match_rows(db, **filters):
+            if fmt == "csv":
+                buffer = io.StringIO()
+                writer = csv.writer(buffer)
+                writer.writerows([_export_value(value) for value in row] for row in rows)
+                yield buffer.getvalue()
+            else:
+                yield "".join(
+                    json.dumps(dict(zip(crud.match.EXPORT_COLUMNS, map(_export_value, row)))) + "\n"
+                    for row in rows
+                )
+
+@router.get("/matches/export")
+async def export_matches_endpoint(
+    format: str = Query("ndjson", pattern="^(csv|ndjson)$"),
+    league: Optional[str] = None,
+    season: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    team_id: Optional[int] = None,
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = None,
+):
+    """
+    Exportera matcher (äldst först) som NDJSON eller CSV, t.ex. för att bygga
+    träningsdata. Svaret strömmas, så hela säsonger kan hämtas i ett anrop.
+    """
+    filters = dict(
+        league=league, season=season, status=status_filter, team_id=team_id,
+        date_from=date_from, date_to=date_to
+    )
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _export_match_lines(format, filters),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="matches.{format}"'}
+    )
+
+async def _match_event_frames(request: Request, subscription):
+    try:
+        # Första raden skickas direkt så att klienten (och proxyn) ser att strömmen är öppen
+        yield ": connected\n\n"
+        while True:
+            try:
+                frame = await asyncio.wait_for(
+                    subscription.queue.get(), timeout=settings.MATCH_STREAM_KEEPALIVE_SECONDS
+                )
+            except asyncio.TimeoutError:
+                if await request.is_disconnected():
+                    break
+                yield ": keepalive\n\n"
+                continue
+            yield frame
+            if subscription.dropped and subscription.queue.empty():
+                yield encode_event("dropped", {"reason": "Client too slow, reconnect to resume."})
+                break
+    finally:
+        match_event_hub.unsubscribe(subscription)
+
+@router.get("/matches/stream")
+async def stream_match_events_endpoint(request: Request):
+    """
+    Server-sent events med ändrade matcher (event: match) och nya prediktioner
+    för berörda kommande matcher (event: prediction), i stället för att polla
+    GET /matches/ och /predict. En klient som inte hinner läsa får event: dropped
+    och strömmen stängs; anslut igen och hämta läget med GET /matches/.
     """
-    matches = await crud.match.get_matches(db=db, skip=skip, limit=limit)
-    return matches
+    subscription = match_event_hub.subscribe()
+    return StreamingResponse(
+        _match_event_frames(request, subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @router.get("/matches/{match_id}", response_model=schemas.match.MatchRead)
 async def read_match_endpoint(
     match_id: int, 
+    include_prediction: bool = False,
     db: AsyncSession = Depends(get_db)
 ):
     """
-    Hämta en specifik match med ID.
+    Hämta en specifik match med ID. Med ?include_prediction=true följer den
+    förberäknade prediktionen med (null om den inte har räknats).
     """
     db_match = await crud.match.get_match(db=db, match_id=match_id)
     if db_match is None:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Match not found")
-    return db_match
+    match_read = (await _match_reads(db, [db_match]))[0]
+    if include_prediction:
+        match_read.prediction = _prediction_read(await crud.match_prediction.get_match_prediction(db, match_id))
+    return match_read
+
+@router.get("/matches/{match_id}/prediction", response_model=schemas.match.MatchPredictionRead)
+async def read_match_prediction_endpoint(
+    match_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Förberäknad prediktion för en kommande match (ett uppslag på primärnyckeln,
+    ingen inferens). stale=true betyder att ett av lagens resultat har ändrats
+    och att en ny prediktion räknas. 404 om matchen inte har någon ännu.
+    """
+    prediction = _prediction_read(await crud.match_prediction.get_match_prediction(db, match_id))
+    if prediction is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Prediction not found")
+    return prediction
 
 @router.put("/matches/{match_id}", response_model=schemas.match.MatchRead)
 async def update_match_endpoint(
@@ -84,15 +363,20 @@ async def update_match_endpoint(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Match not found"
         )
-    if match_in.home_team_id is not None and match_in.home_team_id != db_match.home_team_id:
-        home_team = await crud.team.get_team(db, team_id=match_in.home_team_id)
-        if not home_team:
-            raise HTTPException(status_code=404, detail=f"New home team with id {match_in.home_team_id} not found")
+    # Validera nya lag med lagkatalogen (högst en fråga för båda)
+    new_team_ids = [
+        team_id for team_id, current_team_id in (
+            (match_in.home_team_id, db_match.home_team_id),
+            (match_in.away_team_id, db_match.away_team_id),
+        )
+        if team_id is not None and team_id != current_team_id
+    ]
+    teams = await crud.team.get_teams_by_ids(db, new_team_ids) if new_team_ids else {}
+    if match_in.home_team_id in new_team_ids and match_in.home_team_id not in teams:
+        raise HTTPException(status_code=404, detail=f"New home team with id {match_in.home_team_id} not found")
     
-    if match_in.away_team_id is not None and match_in.away_team_id != db_match.away_team_id:
-        away_team = await crud.team.get_team(db, team_id=match_in.away_team_id)
-        if not away_team:
-            raise HTTPException(status_code=404, detail=f"New away team with id {match_in.away_team_id} not found")
+    if match_in.away_team_id in new_team_ids and match_in.away_team_id not in teams:
+        raise HTTPException(status_code=404, detail=f"New away team with id {match_in.away_team_id} not found")
             
     if match_in.home_team_id is not None and match_in.away_team_id is not None and match_in.home_team_id == match_in.away_team_id:
          raise HTTPException(status_code=400, detail="Home team and away team cannot be the same.")
@@ -103,7 +387,9 @@ async def update_match_endpoint(
 
 
     updated_match = await crud.match.update_match(db=db, db_match=db_match, match_in=match_in)
-    return updated_match
+    if updated_match is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Match not found")
+    return (await _match_reads(db, [updated_match]))[0]
 
 @router.delete("/matches/{match_id}", response_model=schemas.match.MatchRead)
 async def delete_match_endpoint(
@@ -119,4 +405,4 @@ async def delete_match_endpoint(
             status_code=status.HTTP_404_NOT_FOUND, 
             detail="Match not found"
         )
-    return deleted_match
\ No newline at end of file
+    return (await _match_reads(db, [deleted_match]))[0]
\ No newline at end of file
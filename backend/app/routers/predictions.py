@@ -1,29 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from sqlalchemy.ext.asyncio import AsyncSession
-import joblib
-import os
+from typing import List, Optional
+import logging
 import numpy as np
 
 from app.db.session import get_db
-from app.core.feature_engineering import generate_features_for_prediction
+from app.core.feature_engineering import generate_features_for_prediction, generate_features_for_batch
+from app.core.prediction_cache import prediction_cache
+from app.core.model_registry import LoadedModel, model_registry, probabilities_to_output
+from app.core.inference_batcher import inference_batcher
+from app.core.compute_executor import ComputeSaturated, compute_executor
+from app.core.metrics import prediction_stage_seconds
+from app.core.match_snapshot import match_snapshot_store
+from app.core.match_events import match_event_hub
+from app.core.prediction_scheduler import prediction_scheduler
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-MODEL_DIR = "ml_models"
-MODEL_NAME = "logistic_regression_v1.joblib"
-MODEL_PATH = os.path.join(MODEL_DIR, MODEL_NAME)
-
-model_pipeline = None 
-if os.path.exists(MODEL_PATH):
-    try:
-        model_pipeline = joblib.load(MODEL_PATH)
-        print(f"INFO:  Model '{MODEL_PATH}' loaded successfully at startup.")
-    except Exception as e:
-        print(f"ERROR:    Failed to load model '{MODEL_PATH}': {e}")
-        model_pipeline = None
-else:
-    print(f"WARNING:  Model file not found at '{MODEL_PATH}'. Prediction endpoint will return errors.")
+# Max antal matcher i ett batch-anrop (en omgång är normalt 8-16 matcher)
+MAX_BATCH_SIZE = 500
 
 # Pydantic Schemas
 class PredictionInput(BaseModel):
@@ -34,26 +32,59 @@ class PredictionOutput(BaseModel):
     home_win_probability: float
     draw_probability: float
     away_win_probability: float
-    
+    model_version: str
+
+class PredictionBatchInput(BaseModel):
+    fixtures: List[PredictionInput] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+class PredictionBatchItem(BaseModel):
+    home_team_id: int
+    away_team_id: int
+    prediction: Optional[PredictionOutput] = None
+    error: Optional[str] = None
+
+class PredictionBatchOutput(BaseModel):
+    results: List[PredictionBatchItem]
+
+
+async def get_loaded_model() -> LoadedModel:
+    """
+    Hämtar den aktiva modellen en gång per request, så att en omladdning mitt
+    i en request inte blandar två modellversioner.
+    """
+    loaded_model = await model_registry.get()
+    if loaded_model is None:
+        # T.ex. en modell tränad för ett annat feature-schema; den laddas aldrig (se model_registry)
+        detail = "Machine Learning model is not loaded. Prediction service unavailable."
+        if model_registry.last_error:
+            detail = f"{detail} {model_registry.last_error}"
+        raise HTTPException(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail=detail)
+    return loaded_model
+
 
 # API Endpoint 
 @router.post("/predict/", response_model=PredictionOutput)
 async def predict_match_outcome(
     input_data: PredictionInput,
-    db: AsyncSession = Depends(get_db) 
+    db: AsyncSession = Depends(get_db),
+    loaded_model: LoadedModel = Depends(get_loaded_model)
 ):
-    if model_pipeline is None:
-        raise HTTPException(
-            status_code=status.HTTP_503_SERVICE_UNAVAILABLE, 
-            detail="Machine Learning model is not loaded. Prediction service unavailable."
-        )
+    logger.debug(
+        "Received prediction request for home_id: %s, away_id: %s", input_data.home_team_id, input_data.away_team_id
+    )
 
-    print(f"Received prediction request for home_id: {input_data.home_team_id}, away_id: {input_data.away_team_id}")
+    cache_key = await prediction_cache.make_key(
+        input_data.home_team_id, input_data.away_team_id, loaded_model.version
+    )
+    cached_response = await prediction_cache.get(cache_key)
+    if cached_response is not None:
+        return cached_response
 
     feature_vector_1d = await generate_features_for_prediction( # <<--- ANROPA DIN NYA FUNKTION
         db=db, 
         home_team_id=input_data.home_team_id, 
-        away_team_id=input_data.away_team_id
+        away_team_id=input_data.away_team_id,
+        snapshot=match_snapshot_store.current()
     )
 
     if feature_vector_1d is None:
@@ -64,24 +95,127 @@ async def predict_match_outcome(
 
     features_for_model = feature_vector_1d.reshape(1, -1) 
 
-    print(f"Generated features for model: {features_for_model}")
-
-    
-
     try:
-        probabilities = model_pipeline.predict_proba(features_for_model)[0] 
-        print(f"Raw probabilities from model: {probabilities}")
+        with prediction_stage_seconds.time(stage="inference"):
+            probabilities = (await inference_batcher.predict_proba(loaded_model, features_for_model))[0] 
+        logger.debug("Raw probabilities from model: %s", probabilities)
 
-        response_data = {
-            "home_win_probability": float(probabilities[1]), # Sannolikhet för klass 1 (Home Win)
-            "draw_probability": float(probabilities[0]),     # Sannolikhet för klass 0 (Draw)
-            "away_win_probability": float(probabilities[2])  # Sannolikhet för klass 2 (Away Win)
-        }
+        with prediction_stage_seconds.time(stage="serialization"):
+            response_data = probabilities_to_output(probabilities, loaded_model.version)
 
+    except ComputeSaturated:
+        raise
     except Exception as e:
-        print(f"Error during model prediction: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error during model prediction")
         raise HTTPException(status_code=500, detail=f"Error during model prediction: {e}")
 
+    await prediction_cache.set(cache_key, response_data)
     return response_data
+
+
+@router.get("/predict/cache/stats")
+async def read_prediction_cache_stats():
+    """
+    Träffar, missar och utträngningar för prediktionscachen.
+    """
+    return prediction_cache.stats()
+
+
+@router.get("/predict/batcher/stats")
+async def read_inference_batcher_stats():
+    """
+    Batchstorlekar, latens per modellanrop och antal anrop som gick förbi kön.
+    """
+    return inference_batcher.stats()
+
+
+@router.get("/admin/compute")
+async def read_compute_executor_status():
+    """
+    Exekveraren för features och inferens: typ, antal väntande jobb och avvisade anrop.
+    """
+    return compute_executor.status()
+
+
+@router.post("/predict/batch", response_model=PredictionBatchOutput)
+async def predict_batch_outcome(
+    input_data: PredictionBatchInput,
+    db: AsyncSession = Depends(get_db),
+    loaded_model: LoadedModel = Depends(get_loaded_model)
+):
+    """
+    Prediktera flera matcher (t.ex. en hel omgång) i ett anrop.
+    Alla lags form hämtas med en fråga och modellen anropas en gång.
+    Matcher som inte kan prediktas får ett felmeddelande i svaret istället
+    för att hela anropet misslyckas.
+    """
+    fixtures = [(item.home_team_id, item.away_team_id) for item in input_data.fixtures]
+    feature_matrix, valid_indices, errors = await generate_features_for_batch(
+        db=db, fixtures=fixtures, snapshot=match_snapshot_store.current()
+    )
+
+    predictions = {}
+    if valid_indices:
+        try:
+            with prediction_stage_seconds.time(stage="inference"):
+                probabilities = await inference_batcher.predict_proba(loaded_model, feature_matrix)
+        except ComputeSaturated:
+            raise
+        except Exception as e:
+            logger.exception("Error during batch model prediction")
+            raise HTTPException(status_code=500, detail=f"Error during model prediction: {e}")
+
+        with prediction_stage_seconds.time(stage="serialization"):
+            for index, row in zip(valid_indices, probabilities):
+                predictions[index] = probabilities_to_output(row, loaded_model.version)
+
+    results = [
+        PredictionBatchItem(
+            home_team_id=home_team_id,
+            away_team_id=away_team_id,
+            prediction=predictions.get(index),
+            error=errors.get(index)
+        )
+        for index, (home_team_id, away_team_id) in enumerate(fixtures)
+    ]
+    return PredictionBatchOutput(results=results)
+
+
+@router.get("/admin/model")
+async def read_model_status():
+    """
+    Vilken modell som är aktiv, dess version och senaste laddningsfel.
+    """
+    return model_registry.status()
+
+
+@router.get("/admin/match-snapshot")
+async def read_match_snapshot_status():
+    """
+    Om bilden av spelade matcher är aktuell, antal matcher och minnesåtgång.
+    """
+    return match_snapshot_store.status()
+
+@router.get("/admin/match-stream")
+async def read_match_stream_status():
+    """
+    Antal anslutna klienter till GET /matches/stream och om NOTIFY-bryggan är igång.
+    """
+    return match_event_hub.status()
+
+@router.get("/admin/prediction-scheduler")
+async def read_prediction_scheduler_status():
+    """
+    Om schemaläggaren för förberäknade prediktioner körs och hur senaste passet gick.
+    """
+    return prediction_scheduler.status()
+
+
+@router.post("/admin/model/reload")
+async def reload_model():
+    """
+    Ladda om modellfilen direkt (utan att vänta på filbevakningen).
+    Den nya modellen byts in först när den är färdigladdad.
+    """
+    await model_registry.reload(force=True)
+    return model_registry.status()
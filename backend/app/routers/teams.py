@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional
 
 from app import schemas 
 from app import crud    
 from app.db.session import get_db 
+from app.core.pagination import NEXT_CURSOR_HEADER, decode_cursor, next_cursor
+from app.core.fast_json import FastJSONResponse
+from app.core.ratings import INITIAL_RATING
 
 router = APIRouter()
 
@@ -14,25 +18,52 @@ async def create_team_endpoint(
     team_in: schemas.team.TeamCreate, 
     db: AsyncSession = Depends(get_db)
 ):
-    # Kolla om ett lag med samma namn redan finns (valfritt men bra)
-    existing_team = await crud.team.get_team_by_name(db=db, name=team_in.name)
-    if existing_team:
+    # Kolla om ett lag med samma namn redan finns (lagkatalogen, ingen fråga när den är fylld)
+    existing_team_id = await crud.team.get_team_id_by_name(db=db, name=team_in.name)
+    if existing_team_id is not None:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Team with this name already exists",
+        )
+    try:
+        created_team = await crud.team.create_team(db=db, team=team_in)
+    except IntegrityError:
+        # Laget skapades av en annan worker efter att katalogen fylldes
+        await db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Team with this name already exists",
         )
-    created_team = await crud.team.create_team(db=db, team=team_in)
     return created_team
 
-# Endpoint för att hämta en lista med lag
-@router.get("/teams/", response_model=List[schemas.team.TeamRead]) 
+# Endpoint för att hämta en lista med lag, sorterad på namn
+# Nästa sida hämtas med ?cursor=<värdet i X-Next-Cursor>, skip/limit fungerar som tidigare
+# Svaret kodas direkt från raderna (ingen TeamRead per rad)
+@router.get(
+    "/teams/",
+    response_model=None,
+    response_class=FastJSONResponse,
+    responses={200: {"model": List[schemas.team.TeamRead], "description": "Lagen, sorterade på namn"}},
+)
 async def read_teams_endpoint(
     skip: int = 0, 
     limit: int = 100, 
+    cursor: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    teams = await crud.team.get_teams(db=db, skip=skip, limit=limit)
-    return teams
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor, str, int)
+        except ValueError:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+
+    rows = await crud.team.get_team_rows(db=db, skip=skip, limit=limit, after=after)
+    response = FastJSONResponse([dict(zip(crud.team.TEAM_ROW_COLUMNS, row)) for row in rows])
+    cursor_for_next_page = next_cursor(rows, limit, "name", "id")
+    if cursor_for_next_page:
+        response.headers[NEXT_CURSOR_HEADER] = cursor_for_next_page
+    return response
 
 # Endpoint för att hämta ett specifikt lag med ID
 @router.get("/teams/{team_id}", response_model=schemas.team.TeamRead)
@@ -40,10 +71,33 @@ async def read_team_endpoint(
     team_id: int, 
     db: AsyncSession = Depends(get_db)
 ):
-    db_team = await crud.team.get_team(db=db, team_id=team_id)
-    if db_team is None:
+    teams = await crud.team.get_teams_by_ids(db=db, team_ids=[team_id])
+    if team_id not in teams:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Team not found")
+    return teams[team_id]
+
+# Endpoint för lagets Elo-rating och de senaste ratingändringarna
+@router.get("/teams/{team_id}/rating", response_model=schemas.team.TeamRatingRead)
+async def read_team_rating_endpoint(
+    team_id: int,
+    history_limit: int = Query(20, ge=0, le=1000),
+    db: AsyncSession = Depends(get_db)
+):
+    teams = await crud.team.get_teams_by_ids(db=db, team_ids=[team_id])
+    if team_id not in teams:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Team not found")
-    return db_team
+    ratings = await crud.team_rating.get_team_ratings(db, [team_id])
+    history = await crud.team_rating.get_rating_history(db, team_id, limit=history_limit) if history_limit else []
+    if team_id not in ratings:
+        # Laget har inga spelade matcher ännu
+        return schemas.team.TeamRatingRead(team_id=team_id, rating=INITIAL_RATING, matches_rated=0)
+    rating = ratings[team_id]
+    return schemas.team.TeamRatingRead(
+        team_id=team_id,
+        rating=rating.rating,
+        matches_rated=rating.matches_rated,
+        history=[schemas.team.TeamRatingHistoryRead.model_validate(entry) for entry in history],
+    )
 
 # Endpoint för att updatera ett lag
 @router.put("/teams/{team_id}", response_model=schemas.team.TeamRead)
@@ -64,12 +118,19 @@ async def update_team_endpoint(
 
     # Om namnet ändras, kolla att det nya namnet inte redan finns för ett annat lag
     if team_in.name and team_in.name != db_team.name:
-        existing_team_with_new_name = await crud.team.get_team_by_name(db=db, name=team_in.name)
-        if existing_team_with_new_name and existing_team_with_new_name.id != team_id:
+        existing_team_id = await crud.team.get_team_id_by_name(db=db, name=team_in.name)
+        if existing_team_id is not None and existing_team_id != team_id:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Another team with this name already exists",
             )
 
-    updated_team = await crud.team.update_team(db=db, db_team=db_team, team_in=team_in)
+    try:
+        updated_team = await crud.team.update_team(db=db, db_team=db_team, team_in=team_in)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Another team with this name already exists",
+        )
     return updated_team
\ No newline at end of file
@@ -1,2 +1,3 @@
-from .team import TeamBase, TeamCreate, TeamUpdate, TeamRead
-from .match import MatchBase, MatchCreate, MatchUpdate, MatchRead 
\ No newline at end of file
+from .team import TeamBase, TeamCreate, TeamUpdate, TeamRead, TeamRatingRead, TeamRatingHistoryRead
+from .league import LeagueStandingRead
+from .match import MatchBase, MatchCreate, MatchUpdate, MatchRead, MatchColumnar, MatchPredictionRead, MatchScoreUpdate, MatchImportReport 
\ No newline at end of file
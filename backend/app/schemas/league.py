@@ -0,0 +1,15 @@
+from pydantic import BaseModel
+
+# En rad i ligatabellen (GET /leagues/{league}/seasons/{season}/standings)
+class LeagueStandingRead(BaseModel):
+    position: int
+    team_id: int
+    team: str
+    played: int
+    won: int
+    drawn: int
+    lost: int
+    goals_for: int
+    goals_against: int
+    goal_difference: int
+    points: int
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, ConfigDict
-from typing import Optional 
+from typing import Dict, List, Optional 
 import datetime 
 from .team import TeamRead
 
@@ -29,6 +29,23 @@ class MatchUpdate(BaseModel):
     season: Optional[str] = None
     status: Optional[str] = None
 
+# Förberäknad prediktion för en kommande match (GET /matches/{id}/prediction).
+# stale = ett av lagens resultat har ändrats sedan den räknades
+
+class MatchPredictionRead(BaseModel):
+    match_id: int
+    home_team_id: int
+    away_team_id: int
+    home_win_probability: Optional[float] = None
+    draw_probability: Optional[float] = None
+    away_win_probability: Optional[float] = None
+    error: Optional[str] = None
+    model_version: Optional[str] = None
+    stale: bool
+    computed_at: Optional[datetime.datetime] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
 # Schema för att läsa en match från API:et
 
 class MatchRead(MatchBase):
@@ -37,5 +54,42 @@ class MatchRead(MatchBase):
     away_score: Optional[int] = None 
     home_team: Optional[TeamRead] = None
     away_team: Optional[TeamRead] = None
+    # Bara med ?include_prediction=true
+    prediction: Optional[MatchPredictionRead] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+# GET /matches/?format=columnar: en lista per fält (samma index = samma match) och
+# lagen en gång var, nycklat på id. predictions (match-id -> prediktion) bara med ?include_prediction=true
+
+class MatchColumnar(BaseModel):
+    match_date: List[datetime.datetime]
+    league: List[str]
+    season: List[str]
+    home_team_id: List[int]
+    away_team_id: List[int]
+    status: List[Optional[str]]
+    id: List[int]
+    home_score: List[Optional[int]]
+    away_score: List[Optional[int]]
+    teams: Dict[str, TeamRead]
+    predictions: Optional[Dict[str, MatchPredictionRead]] = None
+
+# En rad i PATCH /matches/bulk: fält som utelämnas (None) lämnas oförändrade
+
+class MatchScoreUpdate(BaseModel):
+    id: int
+    home_score: Optional[int] = None
+    away_score: Optional[int] = None
+    status: Optional[str] = None
+
+# Rapport från bulkimport av matcher (POST /matches/bulk och app/db/import_matches.py)
 
-    model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
+class MatchImportReport(BaseModel):
+    rows_read: int = 0
+    rows_inserted: int = 0
+    rows_failed: int = 0
+    teams_created: int = 0
+    seconds: float = 0.0
+    rows_per_second: float = 0.0
+    errors: List[str] = []
@@ -1,6 +1,7 @@
 
 from pydantic import BaseModel, ConfigDict
-from typing import Optional
+from typing import List, Optional
+import datetime
 
 # Grundläggande fält som delas av flera schemas
 class TeamBase(BaseModel):
@@ -21,3 +22,17 @@ class TeamRead(TeamBase):
     model_config = ConfigDict(from_attributes = True)
 
  
+
+# Elo-rating för ett lag (GET /teams/{team_id}/rating), historiken nyast först
+class TeamRatingHistoryRead(BaseModel):
+    match_id: int
+    match_date: datetime.datetime
+    rating_before: float
+    rating_after: float
+    model_config = ConfigDict(from_attributes = True)
+
+class TeamRatingRead(BaseModel):
+    team_id: int
+    rating: float
+    matches_rated: int
+    history: List[TeamRatingHistoryRead] = []
@@ -0,0 +1,87 @@
+"""
+Minimal ASGI-klient för benchmarks: anropar appen direkt i processen, utan
+nätverk och utan extra beroenden (httpx finns inte i requirements.txt).
+"""
+import asyncio
+import json
+from typing import Any, Optional
+from urllib.parse import urlencode
+
+
+class ASGIResponse:
+    def __init__(self, status_code: int, headers: list[tuple[bytes, bytes]], body: bytes):
+        self.status_code = status_code
+        self.headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in headers}
+        self.body = body
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class ASGIClient:
+    def __init__(self, app):
+        self.app = app
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        json_body: Any = None,
+        params: Optional[dict] = None,
+    ) -> ASGIResponse:
+        body = b"" if json_body is None else json.dumps(json_body, default=str).encode()
+        headers = [(b"host", b"benchmark")]
+        if json_body is not None:
+            headers.append((b"content-type", b"application/json"))
+        headers.append((b"content-length", str(len(body)).encode()))
+        scope = {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": urlencode(params or {}, doseq=True).encode(),
+            "headers": headers,
+            "client": ("127.0.0.1", 0),
+            "server": ("benchmark", 80),
+        }
+
+        request_sent = False
+        response_complete = asyncio.Event()
+
+        async def receive():
+            nonlocal request_sent
+            if not request_sent:
+                request_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            # Klienten "kopplar ner" först när hela svaret är mottaget
+            await response_complete.wait()
+            return {"type": "http.disconnect"}
+
+        status_code = 500
+        response_headers = []
+        chunks = []
+
+        async def send(message):
+            nonlocal status_code, response_headers
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                response_headers = message.get("headers", [])
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response_complete.set()
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            response_complete.set()
+        return ASGIResponse(status_code, response_headers, b"".join(chunks))
+
+    async def get(self, path: str, params: Optional[dict] = None) -> ASGIResponse:
+        return await self.request("GET", path, params=params)
+
+    async def post(self, path: str, json_body: Any = None) -> ASGIResponse:
+        return await self.request("POST", path, json_body=json_body)
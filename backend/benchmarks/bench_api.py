@@ -0,0 +1,254 @@
+"""
+Last- och latensbenchmark för API:t, i processen via en ASGI-klient.
+
+Databasen fylls med syntetiska ligor (benchmarks/synthetic_league.py), en
+modell tränas på datan och sparas som CompiledScorer, och sedan körs varje
+scenario med ett fast antal samtidiga klienter:
+
+    predict        POST /api/v1/predict/   (slumpade par inom samma liga)
+    list_matches   GET  /api/v1/matches/   (limit=50, slumpad liga)
+    list_teams     GET  /api/v1/teams/     (limit=100)
+    create_match   POST /api/v1/matches/   (spelad match, uppdaterar formen)
+
+Resultatet (genomströmning och p50/p95/p99 per scenario) skrivs som JSON och
+kan jämföras med en tidigare körning:
+
+    python -m benchmarks.bench_api --database-url sqlite+aiosqlite:///bench.db \
+        --concurrency 16 --requests 2000 --output bench.json --compare bench-main.json
+
+Utan --database-url används databasen i .env. Använd en separat databas:
+benchmarken skriver lag och matcher.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.compiled_scorer import CompiledScorer
+from app.core.prediction_cache import LocalCacheBackend, prediction_cache
+from app.core.model_registry import model_registry
+from app.core.training import build_training_set, load_finished_matches, train_model
+from app.crud.crud_team import get_teams
+from app.db.session import get_db
+from app.main import app
+from benchmarks.asgi_client import ASGIClient
+from benchmarks.synthetic_league import create_schema, generate_leagues, seed_leagues
+
+SCENARIOS = ("predict", "list_matches", "list_teams", "create_match")
+PERCENTILES = (50, 95, 99)
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_scenario(make_request, total: int, concurrency: int, warmup: int) -> dict:
+    """
+    Kör make_request() 'total' gånger med 'concurrency' samtidiga klienter.
+    """
+    for _ in range(warmup):
+        await make_request()
+
+    latencies = []
+    errors = 0
+    remaining = total
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            response = await make_request()
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.array(latencies) * 1000
+    return {
+        "requests": total,
+        "errors": errors,
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "throughput_rps": total / elapsed,
+        "latency_ms": {
+            "mean": float(latencies_ms.mean()),
+            **{f"p{p}": float(np.percentile(latencies_ms, p)) for p in PERCENTILES},
+            "max": float(latencies_ms.max()),
+        },
+    }
+
+
+def print_results(results: dict, previous: dict | None) -> None:
+    header = f"{'scenario':<14}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}"
+    print(header)
+    for name, result in results["scenarios"].items():
+        latency = result["latency_ms"]
+        print(
+            f"{name:<14}{result['throughput_rps']:>10.1f}{latency['p50']:>10.2f}"
+            f"{latency['p95']:>10.2f}{latency['p99']:>10.2f}{result['errors']:>8}"
+        )
+        before = (previous or {}).get("scenarios", {}).get(name)
+        if before:
+            changes = [
+                f"rps {100 * (result['throughput_rps'] / before['throughput_rps'] - 1):+.1f}%",
+                *(
+                    f"p{p} {100 * (latency[f'p{p}'] / before['latency_ms'][f'p{p}'] - 1):+.1f}%"
+                    for p in PERCENTILES
+                ),
+            ]
+            print(f"{'':<14}vs {previous['meta'].get('commit') or 'previous'}: {', '.join(changes)}")
+
+
+async def main(args) -> dict:
+    from app.core.config import settings
+
+    engine = create_async_engine(args.database_url or settings.ASYNC_DATABASE_URI)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def get_benchmark_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_benchmark_db
+    rng = random.Random(args.seed)
+
+    await create_schema(engine)
+    if not args.skip_seed:
+        leagues = generate_leagues(np.random.default_rng(args.seed), args.leagues, args.teams, args.seasons)
+        async with session_factory() as db:
+            n_matches = await seed_leagues(db, leagues)
+        print(f"Seeded {len(leagues.teams)} teams and {n_matches} matches.")
+
+    async with session_factory() as db:
+        teams = await get_teams(db, limit=1_000_000)
+        match_ids, matches, seasons = await load_finished_matches(db)
+    teams_by_league = {}
+    for team in teams:
+        teams_by_league.setdefault(team.league, []).append(team.id)
+    teams_by_league = {league: ids for league, ids in teams_by_league.items() if len(ids) > 1}
+    leagues = sorted(teams_by_league)
+
+    with tempfile.TemporaryDirectory() as directory:
+        if args.model_path:
+            model_registry.path = args.model_path
+        else:
+            training_set = build_training_set(match_ids, matches, seasons)
+            model_registry.path = os.path.join(directory, "benchmark_scorer.npz")
+            pipeline = train_model(training_set.X, training_set.y, training_set.schema)
+            CompiledScorer.from_pipeline(pipeline).save(model_registry.path)
+        model_registry.watch_interval = 0
+        if args.no_prediction_cache:
+            prediction_cache.backend = LocalCacheBackend(max_entries=0)
+
+        client = ASGIClient(app)
+        next_match_date = datetime.datetime(2100, 1, 1, tzinfo=datetime.timezone.utc)
+
+        def random_pair() -> tuple[str, int, int]:
+            league = rng.choice(leagues)
+            home_team_id, away_team_id = rng.sample(teams_by_league[league], 2)
+            return league, home_team_id, away_team_id
+
+        async def predict():
+            _, home_team_id, away_team_id = random_pair()
+            return await client.post(
+                "/api/v1/predict/", {"home_team_id": home_team_id, "away_team_id": away_team_id}
+            )
+
+        async def list_matches():
+            return await client.get("/api/v1/matches/", {"limit": 50, "league": rng.choice(leagues)})
+
+        async def list_teams():
+            return await client.get("/api/v1/teams/", {"limit": 100})
+
+        async def create_match():
+            nonlocal next_match_date
+            league, home_team_id, away_team_id = random_pair()
+            next_match_date += datetime.timedelta(minutes=1)
+            return await client.post("/api/v1/matches/", {
+                "match_date": next_match_date.isoformat(),
+                "league": league,
+                "season": "benchmark",
+                "home_team_id": home_team_id,
+                "away_team_id": away_team_id,
+                "home_score": rng.randint(0, 3),
+                "away_score": rng.randint(0, 3),
+                "status": "FINISHED",
+            })
+
+        requests = {
+            "predict": predict,
+            "list_matches": list_matches,
+            "list_teams": list_teams,
+            "create_match": create_match,
+        }
+        results = {
+            "meta": {
+                "commit": git_commit(),
+                "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "python": platform.python_version(),
+                "database": engine.dialect.name,
+                "teams": len(teams),
+                "finished_matches": len(matches),
+                "prediction_cache": not args.no_prediction_cache,
+                "concurrency": args.concurrency,
+            },
+            "scenarios": {},
+        }
+        async with app.router.lifespan_context(app):
+            await model_registry.reload(force=True)
+            for name in args.scenarios:
+                results["scenarios"][name] = await run_scenario(
+                    requests[name], args.requests, args.concurrency, args.warmup
+                )
+
+    app.dependency_overrides.pop(get_db, None)
+    await engine.dispose()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy async URL (default: .env).")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the data already in the database.")
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-path", help="Existing model artifact (default: train one on the seeded data).")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--requests", type=int, default=1000, help="Requests per scenario.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--no-prediction-cache", action="store_true")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against.")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    print_results(results, previous)
+    print(f"Results written to '{args.output}'.")
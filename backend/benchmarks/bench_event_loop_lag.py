@@ -0,0 +1,213 @@
+"""
+Eventloopens fördröjning under prediktionslast, per exekverare (app/core/compute_executor.py).
+
+En sond i eventloopen sover 'probe-interval' ms åt gången och mäter hur mycket
+senare den vaknar än begärt; det är hur länge andra requests (t.ex. /teams)
+hade fått vänta på loopen. Samtidigt skickar 'concurrency' klienter
+POST /api/v1/predict/batch med 'fixtures' slumpade matcher var (prediktionscachen
+är avstängd), och en klient hämtar GET /api/v1/teams/{id} i en slinga för att
+visa latensen för ett lätt anrop bredvid prediktionerna.
+
+Varje exekverartyp körs för varje nivå i --concurrency:
+
+    python -m benchmarks.bench_event_loop_lag --database-url sqlite+aiosqlite:///bench.db \
+        --kinds inline thread process --concurrency 1 8 32 128
+
+Med "inline" (ingen avlastning) växer fördröjningen med samtidigheten; med
+"thread"/"process" ska den ligga kvar nära noll. Svar 503 (exekveraren full)
+räknas som "rejected". Modellen tränas som sklearn-pipeline (.joblib) om inte
+--compiled anges. Med --snapshot läses formen ur MatchSnapshot i minnet, så att
+bara features och inferens belastar processen (med aiosqlite konkurrerar
+databasens trådar annars om GIL med eventloopen).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+import numpy as np
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app.core.compiled_scorer import CompiledScorer
+from app.core.compute_executor import compute_executor
+from app.core.match_snapshot import match_snapshot_store
+from app.core.prediction_cache import LocalCacheBackend, prediction_cache
+from app.core.model_registry import model_registry
+from app.core.training import build_training_set, load_finished_matches, save_model, train_model
+from app.crud.crud_team import get_teams
+from app.db.session import get_db
+from app.main import app
+from benchmarks.asgi_client import ASGIClient
+from benchmarks.synthetic_league import create_schema, generate_leagues, seed_leagues
+
+PERCENTILES = (50, 99)
+
+
+def summarize_ms(values: list[float]) -> dict:
+    values_ms = np.array(values or [0.0]) * 1000
+    return {
+        **{f"p{p}": float(np.percentile(values_ms, p)) for p in PERCENTILES},
+        "max": float(values_ms.max()),
+    }
+
+
+async def probe_lag(interval: float, lags: list[float], stop: asyncio.Event) -> None:
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, loop.time() - started - interval))
+
+
+async def run_level(client: ASGIClient, bodies: list[dict], team_ids: list[int], args, concurrency: int) -> dict:
+    lags, light_latencies = [], []
+    predicted = rejected = failed = 0
+    stop = asyncio.Event()
+    rng = random.Random(args.seed)
+
+    async def predictor(offset: int):
+        nonlocal predicted, rejected, failed
+        for request in range(args.requests):
+            response = await client.post("/api/v1/predict/batch", bodies[(offset + request) % len(bodies)])
+            if response.status_code == 503:
+                rejected += 1
+            elif response.status_code >= 400:
+                failed += 1
+            else:
+                predicted += 1
+
+    async def light_client():
+        while not stop.is_set():
+            started = time.perf_counter()
+            await client.get(f"/api/v1/teams/{rng.choice(team_ids)}")
+            light_latencies.append(time.perf_counter() - started)
+
+    probe = asyncio.create_task(probe_lag(args.probe_interval / 1000, lags, stop))
+    light = asyncio.create_task(light_client())
+    started = time.perf_counter()
+    await asyncio.gather(*(predictor(offset) for offset in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await asyncio.gather(probe, light)
+
+    return {
+        "concurrency": concurrency,
+        "seconds": elapsed,
+        "predict_rps": predicted / elapsed,
+        "rejected": rejected,
+        "failed": failed,
+        "loop_lag_ms": summarize_ms(lags),
+        "light_request_ms": summarize_ms(light_latencies),
+    }
+
+
+async def main(args) -> dict:
+    from app.core.config import settings
+
+    engine = create_async_engine(args.database_url or settings.ASYNC_DATABASE_URI)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+
+    async def get_benchmark_db():
+        async with session_factory() as session:
+            yield session
+
+    app.dependency_overrides[get_db] = get_benchmark_db
+    rng = random.Random(args.seed)
+
+    await create_schema(engine)
+    if not args.skip_seed:
+        leagues = generate_leagues(np.random.default_rng(args.seed), args.leagues, args.teams, args.seasons)
+        async with session_factory() as db:
+            n_matches = await seed_leagues(db, leagues)
+        print(f"Seeded {len(leagues.teams)} teams and {n_matches} matches.")
+
+    async with session_factory() as db:
+        teams = await get_teams(db, limit=1_000_000)
+        match_ids, matches, seasons = await load_finished_matches(db)
+    team_ids = [team.id for team in teams]
+
+    # Request-kropparna slumpas i förväg så att benchmarken själv inte belastar eventloopen
+    bodies = [
+        {"fixtures": [
+            dict(zip(("home_team_id", "away_team_id"), rng.sample(team_ids, 2)))
+            for _ in range(args.fixtures)
+        ]}
+        for _ in range(64)
+    ]
+
+    results = {"meta": {"teams": len(teams), "finished_matches": len(matches), **vars(args)}, "runs": {}}
+    with tempfile.TemporaryDirectory() as directory:
+        training_set = build_training_set(match_ids, matches, seasons)
+        pipeline = train_model(training_set.X, training_set.y, training_set.schema)
+        if args.compiled:
+            model_registry.path = os.path.join(directory, "benchmark_scorer.npz")
+            CompiledScorer.from_pipeline(pipeline).save(model_registry.path)
+        else:
+            model_registry.path = os.path.join(directory, "benchmark_model.joblib")
+            save_model(pipeline, model_registry.path)
+        model_registry.watch_interval = 0
+        prediction_cache.backend = LocalCacheBackend(max_entries=0)
+        client = ASGIClient(app)
+
+        async with app.router.lifespan_context(app):
+            await model_registry.reload(force=True)
+            if args.snapshot:
+                async with session_factory() as db:
+                    await match_snapshot_store.refresh(db, full=True)
+            for kind in args.kinds:
+                await compute_executor.stop()
+                compute_executor.kind = kind
+                # Uppvärmning: startar pooler (och processer) innan mätningen
+                for body in bodies[:args.warmup]:
+                    await client.post("/api/v1/predict/batch", body)
+                results["runs"][kind] = [
+                    await run_level(client, bodies, team_ids, args, concurrency)
+                    for concurrency in args.concurrency
+                ]
+
+    app.dependency_overrides.pop(get_db, None)
+    await engine.dispose()
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(
+        f"{'kind':<9}{'conc':>6}{'pred rps':>10}{'lag p50':>9}{'lag p99':>9}{'lag max':>9}"
+        f"{'light p99':>11}{'503':>6}"
+    )
+    for kind, runs in results["runs"].items():
+        for run in runs:
+            lag, light = run["loop_lag_ms"], run["light_request_ms"]
+            print(
+                f"{kind:<9}{run['concurrency']:>6}{run['predict_rps']:>10.1f}{lag['p50']:>9.2f}"
+                f"{lag['p99']:>9.2f}{lag['max']:>9.2f}{light['p99']:>11.2f}{run['rejected']:>6}"
+            )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy async URL (default: .env).")
+    parser.add_argument("--skip-seed", action="store_true", help="Use the data already in the database.")
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--kinds", nargs="+", choices=("inline", "thread", "process"), default=["inline", "thread", "process"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=20, help="Batch requests per client and level.")
+    parser.add_argument("--fixtures", type=int, default=200, help="Fixtures per batch request.")
+    parser.add_argument("--probe-interval", type=float, default=5.0, help="Milliseconds between lag probes.")
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--snapshot", action="store_true", help="Read team form from the in-memory MatchSnapshot.")
+    parser.add_argument("--compiled", action="store_true", help="Serve a CompiledScorer (.npz) instead of sklearn.")
+    parser.add_argument("--output", default="bench_event_loop_lag.json")
+    args = parser.parse_args()
+
+    results = asyncio.run(main(args))
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print_results(results)
+    print(f"Results written to '{args.output}'.")
@@ -0,0 +1,135 @@
+"""
+Mikrobenchmark: NumPy-kärnan i feature_engineering jämfört med den gamla
+pandas-implementationen (DataFrame.apply per rad).
+
+Körs från backend-mappen:
+    python -m benchmarks.bench_feature_kernel --teams 16 --repeat 2000
+"""
+import argparse
+import contextlib
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.core.feature_engineering import (
+    FORM_WINDOW,
+    MATCH_COLUMNS,
+    TEAM_FEATURE_NAMES,
+    calculate_features_for_team,
+    compute_form_features,
+)
+
+
+def legacy_calculate_features_for_team(team_id: int, team_matches_df: pd.DataFrame) -> dict:
+    """
+    Den tidigare implementationen, oförändrad, som referens.
+    """
+    if team_matches_df.empty or len(team_matches_df) == 0:
+        return {"avg_goals_scored": 1.0, "avg_goals_conceded": 1.0, "form_points": 1.0}
+
+    team_matches_df['goals_scored'] = np.where(
+        team_matches_df['home_team_id'] == team_id,
+        team_matches_df['home_score'],
+        team_matches_df['away_score']
+    )
+    team_matches_df['goals_conceded'] = np.where(
+        team_matches_df['home_team_id'] == team_id,
+        team_matches_df['away_score'],
+        team_matches_df['home_score']
+    )
+
+    def get_points(row_team_id, row_home_id, row_away_id, row_home_score, row_away_score):
+        if row_team_id == row_home_id:
+            if row_home_score > row_away_score: return 3
+            if row_home_score == row_away_score: return 1
+            return 0
+        else:
+            if row_away_score > row_home_score: return 3
+            if row_away_score == row_home_score: return 1
+            return 0
+
+    team_matches_df['points'] = team_matches_df.apply(
+        lambda row: get_points(team_id, row['home_team_id'], row['away_team_id'], row['home_score'], row['away_score']),
+        axis=1
+    )
+
+    avg_goals_scored = team_matches_df['goals_scored'].mean()
+    avg_goals_conceded = team_matches_df['goals_conceded'].mean()
+    form_points = team_matches_df['points'].mean()
+
+    return {
+        "avg_goals_scored": avg_goals_scored if pd.notna(avg_goals_scored) else 1.0,
+        "avg_goals_conceded": avg_goals_conceded if pd.notna(avg_goals_conceded) else 1.0,
+        "form_points": form_points if pd.notna(form_points) else 1.0,
+    }
+
+
+def make_team_matches(rng: np.random.Generator, team_id: int, n_matches: int) -> np.ndarray:
+    opponents = rng.integers(1000, 2000, size=n_matches)
+    at_home = rng.random(n_matches) < 0.5
+    scores = rng.poisson(1.4, size=(n_matches, 2))
+    return np.column_stack([
+        np.where(at_home, team_id, opponents),
+        np.where(at_home, opponents, team_id),
+        scores[:, 0],
+        scores[:, 1],
+    ]).astype(np.int64)
+
+
+def mean_seconds(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--teams", type=int, default=16)
+    parser.add_argument("--window", type=int, default=FORM_WINDOW)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    team_ids = np.arange(1, args.teams + 1)
+    per_team = [make_team_matches(rng, int(t), args.window) for t in team_ids]
+    # Sista laget saknar historik för att täcka standardvärdena
+    per_team[-1] = per_team[-1][:0]
+
+    # Paritet: alla vägar ska ge exakt samma värden
+    for team_id, matches in zip(team_ids, per_team):
+        legacy = legacy_calculate_features_for_team(int(team_id), pd.DataFrame(matches, columns=MATCH_COLUMNS))
+        kernel = calculate_features_for_team(int(team_id), matches)
+        assert all(float(legacy[k]) == float(kernel[k]) for k in TEAM_FEATURE_NAMES), (team_id, legacy, kernel)
+
+    all_matches = np.vstack(per_team)
+    owners = np.repeat(np.arange(len(team_ids)), [len(m) for m in per_team])
+    batched = compute_form_features(team_ids, all_matches, owners)
+    for row, (team_id, matches) in zip(batched, zip(team_ids, per_team)):
+        single = calculate_features_for_team(int(team_id), matches)
+        assert np.array_equal(row, [single[k] for k in TEAM_FEATURE_NAMES])
+
+    frames = [pd.DataFrame(m, columns=MATCH_COLUMNS) for m in per_team]
+    legacy_time = mean_seconds(
+        lambda: [legacy_calculate_features_for_team(int(t), df.copy()) for t, df in zip(team_ids, frames)],
+        max(1, args.repeat // 20),
+    )
+    # calculate_features_for_team skriver en varning för laget utan historik
+    with contextlib.redirect_stdout(io.StringIO()):
+        single_time = mean_seconds(
+            lambda: [calculate_features_for_team(int(t), m) for t, m in zip(team_ids, per_team)],
+            args.repeat,
+        )
+    batch_time = mean_seconds(lambda: compute_form_features(team_ids, all_matches, owners), args.repeat)
+
+    print(f"{args.teams} teams x {args.window} matches (parity OK)")
+    print(f"  legacy pandas apply : {legacy_time * 1e6:10.1f} us")
+    print(f"  numpy per team      : {single_time * 1e6:10.1f} us  ({legacy_time / single_time:6.1f}x)")
+    print(f"  numpy all teams     : {batch_time * 1e6:10.1f} us  ({legacy_time / batch_time:6.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
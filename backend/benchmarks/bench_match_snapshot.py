@@ -0,0 +1,57 @@
+"""
+Minnesåtgång, byggtid och uppslagstid för MatchSnapshot (app/core/match_snapshot.py).
+
+Bygger en bild av N syntetiska matcher, kontrollerar formen för ett urval lag
+mot en rak filtrering av alla matcher och mäter team_features för ett
+matchpar (det /predict gör per request).
+
+    python -m benchmarks.bench_match_snapshot --matches 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.feature_engineering import FORM_WINDOW, compute_form_features
+from app.core.match_snapshot import MatchSnapshot
+from benchmarks.check_training_parity import synthetic_matches
+
+
+def main(n_matches: int, n_teams: int, repeats: int) -> None:
+    rng = np.random.default_rng(0)
+    matches = synthetic_matches(rng, n_matches, n_teams)
+    ids = rng.permutation(n_matches) + 1
+    dates = np.datetime64("2000-01-01T15:00", "us") + np.arange(n_matches).astype("timedelta64[h]")
+
+    started = time.perf_counter()
+    snapshot = MatchSnapshot(ids, dates, *matches.T)
+    build_seconds = time.perf_counter() - started
+    stats = snapshot.stats()
+    print(
+        f"Built snapshot of {stats['matches']} matches / {stats['teams']} teams in {build_seconds:.2f}s, "
+        f"{stats['memory_bytes'] / 2**20:.1f} MiB "
+        f"({stats['memory_bytes_per_million_matches'] / 2**20:.1f} MiB per million matches)."
+    )
+
+    for team_id in rng.choice(snapshot.team_ids, size=min(20, len(snapshot.team_ids)), replace=False):
+        played = matches[(matches[:, 0] == team_id) | (matches[:, 1] == team_id)][-FORM_WINDOW:]
+        expected = compute_form_features(np.array([team_id]), played, np.zeros(len(played), dtype=np.intp))
+        assert np.array_equal(snapshot.recent_matches(team_id), played), f"Recent matches differ for team {team_id}"
+        assert np.allclose(snapshot.team_features([team_id]).features, expected), f"Features differ for team {team_id}"
+    print("Parity OK for 20 teams.")
+
+    pairs = rng.choice(snapshot.team_ids, size=(repeats, 2))
+    started = time.perf_counter()
+    for home_team_id, away_team_id in pairs.tolist():
+        snapshot.team_features([home_team_id, away_team_id])
+    per_call = (time.perf_counter() - started) / repeats
+    print(f"team_features for one fixture: {per_call * 1e6:.1f} us/call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=1_000_000)
+    parser.add_argument("--teams", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=10000)
+    args = parser.parse_args()
+    main(args.matches, args.teams, args.repeats)
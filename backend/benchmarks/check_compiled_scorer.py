@@ -0,0 +1,80 @@
+"""
+Paritetskontroll och tidtagning för CompiledScorer (app/core/compiled_scorer.py).
+
+En pipeline tränas på syntetiska matcher, exporteras till .npz och laddas igen.
+Sannolikheterna jämförs med sklearn-pipelinens predict_proba. Sedan mäts
+importtiden (i en ny process) och latensen per anrop för båda varianterna.
+
+    python -m benchmarks.check_compiled_scorer --matches 20000
+"""
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from app.core.compiled_scorer import CompiledScorer
+from app.core.training import build_training_set, train_model
+from benchmarks.check_training_parity import synthetic_matches
+
+
+def import_seconds(statement: str, repeats: int = 3) -> float:
+    """
+    Bästa tiden för att köra 'statement' i en ny Python-process (minus en tom process).
+    """
+    def run(code: str) -> float:
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True)
+        return time.perf_counter() - started
+
+    baseline = min(run("pass") for _ in range(repeats))
+    return min(run(statement) for _ in range(repeats)) - baseline
+
+
+def per_call_microseconds(predict, X: np.ndarray, repeats: int) -> float:
+    started = time.perf_counter()
+    for _ in range(repeats):
+        predict(X)
+    return (time.perf_counter() - started) / repeats * 1e6
+
+
+def main(n_matches: int, n_teams: int, repeats: int) -> None:
+    rng = np.random.default_rng(0)
+    matches = synthetic_matches(rng, n_matches, n_teams)
+    training_set = build_training_set(np.arange(n_matches), matches)
+    pipeline = train_model(training_set.X, training_set.y)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "scorer.npz")
+        CompiledScorer.from_pipeline(pipeline).save(path)
+        scorer = CompiledScorer.load(path)
+
+    expected = pipeline.predict_proba(training_set.X)
+    actual = scorer.predict_proba(training_set.X)
+    max_difference = float(np.abs(expected - actual).max())
+    assert list(scorer.classes_) == list(pipeline.classes_), "Class order differs"
+    assert max_difference < 1e-9, f"Probabilities differ by {max_difference}"
+    print(f"Parity OK on {len(actual)} rows (max abs difference {max_difference:.2e}).")
+
+    compiled_import = import_seconds("import app.core.compiled_scorer")
+    sklearn_import = import_seconds("import joblib, sklearn.pipeline, sklearn.linear_model, sklearn.preprocessing")
+    print(f"Import time: compiled scorer {compiled_import * 1000:.0f} ms, joblib+sklearn {sklearn_import * 1000:.0f} ms")
+
+    for rows in (1, 64):
+        X = training_set.X[:rows]
+        sklearn_us = per_call_microseconds(pipeline.predict_proba, X, repeats)
+        compiled_us = per_call_microseconds(scorer.predict_proba, X, repeats)
+        print(f"{rows:>3} rows: sklearn {sklearn_us:8.1f} us/call, compiled {compiled_us:8.1f} us/call "
+              f"({sklearn_us / compiled_us:.0f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=20000)
+    parser.add_argument("--teams", type=int, default=40)
+    parser.add_argument("--repeats", type=int, default=2000)
+    args = parser.parse_args()
+    main(args.matches, args.teams, args.repeats)
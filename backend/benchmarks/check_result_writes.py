@@ -0,0 +1,165 @@
+"""
+Kontroll av det som crud_match håller uppdaterat när resultat skrivs:
+team_form, team_ratings (med historiken) och league_standings.
+
+En syntetisk liga skrivs till databasen och byggs om. Sedan körs en serie
+skrivningar genom crud.match (ny spelad match, spelad match utan resultat,
+rättat resultat i en gammal match, raderad match, PATCH av flera resultat,
+samma resultat från två requests där den andra läst matchen före den första)
+och efter varje jämförs tabellerna med en full ombyggnad från matches.
+
+    python -m benchmarks.check_result_writes
+    python -m benchmarks.check_result_writes --database-url postgresql+asyncpg://...
+
+Utan --database-url används en SQLite-databas i minnet. Mot Postgres skrivs
+data till databasen, använd en tom testdatabas.
+"""
+import argparse
+import asyncio
+import datetime
+
+import numpy as np
+from sqlalchemy import delete, func, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import crud
+from app.models.league_standing import LeagueStanding
+from app.models.match import Match
+from app.models.team import Team
+from app.models.team_form import TeamForm
+from app.models.team_rating import TeamRating, TeamRatingHistory
+from app.schemas.match import MatchCreate, MatchUpdate
+from benchmarks.synthetic_league import create_schema, generate_leagues, seed_leagues
+
+
+async def derived_state(db) -> dict:
+    forms = {
+        form.team_id: (form.matches_counted, form.features, form.recent_results)
+        for form in (await db.execute(select(TeamForm))).scalars()
+    }
+    ratings = {
+        rating.team_id: (rating.rating, rating.matches_rated, rating.last_match_id)
+        for rating in (await db.execute(select(TeamRating))).scalars()
+    }
+    history = sorted(
+        (entry.team_id, entry.match_id, entry.rating_before, entry.rating_after)
+        for entry in (await db.execute(select(TeamRatingHistory))).scalars()
+    )
+    standings = {
+        (row.league, row.season, row.team_id): (
+            row.played, row.won, row.drawn, row.lost, row.goals_for, row.goals_against, row.points
+        )
+        for row in (await db.execute(select(LeagueStanding))).scalars()
+    }
+    return {"team_form": forms, "team_ratings": ratings, "team_rating_history": history, "league_standings": standings}
+
+
+def same_state(name: str, live, rebuilt) -> bool:
+    if name == "team_ratings":
+        return live.keys() == rebuilt.keys() and all(
+            np.isclose(live[team_id][0], rebuilt[team_id][0]) and live[team_id][1:] == rebuilt[team_id][1:]
+            for team_id in live
+        )
+    if name == "team_rating_history":
+        return len(live) == len(rebuilt) and all(
+            a[:2] == b[:2] and np.allclose(a[2:], b[2:]) for a, b in zip(live, rebuilt)
+        )
+    if name == "team_form":
+        return live.keys() == rebuilt.keys() and all(
+            live[team_id][0] == rebuilt[team_id][0] and live[team_id][2] == rebuilt[team_id][2]
+            and np.allclose(live[team_id][1], rebuilt[team_id][1])
+            for team_id in live
+        )
+    return live == rebuilt
+
+
+async def check(session_factory, label: str) -> bool:
+    async with session_factory() as db:
+        live = await derived_state(db)
+        # Full ombyggnad i samma transaktion, som sedan rullas tillbaka
+        await db.execute(delete(TeamForm))
+        team_ids = (await db.execute(select(Team.id).order_by(Team.id))).scalars().all()
+        await crud.team_form.refresh_team_form(db, team_ids)
+        await crud.team_rating.replay_ratings_since(db, None)
+        await crud.league_standing.rebuild_standings(db)
+        rebuilt = await derived_state(db)
+        await db.rollback()
+    mismatches = [name for name in live if not same_state(name, live[name], rebuilt[name])]
+    print(f"{label:<40}{'OK' if not mismatches else 'MISMATCH in ' + ', '.join(mismatches)}")
+    return not mismatches
+
+
+async def main(args) -> bool:
+    engine = create_async_engine(args.database_url)
+    session_factory = async_sessionmaker(bind=engine, autoflush=False, expire_on_commit=False)
+    await create_schema(engine)
+    leagues = generate_leagues(np.random.default_rng(args.seed), 1, args.teams, 2)
+    async with session_factory() as db:
+        await seed_leagues(db, leagues)
+
+    ok = await check(session_factory, "seeded")
+    async with session_factory() as db:
+        latest = (await db.execute(select(func.max(Match.match_date)))).scalar_one()
+        first = (await db.execute(select(Match).filter(Match.status == 'FINISHED').order_by(Match.id).limit(1))).scalar_one()
+        scheduled, other_scheduled = (await db.execute(
+            select(Match).filter(Match.status == 'SCHEDULED').order_by(Match.id).limit(2)
+        )).scalars().all()
+        team_ids = (first.home_team_id, first.away_team_id)
+    next_day = latest + datetime.timedelta(days=1)
+
+    async def write(label: str, action) -> None:
+        nonlocal ok
+        async with session_factory() as db:
+            try:
+                await action(db)
+            except Exception as e:
+                ok = False
+                print(f"{label:<40}FAILED: {type(e).__name__}: {e}")
+                return
+        ok = await check(session_factory, label) and ok
+
+    async def create(db, **fields):
+        match = MatchCreate(
+            match_date=fields.pop("match_date", next_day), home_team_id=team_ids[0], away_team_id=team_ids[1],
+            league=first.league, season=first.season, status='FINISHED', **fields
+        )
+        return await crud.match.create_match(db, match)
+
+    async def update(db, match_id, **fields):
+        return await crud.match.update_match(db, await crud.match.get_match(db, match_id), MatchUpdate(**fields))
+
+    async def stale_update(db, match_id, **fields):
+        # Som två samtidiga PUT: matchen läses, en annan request sparar samma resultat, sedan skrivs den lästa
+        stale = await crud.match.get_match(db, match_id)
+        async with session_factory() as other:
+            await update(other, match_id, **fields)
+        return await crud.match.update_match(db, stale, MatchUpdate(**fields))
+
+    await write("create finished without scores", lambda db: create(db))
+    await write("finish scheduled without scores", lambda db: update(db, scheduled.id, status='FINISHED'))
+    await write("add scores to finished match", lambda db: update(db, scheduled.id, home_score=2, away_score=1))
+    await write("create latest result (O(1) rating path)", lambda db: create(
+        db, match_date=next_day + datetime.timedelta(days=1), home_score=1, away_score=1
+    ))
+    await write("correct old result (replay)", lambda db: update(db, first.id, home_score=5, away_score=0))
+    await write("move old result to another season", lambda db: update(db, first.id, season="moved"))
+    await write("delete old result", lambda db: crud.match.delete_match(db, first.id))
+    await write("same result from a stale read", lambda db: stale_update(
+        db, other_scheduled.id, status='FINISHED', home_score=3, away_score=3
+    ))
+    await write("bulk score update", lambda db: crud.match.update_match_scores_bulk(
+        db, [(first.id + offset, offset % 3, None, None) for offset in range(1, 6)]
+    ))
+
+    await engine.dispose()
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", default="sqlite+aiosqlite:///:memory:")
+    parser.add_argument("--teams", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not asyncio.run(main(args)):
+        raise SystemExit(1)
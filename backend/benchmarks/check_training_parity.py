@@ -0,0 +1,129 @@
+"""
+Paritetskontroll och tidtagning för träningspipelinen (app/core/training.py).
+
+För ett urval matcher räknas formen om på samma sätt som online-vägen gör
+(compute_schema_features över lagets hämtade tidigare matcher: största fönstret
+plus säsongen) och jämförs med raden från build_training_set. Elo-ratingarna räknas som i
+crud_team_rating när matcher blir spelade, en match i taget med elo_update.
+Sedan tas tid på hela bygget.
+
+    python -m benchmarks.check_training_parity --matches 100000
+    python -m benchmarks.check_training_parity --windows 3,5,10 --season-to-date --decay-half-life 4
+"""
+import argparse
+import time
+
+import numpy as np
+
+from app.core.feature_engineering import FeatureSchema, build_feature_matrix, compute_schema_features
+from app.core.ratings import INITIAL_RATING, elo_update
+from app.core.training import build_training_set
+
+
+def synthetic_matches(rng: np.random.Generator, n_matches: int, n_teams: int) -> np.ndarray:
+    home = rng.integers(1, n_teams + 1, size=n_matches)
+    away = (home + rng.integers(1, n_teams, size=n_matches) - 1) % n_teams + 1
+    scores = rng.poisson([1.5, 1.1], size=(n_matches, 2))
+    return np.column_stack([home, away, scores]).astype(np.int64)
+
+
+def incremental_ratings(matches: np.ndarray) -> np.ndarray:
+    """
+    (N, 2) ratingar inför varje match, uppdaterade en match i taget.
+    """
+    ratings = {}
+    before = np.empty((len(matches), 2))
+    for index, (home_id, away_id, home_score, away_score) in enumerate(matches.tolist()):
+        home_rating, away_rating = ratings.get(home_id, INITIAL_RATING), ratings.get(away_id, INITIAL_RATING)
+        before[index] = home_rating, away_rating
+        ratings[home_id], ratings[away_id] = elo_update(home_rating, away_rating, home_score, away_score)
+    return before
+
+
+def synthetic_seasons(n_matches: int, n_seasons: int) -> np.ndarray:
+    return np.arange(n_matches) * n_seasons // n_matches
+
+
+def online_features(
+    matches: np.ndarray,
+    seasons: np.ndarray,
+    index: int,
+    ratings_before: np.ndarray,
+    schema: FeatureSchema
+) -> np.ndarray | None:
+    """
+    Features för match 'index' som online-vägen skulle ge dem, givet bara tidigare matcher.
+    """
+    history, history_seasons = matches[:index], seasons[:index]
+    home_id, away_id = matches[index, :2]
+    team_ids = np.array(sorted({home_id, away_id}))
+    rows, row_seasons, owners = [], [], []
+    for position, team_id in enumerate(team_ids):
+        played = (history[:, 0] == team_id) | (history[:, 1] == team_id)
+        keep = np.zeros(len(history), dtype=bool)
+        keep[np.flatnonzero(played)[-schema.fetch_window:]] = True
+        if schema.season_to_date and played.any():
+            keep |= played & (history_seasons == history_seasons[played][-1])
+        rows.append(history[keep])
+        row_seasons.append(history_seasons[keep])
+        owners.extend([position] * int(keep.sum()))
+    if not owners:
+        return None
+    features = compute_schema_features(
+        team_ids, np.vstack(rows), np.array(owners), np.concatenate(row_seasons), schema
+    )
+    positions = np.searchsorted(team_ids, [home_id, away_id])
+    ratings = np.empty(len(team_ids))
+    ratings[positions] = ratings_before[index]
+    return build_feature_matrix(features, [positions[0]], [positions[1]], ratings)[0]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--matches", type=int, default=100_000)
+    parser.add_argument("--teams", type=int, default=400)
+    parser.add_argument("--sample", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--seasons", type=int, default=10)
+    parser.add_argument("--windows", default="5", help="Comma-separated form windows in matches.")
+    parser.add_argument("--season-to-date", action="store_true")
+    parser.add_argument("--decay-half-life", type=float, default=None)
+    args = parser.parse_args()
+    schema = FeatureSchema(
+        windows=tuple(int(window) for window in args.windows.split(",")),
+        season_to_date=args.season_to_date,
+        decay_half_life=args.decay_half_life,
+    )
+
+    rng = np.random.default_rng(args.seed)
+    matches = synthetic_matches(rng, args.matches, args.teams)
+    seasons = synthetic_seasons(args.matches, args.seasons)
+    match_ids = np.arange(1, args.matches + 1)
+
+    started = time.perf_counter()
+    training_set = build_training_set(match_ids, matches, seasons, schema)
+    elapsed = time.perf_counter() - started
+    print(
+        f"build_training_set: {args.matches} matches -> {len(training_set.y)} rows x "
+        f"{training_set.X.shape[1]} features ({schema.key}) in {elapsed:.3f}s"
+    )
+
+    started = time.perf_counter()
+    ratings_before = incremental_ratings(matches)
+    print(f"Incremental Elo updates: {args.matches} matches in {time.perf_counter() - started:.3f}s")
+
+    row_of_match = {int(match_id): row for row, match_id in enumerate(training_set.match_ids)}
+    sample = np.concatenate([np.arange(min(50, args.matches)), rng.integers(0, args.matches, size=args.sample)])
+    for index in sample:
+        expected = online_features(matches, seasons, int(index), ratings_before, schema)
+        row = row_of_match.get(int(match_ids[index]))
+        if expected is None:
+            assert row is None, f"match {index}: training row without history"
+        else:
+            assert row is not None, f"match {index}: missing training row"
+            assert np.allclose(training_set.X[row], expected), (index, training_set.X[row], expected)
+    print(f"Parity OK for {len(sample)} sampled matches.")
+
+
+if __name__ == "__main__":
+    main()
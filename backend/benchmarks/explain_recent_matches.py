@@ -0,0 +1,87 @@
+"""
+EXPLAIN-kontroll av formfrågan (feature_engineering.recent_matches_statement)
+mot en lokal Postgres från .env. Avslutas med felkod om planen innehåller en
+Seq Scan på matches.
+
+Med --seed-rows fylls tabellen tillfälligt med syntetiska matcher (allt körs i
+en transaktion som rullas tillbaka), så att planeraren har realistisk statistik:
+    python -m benchmarks.explain_recent_matches --seed-rows 200000
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+from sqlalchemy import text
+from sqlalchemy.dialects import postgresql
+
+from app.core.feature_engineering import FORM_WINDOW, recent_matches_statement
+from app.db.session import async_engine
+
+
+SEED_SQL = """
+INSERT INTO teams (name, league)
+SELECT 'explain-team-' || g, 'explain-league' FROM generate_series(1, :teams) AS g
+ON CONFLICT (name) DO NOTHING;
+
+INSERT INTO matches (match_date, home_team_id, away_team_id, home_score, away_score, league, season, status)
+SELECT
+    now() - (g || ' hours')::interval,
+    t.ids[1 + (g % array_length(t.ids, 1))],
+    t.ids[1 + ((g + 1 + (g / array_length(t.ids, 1)) % (array_length(t.ids, 1) - 1)) % array_length(t.ids, 1))],
+    (random() * 4)::int,
+    (random() * 4)::int,
+    'explain-league',
+    'explain-season',
+    CASE WHEN g % 10 = 0 THEN 'SCHEDULED' ELSE 'FINISHED' END
+FROM generate_series(1, :rows) AS g,
+     (SELECT array_agg(id ORDER BY id) AS ids FROM teams WHERE name LIKE 'explain-team-%') AS t;
+"""
+
+
+def find_nodes(plan: dict, node_type: str) -> list[dict]:
+    found = [plan] if plan.get("Node Type") == node_type else []
+    for child in plan.get("Plans", []):
+        found.extend(find_nodes(child, node_type))
+    return found
+
+
+async def main(seed_rows: int, teams: int, team_id: int | None) -> int:
+    async with async_engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            if seed_rows:
+                for statement in SEED_SQL.split(";"):
+                    if statement.strip():
+                        await conn.execute(text(statement), {"teams": teams, "rows": seed_rows})
+                await conn.execute(text("ANALYZE matches"))
+
+            if team_id is None:
+                team_id = (await conn.execute(text("SELECT min(home_team_id) FROM matches"))).scalar_one_or_none() or 1
+
+            stmt = recent_matches_statement(team_id, FORM_WINDOW)
+            compiled = stmt.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True})
+            result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {compiled}"))
+            plan = result.scalar_one()
+            plan = plan if isinstance(plan, list) else json.loads(plan)
+            root = plan[0]["Plan"]
+        finally:
+            await transaction.rollback()
+    await async_engine.dispose()
+
+    print(json.dumps(root, indent=2))
+    seq_scans = find_nodes(root, "Seq Scan")
+    if seq_scans:
+        print(f"FAIL: {len(seq_scans)} Seq Scan node(s) on {[node.get('Relation Name') for node in seq_scans]}")
+        return 1
+    print("OK: no Seq Scan in the recent-matches plan.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed-rows", type=int, default=0)
+    parser.add_argument("--teams", type=int, default=200)
+    parser.add_argument("--team-id", type=int, default=None)
+    args = parser.parse_args()
+    sys.exit(asyncio.run(main(args.seed_rows, args.teams, args.team_id)))
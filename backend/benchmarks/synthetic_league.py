@@ -0,0 +1,161 @@
+"""
+Syntetiska ligor för benchmarks: N ligor x M lag x S säsonger.
+
+Varje säsong är en dubbelserie (alla möter alla hemma och borta). Målen dras
+från en Poissonfördelning där varje lag har en fast anfalls- och försvarsstyrka
+och hemmalaget en liten fördel, vilket ger ungefär 2,7 mål per match och
+realistiska andelar hemmasegrar, oavgjorda och bortasegrar. En andel av den
+sista säsongens matcher lämnas som SCHEDULED (ospelade).
+
+Fyller databasen från .env (eller --database-url) med:
+    python -m benchmarks.synthetic_league --leagues 4 --teams 20 --seasons 5
+"""
+import argparse
+import asyncio
+import datetime
+from typing import NamedTuple
+
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+
+# Genomsnittligt antal mål per lag och match innan styrkor och hemmafördel
+BASE_GOALS = 1.3
+HOME_ADVANTAGE = 0.25
+# Dagar mellan omgångarna och säsongens första speldag
+DAYS_BETWEEN_ROUNDS = 7
+SEASON_START = (8, 1)
+
+
+class SyntheticLeagues(NamedTuple):
+    """
+    teams: lagnamn -> liga. matches: rader i BULK_MATCH_COLUMNS-ordning men med
+    lagnamn istället för id (id:n finns först när lagen har skrivits).
+    """
+    teams: dict[str, str]
+    matches: list[tuple]
+
+
+def round_robin(n_teams: int) -> list[list[tuple[int, int]]]:
+    """
+    Omgångar för en dubbelserie (cirkelmetoden). Varje omgång är en lista med
+    (hemma, borta)-index; andra halvan är första halvan med ombytta planer.
+    """
+    slots = list(range(n_teams)) + ([None] if n_teams % 2 else [])
+    rounds = []
+    for round_index in range(len(slots) - 1):
+        pairs = []
+        for i in range(len(slots) // 2):
+            home, away = slots[i], slots[-1 - i]
+            if home is not None and away is not None:
+                pairs.append((home, away) if round_index % 2 == 0 else (away, home))
+        rounds.append(pairs)
+        slots = [slots[0], slots[-1], *slots[1:-1]]
+    return rounds + [[(away, home) for home, away in pairs] for pairs in rounds]
+
+
+def generate_leagues(
+    rng: np.random.Generator,
+    n_leagues: int,
+    teams_per_league: int,
+    n_seasons: int,
+    first_season: int = 2020,
+    scheduled_fraction: float = 0.25,
+) -> SyntheticLeagues:
+    teams = {}
+    matches = []
+    schedule = round_robin(teams_per_league)
+    for league_index in range(n_leagues):
+        league = f"Synthetic League {league_index + 1}"
+        names = [f"L{league_index + 1} Team {team_index + 1}" for team_index in range(teams_per_league)]
+        teams.update({name: league for name in names})
+        attack = rng.normal(0.0, 0.2, teams_per_league)
+        defence = rng.normal(0.0, 0.2, teams_per_league)
+
+        for season_index in range(n_seasons):
+            year = first_season + season_index
+            season = f"{year}/{year + 1}"
+            season_start = datetime.datetime(year, *SEASON_START, 15, tzinfo=datetime.timezone.utc)
+            is_last_season = season_index == n_seasons - 1
+            first_scheduled_round = (
+                int(len(schedule) * (1 - scheduled_fraction)) if is_last_season else len(schedule)
+            )
+            for round_index, pairs in enumerate(schedule):
+                match_date = season_start + datetime.timedelta(days=round_index * DAYS_BETWEEN_ROUNDS)
+                home = np.array([home for home, _ in pairs])
+                away = np.array([away for _, away in pairs])
+                home_goals = rng.poisson(BASE_GOALS * np.exp(HOME_ADVANTAGE + attack[home] - defence[away]))
+                away_goals = rng.poisson(BASE_GOALS * np.exp(attack[away] - defence[home]))
+                played = round_index < first_scheduled_round
+                for i in range(len(pairs)):
+                    matches.append((
+                        match_date,
+                        names[home[i]],
+                        names[away[i]],
+                        int(home_goals[i]) if played else None,
+                        int(away_goals[i]) if played else None,
+                        league,
+                        season,
+                        "FINISHED" if played else "SCHEDULED",
+                    ))
+    return SyntheticLeagues(teams, matches)
+
+
+async def seed_leagues(db: AsyncSession, leagues: SyntheticLeagues, chunk_size: int = 5000) -> int:
+    """
+    Skriver lagen och matcherna i en transaktion och bygger om team_form,
+    ratingarna och ligatabellerna.
+    Returnerar antalet matcher.
+    """
+    team_ids = await crud.team.create_teams_bulk(db, leagues.teams)
+    rows = [
+        (match_date, team_ids[home], team_ids[away], *rest)
+        for match_date, home, away, *rest in leagues.matches
+    ]
+    for start in range(0, len(rows), chunk_size):
+        await crud.match.insert_matches_bulk(db, rows[start:start + chunk_size])
+    finished = [row for row in rows if row[7] == "FINISHED"]
+    finished_team_ids = {team_id for row in finished for team_id in row[1:3]}
+    earliest_finished_date = min((row[0] for row in finished), default=None)
+    finished_seasons = {(row[5], row[6]) for row in finished}
+    await crud.match.finish_bulk_insert(db, finished_team_ids, earliest_finished_date, finished_seasons)
+    return len(rows)
+
+
+async def create_schema(engine) -> None:
+    from app.db.base_class import Base
+    from app.db.init_db import create_missing_indexes
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_missing_indexes)
+
+
+async def main(database_url: str | None, leagues: int, teams: int, seasons: int, seed: int) -> None:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    from app.db.session import AsyncSessionLocal
+
+    engine = create_async_engine(database_url) if database_url else None
+    session_factory = async_sessionmaker(bind=engine, expire_on_commit=False) if engine else AsyncSessionLocal
+    if engine is not None:
+        await create_schema(engine)
+
+    data = generate_leagues(np.random.default_rng(seed), leagues, teams, seasons)
+    async with session_factory() as db:
+        n_matches = await seed_leagues(db, data)
+    print(f"Seeded {len(data.teams)} teams and {n_matches} matches.")
+    if engine is not None:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--database-url", help="SQLAlchemy async URL, e.g. sqlite+aiosqlite:///bench.db (default: .env).")
+    parser.add_argument("--leagues", type=int, default=4)
+    parser.add_argument("--teams", type=int, default=20)
+    parser.add_argument("--seasons", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    asyncio.run(main(args.database_url, args.leagues, args.teams, args.seasons, args.seed))